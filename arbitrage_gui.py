@@ -0,0 +1,630 @@
+"""PyQt6 front-end of the arbitrage scanner.
+
+Kept apart from direct_arbitrage so the scanner can run headless without
+importing Qt. Start it with ``python direct_arbitrage.py``.
+"""
+import sys
+import threading
+from PyQt6.QtWidgets import (
+    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
+    QPushButton, QLabel, QLineEdit, QTableView,
+    QHeaderView, QDialog, QTextEdit, QStyleFactory, QCheckBox, QGridLayout
+)
+from PyQt6.QtCore import Qt, QTimer, QObject, QThread, pyqtSignal, pyqtSlot
+from PyQt6.QtGui import QPalette
+from direct_arbitrage import DirectArbitrage, ScanCancelled
+from records import opportunity_dicts
+from opportunity_model import OpportunityTableModel
+from scheduler import RefreshScheduler
+
+
+class ScanWorker(QObject):
+    """Runs scans on a background thread and reports through signals"""
+    progress = pyqtSignal(int, str, int)  # scan id, exchange, pairs fetched
+    finished = pyqtSignal(int, object)  # scan id, opportunities
+    cancelled = pyqtSignal(int)
+    failed = pyqtSignal(int, str)
+
+    def __init__(self, arbitrage):
+        super().__init__()
+        self.arbitrage = arbitrage
+
+    @pyqtSlot(int, float, object)
+    def scan(self, scan_id, investment, cancel):
+        try:
+            self.arbitrage.investment = investment
+            opportunities = self.arbitrage.find_arbitrage_opportunities(
+                progress=lambda exchange, pairs: self.progress.emit(scan_id, exchange, pairs),
+                cancel=cancel
+            )
+            # The window works on plain dicts, converted off the GUI thread
+            self.finished.emit(scan_id, opportunity_dicts(opportunities))
+        except ScanCancelled:
+            self.cancelled.emit(scan_id)
+        except Exception as e:
+            self.failed.emit(scan_id, str(e))
+
+
+class DirectArbitrageGUI(QMainWindow):
+    scan_requested = pyqtSignal(int, float, object)  # scan id, investment, cancel event
+
+    def __init__(self):
+        super().__init__()
+        self.arbitrage = DirectArbitrage()
+        self.opportunities = []
+        self.min_profit_percent = 0.5  # Minimum profit percentage to show
+        self.selected_exchanges = set(self.arbitrage.exchanges.keys())  # All exchanges selected by default
+        
+        # Scans run on a worker thread so the window stays responsive
+        self.scan_id = 0
+        self.scan_running = False
+        self.refresh_pending = False  # Refreshes requested mid-scan collapse into one
+        self.scan_scheduler = None  # Scheduler that claimed the running scan, if any
+        self.cancel_event = None
+        self.exchanges_done = 0
+        self.scan_thread = QThread(self)
+        self.scan_worker = ScanWorker(self.arbitrage)
+        self.scan_worker.moveToThread(self.scan_thread)
+        self.scan_requested.connect(self.scan_worker.scan)
+        self.scan_worker.progress.connect(self.on_scan_progress)
+        self.scan_worker.finished.connect(self.on_scan_finished)
+        self.scan_worker.cancelled.connect(self.on_scan_cancelled)
+        self.scan_worker.failed.connect(self.on_scan_failed)
+        self.scan_thread.start()
+        
+        # Continuous monitoring polls the scheduler, which decides when a scan is due
+        self.scheduler = None
+        self.refresh_timer = QTimer(self)
+        self.refresh_timer.timeout.connect(self.on_refresh_timer)
+        
+        self.init_ui()
+
+    def init_ui(self):
+        """Initialize the user interface"""
+        self.setWindowTitle('Crypto Arbitrage')
+        self.setGeometry(100, 100, 1400, 800)
+        
+        # Create main widget and layout
+        main_widget = QWidget()
+        self.setCentralWidget(main_widget)
+        layout = QVBoxLayout(main_widget)
+        layout.setSpacing(15)
+        layout.setContentsMargins(15, 15, 15, 15)
+        
+        # Create top panel
+        top_panel = QWidget()
+        top_panel.setStyleSheet("""
+            QWidget {
+                background-color: #1E1E1E;
+                border-radius: 6px;
+            }
+        """)
+        top_panel.setFixedHeight(50)  # Fixed height for consistency
+        
+        top_layout = QHBoxLayout(top_panel)
+        top_layout.setContentsMargins(15, 0, 15, 0)
+        top_layout.setSpacing(15)
+        
+        # Left side - inputs
+        inputs_widget = QWidget()
+        inputs_layout = QHBoxLayout(inputs_widget)
+        inputs_layout.setSpacing(10)
+        inputs_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.investment_input = QLineEdit()
+        self.investment_input.setPlaceholderText('Investment $')
+        self.investment_input.setText('1000')
+        self.investment_input.setFixedWidth(120)
+        self.investment_input.setFixedHeight(32)
+        
+        self.profit_input = QLineEdit()
+        self.profit_input.setPlaceholderText('Min Profit %')
+        self.profit_input.setText('0.5')
+        self.profit_input.setFixedWidth(120)
+        self.profit_input.setFixedHeight(32)
+        
+        self.interval_input = QLineEdit()
+        self.interval_input.setPlaceholderText('Refresh (s)')
+        self.interval_input.setText('10')
+        self.interval_input.setFixedWidth(90)
+        self.interval_input.setFixedHeight(32)
+        
+        inputs_layout.addWidget(self.investment_input)
+        inputs_layout.addWidget(self.profit_input)
+        inputs_layout.addWidget(self.interval_input)
+        
+        # Center - exchanges in horizontal layout
+        exchanges_widget = QWidget()
+        exchanges_layout = QHBoxLayout(exchanges_widget)
+        exchanges_layout.setSpacing(15)
+        exchanges_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.exchange_checkboxes = {}
+        for exchange in self.arbitrage.exchanges.keys():
+            checkbox = QCheckBox(exchange)
+            checkbox.setChecked(True)
+            checkbox.stateChanged.connect(self.update_selected_exchanges)
+            self.exchange_checkboxes[exchange] = checkbox
+            exchanges_layout.addWidget(checkbox)
+        
+        # Right side - buttons
+        buttons_widget = QWidget()
+        buttons_layout = QHBoxLayout(buttons_widget)
+        buttons_layout.setSpacing(8)
+        buttons_layout.setContentsMargins(0, 0, 0, 0)
+        
+        self.start_btn = QPushButton('▶ Start')
+        self.start_btn.clicked.connect(self.start_monitoring)
+        self.start_btn.setFixedWidth(90)
+        self.start_btn.setFixedHeight(32)
+        
+        self.refresh_btn = QPushButton('↻ Refresh')
+        self.refresh_btn.clicked.connect(self.refresh_data)
+        self.refresh_btn.setFixedWidth(90)
+        self.refresh_btn.setFixedHeight(32)
+        
+        self.cancel_btn = QPushButton('✕ Cancel')
+        self.cancel_btn.clicked.connect(self.cancel_scan)
+        self.cancel_btn.setFixedWidth(90)
+        self.cancel_btn.setFixedHeight(32)
+        self.cancel_btn.setEnabled(False)
+        
+        buttons_layout.addWidget(self.start_btn)
+        buttons_layout.addWidget(self.refresh_btn)
+        buttons_layout.addWidget(self.cancel_btn)
+        
+        # Add widgets to top layout with proper spacing
+        top_layout.addWidget(inputs_widget)
+        top_layout.addStretch(1)
+        top_layout.addWidget(exchanges_widget)
+        top_layout.addStretch(1)
+        top_layout.addWidget(buttons_widget)
+        
+        # Create table, the model formats only the rows being painted
+        self.table_model = OpportunityTableModel(self)
+        self.table = QTableView()
+        self.table.setModel(self.table_model)
+        
+        # Set table properties
+        header = self.table.horizontalHeader()
+        header.setSectionResizeMode(QHeaderView.ResizeMode.Interactive)
+        header.setDefaultAlignment(Qt.AlignmentFlag.AlignLeft)
+        header.setFixedHeight(35)
+        header.setStyleSheet("""
+            QHeaderView::section {
+                background-color: #1E1E1E;
+                color: #888888;
+                border: none;
+                border-bottom: 1px solid #333333;
+                padding: 5px 10px;
+                font-size: 12px;
+                font-weight: bold;
+            }
+            QHeaderView::section:first {
+                padding-left: 15px;
+            }
+            QHeaderView::section:nth-child(6),
+            QHeaderView::section:nth-child(7) {
+                color: #4CAF50;
+            }
+        """)
+        
+        # Set table style
+        self.table.setStyleSheet("""
+            QTableView {
+                background-color: #121212;
+                color: white;
+                border: none;
+                border-radius: 6px;
+                gridline-color: #2A2A2A;
+                outline: none;
+            }
+            QTableView::item {
+                padding: 8px 10px;
+                border-bottom: 1px solid #1E1E1E;
+            }
+            QTableView::item:first {
+                padding-left: 15px;
+            }
+            QTableView::item:selected {
+                background-color: #2A2A2A;
+            }
+        """)
+        
+        self.table.setEditTriggers(QTableView.EditTrigger.NoEditTriggers)
+        self.table.setSelectionBehavior(QTableView.SelectionBehavior.SelectRows)
+        self.table.setAlternatingRowColors(True)
+        self.table.setShowGrid(False)
+        self.table.verticalHeader().setVisible(False)
+        # Fixed row height so the view never measures rows it doesn't paint
+        self.table.verticalHeader().setSectionResizeMode(QHeaderView.ResizeMode.Fixed)
+        self.table.verticalHeader().setDefaultSectionSize(40)
+        self.table.setVerticalScrollMode(QTableView.ScrollMode.ScrollPerPixel)
+        self.table.horizontalHeader().setStretchLastSection(True)
+        
+        # Add widgets to main layout
+        layout.addWidget(top_panel)
+        layout.addWidget(self.table)
+        
+        # Update styles
+        self.setStyleSheet("""
+            QMainWindow {
+                background-color: #121212;
+            }
+            QLineEdit {
+                background-color: #252525;
+                color: white;
+                border: none;
+                border-radius: 4px;
+                padding: 4px 12px;
+                font-size: 13px;
+                font-weight: bold;
+            }
+            QLineEdit::placeholder {
+                color: #888888;
+            }
+            QPushButton {
+                background-color: #4CAF50;
+                color: white;
+                border: none;
+                border-radius: 4px;
+                padding: 6px 12px;
+                font-size: 13px;
+                font-weight: bold;
+            }
+            QPushButton:hover {
+                background-color: #45a049;
+            }
+            QPushButton:pressed {
+                background-color: #3d8b40;
+            }
+            QCheckBox {
+                color: white;
+                spacing: 8px;
+                font-size: 13px;
+                font-weight: bold;
+                padding: 0px 4px;
+            }
+            QCheckBox::indicator {
+                width: 18px;
+                height: 18px;
+                border-radius: 3px;
+                border: 2px solid #4CAF50;
+            }
+            QCheckBox::indicator:unchecked {
+                background-color: transparent;
+            }
+            QCheckBox::indicator:checked {
+                background-color: #4CAF50;
+                border-color: #4CAF50;
+                image: url(check.png);
+            }
+        """)
+        
+        self.statusBar().showMessage('Ready')
+        # Slowest and failing exchanges, kept right of the scan messages
+        self.metrics_label = QLabel()
+        self.statusBar().addPermanentWidget(self.metrics_label)
+
+    def update_selected_exchanges(self):
+        """Update the set of selected exchanges based on checkbox states"""
+        self.selected_exchanges = {
+            exchange for exchange, checkbox in self.exchange_checkboxes.items()
+            if checkbox.isChecked()
+        }
+
+    def read_inputs(self):
+        """Return the investment amount and update the profit threshold, None if invalid"""
+        try:
+            # Update minimum profit
+            self.min_profit_percent = float(self.profit_input.text())
+            
+            # Update investment amount
+            return float(self.investment_input.text())
+        except ValueError as e:
+            self.statusBar().showMessage('Invalid input values')
+            return None
+
+    def refresh_data(self):
+        """Refresh arbitrage opportunities on the scan thread"""
+        investment = self.read_inputs()
+        if investment is None:
+            return
+        
+        if self.scan_running:
+            self.refresh_pending = True
+            return
+        
+        self.start_scan(investment)
+
+    def start_scan(self, investment, scheduler=None):
+        self.scan_id += 1
+        self.scan_running = True
+        self.scan_scheduler = scheduler
+        self.refresh_pending = False
+        self.exchanges_done = 0
+        # The engine skips deselected exchanges and unprofitable pairs itself
+        self.arbitrage.selected_exchanges = set(self.selected_exchanges)
+        self.arbitrage.min_profit_percent = self.min_profit_percent
+        self.cancel_event = threading.Event()
+        self.cancel_btn.setEnabled(True)
+        self.statusBar().showMessage('Fetching latest prices...')
+        self.scan_requested.emit(self.scan_id, investment, self.cancel_event)
+
+    def cancel_scan(self):
+        """Cancel the scan in flight and any refresh queued behind it"""
+        self.refresh_pending = False
+        if self.cancel_event is not None:
+            self.cancel_event.set()
+
+    def on_refresh_timer(self):
+        if not self.scheduler.begin(busy=self.scan_running):
+            return
+        investment = self.read_inputs()
+        if investment is None:
+            self.scheduler.finish()
+            return
+        self.start_scan(investment, scheduler=self.scheduler)
+
+    def show_status(self, message):
+        if self.refresh_timer.isActive():
+            message = f"{message} | {self.scheduler.status()}"
+        self.statusBar().showMessage(message)
+
+    def scan_done(self):
+        # Monitoring may have been restarted mid-scan, so finish the scheduler that began it
+        if self.scan_scheduler is not None:
+            self.scan_scheduler.finish()
+            self.scan_scheduler = None
+        self.scan_running = False
+        self.cancel_btn.setEnabled(False)
+        self.update_exchange_health()
+        if self.refresh_pending:
+            self.refresh_data()
+
+    def update_exchange_health(self):
+        """Show each exchange's metrics in its tooltip, flagging failed or stale ones in red"""
+        metrics = self.arbitrage.metrics
+        governor = self.arbitrage.governor
+        ages = self.arbitrage.cache_stats()['ages']
+        for exchange, checkbox in self.exchange_checkboxes.items():
+            checkbox.setToolTip(f"{metrics.describe(exchange, ages.get(exchange))}\n{governor.describe(exchange)}")
+            unhealthy = metrics.get(exchange).failing or exchange in self.arbitrage.stale_exchanges
+            checkbox.setStyleSheet('color: #ff6b6b;' if unhealthy else '')
+        exchanges = list(self.exchange_checkboxes)
+        summaries = (metrics.summary(exchanges), governor.summary(exchanges))
+        self.metrics_label.setText(' | '.join(part for part in summaries if part))
+
+    def on_scan_progress(self, scan_id, exchange, pairs):
+        if scan_id != self.scan_id:
+            return
+        self.exchanges_done += 1
+        self.statusBar().showMessage(
+            f"Fetching latest prices... {exchange}: {pairs} pairs "
+            f"({self.exchanges_done}/{len(self.arbitrage.scanned_exchanges())})"
+        )
+
+    def on_scan_finished(self, scan_id, opportunities):
+        if scan_id != self.scan_id:
+            return
+        
+        self.opportunities = opportunities
+        
+        self.update_table()
+        
+        if len(self.opportunities) > 0:
+            best_op = self.opportunities[0]
+            message = (
+                f"Found {len(self.opportunities)} opportunities. " +
+                f"Best: {best_op['pair']} ({best_op['buy_exchange']} → {best_op['sell_exchange']}) {best_op['profit_percent']:.2f}%"
+            )
+        else:
+            message = 'No profitable opportunities found'
+        # Finish first so the status shows this scan's duration
+        self.scan_done()
+        self.show_status(message)
+
+    def on_scan_cancelled(self, scan_id):
+        self.scan_done()
+        self.show_status('Scan cancelled')
+
+    def on_scan_failed(self, scan_id, error):
+        self.scan_done()
+        self.show_status(f'Error: {error}')
+
+    def closeEvent(self, event):
+        """Stop the scan thread before the window goes away"""
+        self.refresh_timer.stop()
+        self.cancel_scan()
+        self.scan_thread.quit()
+        self.scan_thread.wait()
+        self.arbitrage.close()
+        super().closeEvent(event)
+
+    def show_detailed_analysis(self, item):
+        """Show detailed analysis of the selected opportunity"""
+        row = item.row()
+        if row < len(self.opportunities):
+            op = self.opportunities[row]
+            
+            dialog = QDialog(self)
+            dialog.setWindowTitle(f"Detailed Analysis - {op['pair']}")
+            dialog.setMinimumWidth(600)
+            dialog.setStyleSheet("""
+                QDialog {
+                    background-color: #1e1e1e;
+                }
+                QTextEdit {
+                    background-color: #2d2d2d;
+                    color: #ffffff;
+                    border: none;
+                    border-radius: 8px;
+                    padding: 15px;
+                    selection-background-color: #2962ff;
+                }
+            """)
+            
+            layout = QVBoxLayout(dialog)
+            layout.setContentsMargins(20, 20, 20, 20)
+            layout.setSpacing(15)
+            
+            # Create title
+            title = QLabel(f"Trading Analysis for {op['pair']}")
+            title.setStyleSheet("""
+                font-size: 18px;
+                font-weight: bold;
+                color: #ffffff;
+                padding-bottom: 10px;
+            """)
+            layout.addWidget(title)
+            
+            # Create details with HTML formatting
+            details = f"""
+            <style>
+                .detail-table {{ 
+                    border-collapse: collapse; 
+                    width: 100%;
+                    margin: 10px 0;
+                }}
+                .detail-table td, .detail-table th {{ 
+                    padding: 12px; 
+                    text-align: left; 
+                    border-bottom: 1px solid #3d3d3d;
+                }}
+                .section-header {{
+                    color: #888888;
+                    font-size: 14px;
+                    font-weight: bold;
+                    padding: 15px 12px 5px 12px;
+                    background-color: #2d2d2d;
+                }}
+                .label {{
+                    color: #888888;
+                    width: 140px;
+                }}
+                .value {{
+                    color: #ffffff;
+                    font-weight: 500;
+                }}
+                .profit {{
+                    color: #00c853;
+                    font-weight: bold;
+                }}
+                .fee {{
+                    color: #ff5252;
+                }}
+                .exchange {{
+                    color: #ffb74d;
+                }}
+                .pair {{
+                    color: #42a5f5;
+                }}
+            </style>
+            
+            <div class='section-header'>TRADING PAIR INFORMATION</div>
+            <table class='detail-table'>
+                <tr>
+                    <td class='label'>Trading Pair:</td>
+                    <td class='value pair'>{op['pair']}</td>
+                </tr>
+                <tr>
+                    <td class='label'>Buy Exchange:</td>
+                    <td class='value exchange'>{op['buy_exchange']} ({op['original_buy_symbol']})</td>
+                </tr>
+                <tr>
+                    <td class='label'>Sell Exchange:</td>
+                    <td class='value exchange'>{op['sell_exchange']} ({op['original_sell_symbol']})</td>
+                </tr>
+            </table>
+
+            <div class='section-header'>PRICE INFORMATION</div>
+            <table class='detail-table'>
+                <tr>
+                    <td class='label'>Buy Price:</td>
+                    <td class='value'>${op['buy_price']:.8f}</td>
+                </tr>
+                <tr>
+                    <td class='label'>Sell Price:</td>
+                    <td class='value'>${op['sell_price']:.8f}</td>
+                </tr>
+                <tr>
+                    <td class='label'>Buy Fee:</td>
+                    <td class='value fee'>{op['buy_fee']:.2f}%</td>
+                </tr>
+                <tr>
+                    <td class='label'>Sell Fee:</td>
+                    <td class='value fee'>{op['sell_fee']:.2f}%</td>
+                </tr>
+            </table>
+
+            <div class='section-header'>PROFIT ANALYSIS</div>
+            <table class='detail-table'>
+                <tr>
+                    <td class='label'>Investment:</td>
+                    <td class='value'>${op['investment']:.2f}</td>
+                </tr>
+                <tr>
+                    <td class='label'>Coins Bought:</td>
+                    <td class='value'>{op['coins_bought']:.8f}</td>
+                </tr>
+                <tr>
+                    <td class='label'>Final Amount:</td>
+                    <td class='value'>${op['final_amount']:.2f}</td>
+                </tr>
+                <tr>
+                    <td class='label'>Profit Amount:</td>
+                    <td class='value profit'>${op['profit_amount']:.2f}</td>
+                </tr>
+                <tr>
+                    <td class='label'>Profit Percentage:</td>
+                    <td class='value profit'>{op['profit_percent']:.2f}%</td>
+                </tr>
+            </table>
+            """
+            
+            # Create text display
+            text_display = QTextEdit()
+            text_display.setHtml(details)
+            text_display.setReadOnly(True)
+            layout.addWidget(text_display)
+            
+            dialog.exec()
+
+    def update_table(self):
+        """Update the table with current opportunities"""
+        first_fill = self.table_model.rowCount() == 0
+        self.table_model.update(self.opportunities)
+        if first_fill and self.opportunities:
+            # Size columns once from the visible rows instead of on every refresh
+            self.table.resizeColumnsToContents()
+
+    def start_monitoring(self):
+        """Start or stop continuous monitoring of arbitrage opportunities"""
+        if self.refresh_timer.isActive():
+            self.refresh_timer.stop()
+            self.scheduler.stop()
+            self.start_btn.setText('▶ Start')
+            self.statusBar().showMessage('Monitoring stopped')
+            return
+        
+        try:
+            interval = float(self.interval_input.text())
+        except ValueError:
+            self.statusBar().showMessage('Invalid input values')
+            return
+        
+        self.scheduler = RefreshScheduler(self.arbitrage, interval=max(1, interval))
+        self.refresh_timer.start(250)
+        self.start_btn.setText('■ Stop')
+        self.on_refresh_timer()
+
+
+def main():
+    app = QApplication(sys.argv)
+    ex = DirectArbitrageGUI()
+    ex.show()
+    sys.exit(app.exec())
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,195 @@
+"""asyncio scan backend for DirectArbitrage.
+
+All exchanges are fetched over a single aiohttp client whose connector keeps
+connections alive between scans, so repeated scans skip the TCP and TLS
+handshakes. Parsing and opportunity search are shared with the sync path.
+"""
+import time
+import asyncio
+import threading
+
+try:
+    import aiohttp
+except ImportError:  # Optional dependency, only needed for backend='async'
+    aiohttp = None
+
+from fast_json import loads
+from http_cache import ACCEPT_ENCODING
+from rate_limits import RateLimited
+
+
+class AsyncPriceFetcher:
+    """Fetch exchange snapshots concurrently over one pooled HTTP client"""
+
+    def __init__(self, arbitrage, limit=100, limit_per_host=4, keepalive_timeout=60):
+        if aiohttp is None:
+            raise ImportError("backend='async' requires aiohttp (pip install aiohttp)")
+        self.arbitrage = arbitrage
+        self.limit = limit
+        self.limit_per_host = limit_per_host
+        self.keepalive_timeout = keepalive_timeout
+        self.session = None
+        self.session_loop = None
+        self.pending = {}  # exchange -> in-flight task
+        self.loop = None
+        self.thread = None
+
+    async def get_session(self):
+        """Return the pooled client, creating it on the running loop"""
+        loop = asyncio.get_running_loop()
+        if self.session is None or self.session.closed or self.session_loop is not loop:
+            connector = aiohttp.TCPConnector(
+                limit=self.limit,
+                limit_per_host=self.limit_per_host,
+                keepalive_timeout=self.keepalive_timeout,
+            )
+            self.session = aiohttp.ClientSession(
+                connector=connector,
+                timeout=aiohttp.ClientTimeout(total=self.arbitrage.request_timeout),
+                headers={'Accept-Encoding': ACCEPT_ENCODING},
+            )
+            self.session_loop = loop
+            self.pending = {}
+        return self.session
+
+    async def fetch_json(self, session, exchange, url, scan=None):
+        """Return (decoded payload, whether the server answered 304 Not Modified)"""
+        arbitrage = self.arbitrage
+        arbitrage.governor.acquire(exchange)
+        requested = time.perf_counter()
+        async with session.get(url, headers=arbitrage.http_cache.headers(exchange, url)) as response:
+            body = await response.read()
+            not_modified = response.status == 304
+            wire = getattr(response.content, 'total_raw_bytes', len(body))
+            arbitrage.metrics.observe_request(
+                exchange, time.perf_counter() - requested, len(body), wire, not_modified, scan
+            )
+            arbitrage.governor.observe(exchange, response.status, response.headers)
+            if not_modified:
+                return arbitrage.http_cache.payload(exchange, url), True
+            response.raise_for_status()
+            payload = loads(body)
+            arbitrage.http_cache.store(exchange, url, response.headers, payload)
+            return payload, False
+
+    async def fetch_exchange_prices(self, exchange, scan=None):
+        """Fetch and parse the prices of a single exchange, for the metrics scan ``scan``"""
+        arbitrage = self.arbitrage
+        started = time.perf_counter()
+        try:
+            session = await self.get_session()
+            urls = arbitrage.exchange_urls(exchange)
+            try:
+                responses = await asyncio.gather(*(self.fetch_json(session, exchange, url, scan) for url in urls))
+            except aiohttp.ClientResponseError as e:
+                if not arbitrage.refused_filter(exchange, urls, e.status):
+                    raise
+                urls = arbitrage.exchanges[exchange].urls()
+                responses = await asyncio.gather(*(self.fetch_json(session, exchange, url, scan) for url in urls))
+            payloads = [payload for payload, _ in responses]
+            unchanged = sum(not_modified for _, not_modified in responses)
+            prices = arbitrage.snapshot_from(exchange, urls, payloads, unchanged)
+            arbitrage.fetch_latency[exchange] = time.perf_counter() - started
+            print(f"Found {len(prices)} valid pairs on {exchange}")
+        except RateLimited as e:
+            print(str(e))
+            arbitrage.metrics.observe_error(exchange, e)
+            prices = {}
+        except Exception as e:
+            print(f"Error fetching prices from {exchange}: {str(e) or type(e).__name__}")
+            arbitrage.metrics.observe_error(exchange, e)
+            prices = {}
+        return prices
+
+    async def get_exchange_prices(self, refresh=(), progress=None, cancel=None):
+        """Get prices from all exchanges, bounded by the scan deadline
+
+        Mirrors DirectArbitrage.get_exchange_prices: fresh cached snapshots are
+        reused, late exchanges are served from their last snapshot and reported
+        in ``stale_exchanges``, ``progress`` and ``cancel`` behave the same.
+        """
+        arbitrage = self.arbitrage
+        await self.get_session()
+
+        all_prices = {}
+        tasks = {}
+        stale = set()
+        scan = arbitrage.metrics.start_scan()
+        for exchange in arbitrage.scanned_exchanges():
+            if exchange not in refresh:
+                cached = arbitrage.cached_snapshot(exchange)
+                if cached is not None:
+                    all_prices[exchange] = cached
+                    if progress is not None:
+                        progress(exchange, len(cached))
+                    continue
+            if arbitrage.rate_limited(exchange):
+                all_prices[exchange] = arbitrage.last_prices.get(exchange, {})
+                stale.add(exchange)
+                continue
+
+            task = self.pending.get(exchange)
+            if task is None or task.done():
+                task = asyncio.ensure_future(self.fetch_exchange_prices(exchange, scan))
+                task.add_done_callback(
+                    lambda t, exchange=exchange: arbitrage.store_snapshot(exchange, t)
+                )
+                self.pending[exchange] = task
+            tasks[task] = exchange
+
+        deadline = time.monotonic() + arbitrage.scan_deadline
+        done = set()
+        remaining = set(tasks)
+        while remaining:
+            arbitrage.raise_if_cancelled(cancel)
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            finished, remaining = await asyncio.wait(
+                remaining, timeout=min(timeout, 0.1), return_when=asyncio.FIRST_COMPLETED
+            )
+            done |= finished
+            if progress is not None:
+                for task in finished:
+                    progress(tasks[task], len(task.result()))
+
+        for task, exchange in tasks.items():
+            if task in done:
+                all_prices[exchange] = arbitrage.fetched_or_stale(exchange, task.result(), stale)
+            else:
+                print(f"{exchange} missed the {arbitrage.scan_deadline}s scan deadline, using last snapshot")
+                arbitrage.metrics.observe_deadline_miss(exchange)
+                all_prices[exchange] = arbitrage.last_prices.get(exchange, {})
+                stale.add(exchange)
+
+        arbitrage.stale_exchanges = stale
+        arbitrage.metrics.end_scan(list(all_prices), scan)
+        return all_prices
+
+    def run(self, coro):
+        """Run a coroutine on the fetcher's own loop from synchronous code
+
+        The loop lives on a daemon thread for the lifetime of the fetcher so the
+        connection pool survives between scans.
+        """
+        if self.loop is None:
+            self.loop = asyncio.new_event_loop()
+            self.thread = threading.Thread(
+                target=self.loop.run_forever, name='async-fetch', daemon=True
+            )
+            self.thread.start()
+        return asyncio.run_coroutine_threadsafe(coro, self.loop).result()
+
+    async def aclose(self):
+        if self.session is not None and not self.session.closed:
+            await self.session.close()
+
+    def close(self):
+        """Close the pooled client and stop the background loop"""
+        if self.loop is None:
+            return
+        self.run(self.aclose())
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.loop = None
+        self.thread = None
@@ -0,0 +1,1237 @@
+"""Benchmarks for the arbitrage scanner against a local HTTP stub.
+
+The stub serves synthetic payloads shaped like each exchange's real ticker
+endpoint, so scans can be timed offline and without hitting rate limits.
+
+    python benchmark.py fetch --pairs 2000 --delay 0.2 --stall 2.0
+    python benchmark.py backends --scans 20
+    python benchmark.py cache --refreshes 20 --interval 0.25 --ttl 1
+    python benchmark.py parse --pairs 5000
+    python benchmark.py requests --scans 3
+    python benchmark.py compute --pairs 4000 --exchanges 7 20 50
+    python benchmark.py incremental --pairs 4000 --changed 100
+    python benchmark.py stream --pairs 1000 --seconds 5
+    python benchmark.py startup --runs 5
+    python benchmark.py table --pairs 4000 --refreshes 20
+    python benchmark.py memory --pairs 5000 --exchanges 20
+    python benchmark.py symbols --pairs 5000
+    python benchmark.py decode --pairs 5000 [--recorded payloads/]
+    python benchmark.py depth --pairs 300 --latency 0.05
+    python benchmark.py record --pairs 4000 --exchanges 7 --scans 50
+    python benchmark.py replay --pairs 2000 --ticks 600 --workers 1 4
+    python benchmark.py graph --copies 1 4 --hops 3 4
+    python benchmark.py shards --exchanges 50 --workers 1 2 4 8
+    python benchmark.py ratelimit --requests 5 --window 10 --seconds 15
+    python benchmark.py bandwidth --pairs 2000 --common 300 --scans 5
+"""
+import gc
+import io
+import os
+import math
+import zlib
+import gzip
+import sys
+import time
+import json
+import random
+import shutil
+import argparse
+import threading
+import contextlib
+import subprocess
+import tempfile
+import tracemalloc
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs
+
+from direct_arbitrage import DirectArbitrage
+from exchange_adapters import ADAPTERS, ExchangeAdapter, normalize_pair
+import fast_json
+from records import Opportunity, PriceQuote
+from scheduler import RefreshScheduler
+from symbols import SymbolRegistry
+
+EXCHANGES = ['Binance', 'KuCoin', 'MEXC', 'Bybit', 'OKX', 'LBank', 'Bitget']
+
+
+def synthetic_tickers(pairs, seed=0):
+    """Build (base, quote, mid) tuples shared by every synthetic exchange"""
+    rng = random.Random(seed)
+    return [
+        (f"C{i:05d}", 'USDT', 10 ** rng.uniform(-4, 4))
+        for i in range(pairs)
+    ]
+
+
+def synthetic_payloads(pairs=2000, seed=0):
+    """Build raw JSON payloads for every exchange, keyed by stub route"""
+    rng = random.Random(seed)
+    tickers = synthetic_tickers(pairs, seed)
+
+    def quote(mid):
+        # Each venue gets its own jitter around the shared mid price
+        mid = mid * rng.uniform(0.995, 1.005)
+        half_spread = mid * rng.uniform(0.0001, 0.002)
+        return f"{mid - half_spread:.10g}", f"{mid + half_spread:.10g}", f"{mid:.10g}"
+
+    payloads = {}
+    rows = [(b, q) + quote(m) for b, q, m in tickers]
+    payloads['Binance'] = [
+        {'symbol': f"{b}{q}", 'bidPrice': bid, 'askPrice': ask} for b, q, bid, ask, _ in rows
+    ]
+    rows = [(b, q) + quote(m) for b, q, m in tickers]
+    payloads['KuCoin'] = {'code': '200000', 'data': {'ticker': [
+        {'symbol': f"{b}-{q}", 'buy': bid, 'sell': ask} for b, q, bid, ask, _ in rows
+    ]}}
+    rows = [(b, q) + quote(m) for b, q, m in tickers]
+    payloads['MEXC'] = [
+        {'symbol': f"{b}{q}", 'bidPrice': bid, 'askPrice': ask} for b, q, bid, ask, _ in rows
+    ]
+    rows = [(b, q) + quote(m) for b, q, m in tickers]
+    payloads['Bybit'] = {'retCode': 0, 'result': {'category': 'spot', 'list': [
+        {'symbol': f"{b}{q}", 'bid1Price': bid, 'ask1Price': ask} for b, q, bid, ask, _ in rows
+    ]}}
+    rows = [(b, q) + quote(m) for b, q, m in tickers]
+    payloads['OKX'] = {'code': '0', 'data': [
+        {'instId': f"{b}-{q}", 'bidPx': bid, 'askPx': ask} for b, q, bid, ask, _ in rows
+    ]}
+    rows = [(b, q) + quote(m) for b, q, m in tickers]
+    payloads['LBank'] = [
+        {'symbol': f"{b.lower()}_{q.lower()}", 'ticker': {'latest': last}} for b, q, _, _, last in rows
+    ]
+    rows = [(b, q) + quote(m) for b, q, m in tickers]
+    payloads['Bitget'] = {'code': '00000', 'data': [
+        {'symbol': f"{b}{q}", 'buyOne': bid, 'sellOne': ask} for b, q, bid, ask, _ in rows
+    ]}
+    return payloads
+
+
+def synthetic_prices(exchanges, pairs=4000, listed=0.7, seed=0):
+    """Build already parsed price tables for ``exchanges`` synthetic venues
+
+    Each venue lists a random ``listed`` share of the pair universe.
+    """
+    rng = random.Random(seed)
+    tickers = synthetic_tickers(pairs, seed)
+    prices = {}
+    for n in range(exchanges):
+        table = {}
+        for base, quote, mid in tickers:
+            if rng.random() > listed:
+                continue
+            mid = mid * rng.uniform(0.998, 1.002)
+            half_spread = mid * rng.uniform(0.0001, 0.002)
+            table[f"{base}{quote}"] = PriceQuote(
+                mid - half_spread, mid + half_spread, f"{base}-{quote}"
+            )
+        prices[f"Venue{n:02d}"] = table
+    return prices
+
+
+def synthetic_scanner(prices, **kwargs):
+    """A scanner whose exchanges are the synthetic venues of ``prices``"""
+    kwargs.setdefault('symbols_cache', None)
+    arbitrage = DirectArbitrage(**kwargs)
+    arbitrage.min_profit_percent = 0  # Search every profitable combination
+    rng = random.Random(len(prices))
+    arbitrage.exchanges = {}
+    for name in prices:
+        adapter = ExchangeAdapter()
+        adapter.name = name
+        adapter.fee = rng.choice([0.06, 0.075, 0.08, 0.1, 0.2])
+        arbitrage.exchanges[name] = adapter
+    return arbitrage
+
+
+def synthetic_ws_messages(pairs=1000, ticks=20000, seed=0):
+    """Build raw best bid/ask stream messages for the streamed exchanges"""
+    rng = random.Random(seed)
+    tickers = synthetic_tickers(pairs, seed)
+    messages = {'Binance': [], 'Bybit': [], 'OKX': []}
+    for i in range(ticks):
+        base, quote, mid = rng.choice(tickers)
+        mid = mid * rng.uniform(0.995, 1.005)
+        half_spread = mid * rng.uniform(0.0001, 0.002)
+        bid, ask = f"{mid - half_spread:.10g}", f"{mid + half_spread:.10g}"
+        exchange = rng.choice(list(messages))
+        if exchange == 'Binance':
+            message = {'u': i, 's': f"{base}{quote}", 'b': bid, 'B': '1', 'a': ask, 'A': '1'}
+        elif exchange == 'Bybit':
+            symbol = f"{base}{quote}"
+            message = {'topic': f"orderbook.1.{symbol}", 'type': 'snapshot',
+                       'data': {'s': symbol, 'b': [[bid, '1']], 'a': [[ask, '1']], 'u': i}}
+        else:
+            symbol = f"{base}-{quote}"
+            message = {'arg': {'channel': 'tickers', 'instId': symbol},
+                       'data': [{'instId': symbol, 'bidPx': bid, 'askPx': ask}]}
+        messages[exchange].append(json.dumps(message))
+    return messages
+
+
+INVALID_SYMBOL = b'{"code":-1121,"msg":"Invalid symbol."}'
+
+
+class StubServer:
+    """Threaded local HTTP server replaying payloads with per-route delays
+
+    Payloads are JSON-encoded, except bytes which are served as they are.
+    Routes in ``limits`` allow that many (requests, per seconds) like a venue:
+    requests over the limit get a 429 with Retry-After, and requests that
+    ignore the Retry-After get a 418 ban of ``ban`` seconds.
+
+    With ``compress`` bodies are gzipped for clients that accept it, and with
+    ``etags`` unchanged bodies are answered 304 Not Modified. List payloads of
+    routes in ``filters`` honour a Binance-style ``symbols=[...]`` query on
+    the ticker key the route maps to. Like Binance, a query naming a symbol
+    the payload doesn't list is answered 400.
+    """
+
+    def __init__(self, payloads, delays=None, limits=None, ban=5, compress=False, etags=False, filters=None):
+        self.payloads = payloads
+        self.routes = {
+            route: payload if isinstance(payload, bytes) else json.dumps(payload).encode()
+            for route, payload in payloads.items()
+        }
+        self.compress = compress
+        self.etags = etags
+        self.filters = dict(filters or {})
+        self.sent = {route: 0 for route in self.routes}  # Body bytes written per route
+        self.delays = dict(delays or {})
+        self.limits = dict(limits or {})
+        self.ban = ban
+        self.windows = {}  # route -> (window start, requests in the window)
+        self.blocked = {}  # route -> monotonic time its Retry-After ends
+        self.hits = {route: 0 for route in self.routes}
+        self.refused = {route: {} for route in self.routes}  # route -> HTTP status -> responses
+        self.lock = threading.Lock()
+        stub = self
+
+        class Handler(BaseHTTPRequestHandler):
+            protocol_version = 'HTTP/1.1'
+            # Headers and body are separate writes, which Nagle and delayed ACKs would stall by 40 ms
+            disable_nagle_algorithm = True
+
+            def do_GET(self):
+                route, _, query = self.path.partition('?')
+                route = route.strip('/')
+                body = stub.body(route, query)
+                if body is None:
+                    self.send_error(404)
+                    return
+                with stub.lock:
+                    stub.hits[route] += 1
+                if body is INVALID_SYMBOL:
+                    stub.refuse(route, 400)
+                    self.send_response(400)
+                    self.send_header('Content-Type', 'application/json')
+                    self.send_header('Content-Length', str(len(body)))
+                    self.end_headers()
+                    self.wfile.write(body)
+                    return
+                status, retry_after = stub.admit(route)
+                if status is not None:
+                    self.send_response(status)
+                    self.send_header('Retry-After', str(math.ceil(retry_after)))
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                time.sleep(stub.delays.get(route, 0))
+                etag = f'"{zlib.crc32(body):08x}"' if stub.etags else None
+                if etag is not None and self.headers.get('If-None-Match') == etag:
+                    self.send_response(304)
+                    self.send_header('ETag', etag)
+                    self.send_header('Content-Length', '0')
+                    self.end_headers()
+                    return
+                self.send_response(200)
+                self.send_header('Content-Type', 'application/json')
+                if etag is not None:
+                    self.send_header('ETag', etag)
+                if stub.compress and 'gzip' in self.headers.get('Accept-Encoding', ''):
+                    body = gzip.compress(body, compresslevel=6)
+                    self.send_header('Content-Encoding', 'gzip')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+                with stub.lock:
+                    stub.sent[route] += len(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer(('127.0.0.1', 0), Handler)
+        self.httpd.daemon_threads = True
+        self.url = f"http://127.0.0.1:{self.httpd.server_address[1]}"
+        self.thread = threading.Thread(target=self.httpd.serve_forever, daemon=True)
+
+    def __enter__(self):
+        self.thread.start()
+        return self
+
+    def __exit__(self, *exc):
+        self.httpd.shutdown()
+        self.httpd.server_close()
+
+    def reset_hits(self):
+        with self.lock:
+            self.hits = {route: 0 for route in self.routes}
+            self.refused = {route: {} for route in self.routes}
+            self.sent = {route: 0 for route in self.routes}
+
+    def body(self, route, query):
+        """Uncompressed body of a request, None for unknown routes"""
+        key = self.filters.get(route)
+        symbols = parse_qs(query).get('symbols') if key else None
+        if not symbols:
+            return self.routes.get(route)
+        wanted = set(json.loads(symbols[0]))
+        rows = [row for row in self.payloads[route] if row[key] in wanted]
+        if len(rows) < len(wanted):
+            return INVALID_SYMBOL
+        return json.dumps(rows).encode()
+
+    def refuse(self, route, status):
+        with self.lock:
+            refused = self.refused[route]
+            refused[status] = refused.get(status, 0) + 1
+
+    def admit(self, route):
+        """(status, Retry-After) refusing a request to a rate limited route, (None, None) to serve it"""
+        limit = self.limits.get(route)
+        if limit is None:
+            return None, None
+        with self.lock:
+            now = time.monotonic()
+            if now < self.blocked.get(route, 0):
+                status, retry_after = 418, self.ban
+            else:
+                requests, seconds = limit
+                start, count = self.windows.get(route, (now, 0))
+                if now - start >= seconds:
+                    start, count = now, 0
+                self.windows[route] = (start, count + 1)
+                if count < requests:
+                    return None, None
+                status, retry_after = 429, start + seconds - now
+            self.blocked[route] = now + retry_after
+        self.refuse(route, status)
+        return status, retry_after
+
+
+def point_at_stub(arbitrage, stub):
+    """Redirect every exchange endpoint of a scanner to the stub server"""
+    for exchange, adapter in arbitrage.exchanges.items():
+        adapter.url = f"{stub.url}/{exchange}"
+        adapter.depth_endpoint = f"{stub.url}/depth/{exchange}/{{symbol}}?limit={{limit}}"
+
+
+def synthetic_depth(exchange, quote, rng, levels=20):
+    """An order book payload in an exchange's format around a parsed quote"""
+    bids, asks = [], []
+    for side, best, direction in ((bids, quote.bid, -1), (asks, quote.ask, 1)):
+        price = best
+        for _ in range(levels):
+            side.append([f"{price:.10g}", f"{rng.uniform(20, 600) / price:.10g}"])  # $20-600 per level
+            price *= 1 + direction * rng.uniform(0.0005, 0.002)
+    if exchange in ('Binance', 'MEXC'):
+        return {'bids': bids, 'asks': asks}
+    if exchange == 'Bybit':
+        return {'retCode': 0, 'result': {'b': bids, 'a': asks}}
+    if exchange == 'OKX':
+        return {'code': '0', 'data': [{'bids': [b + ['0', '1'] for b in bids], 'asks': [a + ['0', '1'] for a in asks]}]}
+    return {'code': '200000', 'data': {'bids': bids, 'asks': asks}}
+
+
+@contextlib.contextmanager
+def quiet():
+    """Silence the scanner's progress prints while timing"""
+    with contextlib.redirect_stdout(io.StringIO()):
+        yield
+
+
+def bench_fetch(args):
+    """Sequential vs concurrent wall-clock for one full price scan"""
+    delays = {exchange: args.delay for exchange in EXCHANGES}
+    delays['LBank'] = args.stall  # LBank is the venue that usually stalls
+
+    with StubServer(synthetic_payloads(args.pairs), delays) as stub:
+        arbitrage = DirectArbitrage(symbols_cache=None)
+        arbitrage.scan_deadline = args.deadline
+        point_at_stub(arbitrage, stub)
+
+        with quiet():
+            start = time.perf_counter()
+            for exchange in arbitrage.exchanges:
+                arbitrage.fetch_exchange_prices(exchange)
+            sequential = time.perf_counter() - start
+
+            start = time.perf_counter()
+            prices = arbitrage.get_exchange_prices()
+            concurrent = time.perf_counter() - start
+
+        print(f"pairs per exchange: {args.pairs}, delay {args.delay}s, LBank stall {args.stall}s")
+        print(f"sequential scan:    {sequential:.3f}s")
+        print(f"concurrent scan:    {concurrent:.3f}s (deadline {args.deadline}s)")
+        print(f"speedup:            {sequential / concurrent:.1f}x")
+        print(f"stale exchanges:    {sorted(arbitrage.stale_exchanges) or 'none'}")
+        print(f"pairs fetched:      {sum(len(p) for p in prices.values())}")
+        arbitrage.close()
+
+
+def bench_backends(args):
+    """Scans per second of the threads backend vs the asyncio backend"""
+    delays = {route: args.delay for route in synthetic_payloads(1)}
+
+    with StubServer(synthetic_payloads(args.pairs), delays) as stub:
+        for backend in DirectArbitrage.BACKENDS:
+            arbitrage = DirectArbitrage(backend=backend, cache_duration=0, symbols_cache=None)
+            point_at_stub(arbitrage, stub)
+            with quiet():
+                arbitrage.find_arbitrage_opportunities()  # Warm up connections
+                start = time.perf_counter()
+                for _ in range(args.scans):
+                    arbitrage.find_arbitrage_opportunities()
+                elapsed = time.perf_counter() - start
+            print(f"{backend:8s} {args.scans / elapsed:6.2f} scans/sec ({elapsed / args.scans * 1000:.0f} ms/scan)")
+            arbitrage.close()
+
+
+def bench_cache(args):
+    """Outbound requests of a refresh loop with and without the snapshot cache"""
+    with StubServer(synthetic_payloads(args.pairs)) as stub:
+        for ttl in (0, args.ttl):
+            stub.reset_hits()
+            arbitrage = DirectArbitrage(cache_duration=ttl, symbols_cache=None)
+            point_at_stub(arbitrage, stub)
+            with quiet():
+                for _ in range(args.refreshes):
+                    arbitrage.find_arbitrage_opportunities()
+                    time.sleep(args.interval)
+            stats = arbitrage.cache_stats()
+            print(f"ttl {ttl:>4}s: {sum(stub.hits.values()):4d} requests, "
+                  f"{stats['hits']} hits / {stats['misses']} misses")
+            arbitrage.close()
+
+
+def bench_parse(args):
+    """Parse throughput of every exchange adapter on its own payload"""
+    payloads = synthetic_payloads(args.pairs)
+    for name, adapter_cls in ADAPTERS.items():
+        adapter = adapter_cls()
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            prices = adapter.parse(payloads[name])
+        elapsed = (time.perf_counter() - start) / args.repeat
+        print(f"{name:8s} {len(prices):6d} pairs  {elapsed * 1000:7.2f} ms  "
+              f"{args.pairs / elapsed / 1000:8.1f}k tickers/sec")
+
+
+def bench_requests(args):
+    """HTTP requests each exchange costs per scan, counted by the stub"""
+    with StubServer(synthetic_payloads(args.pairs)) as stub:
+        arbitrage = DirectArbitrage(cache_duration=0, symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        with quiet():
+            for _ in range(args.scans):
+                arbitrage.find_arbitrage_opportunities()
+        for exchange, adapter in arbitrage.exchanges.items():
+            print(f"{exchange:8s} {stub.hits[exchange] / args.scans:.1f} requests/scan")
+            assert stub.hits[exchange] == args.scans * len(adapter.urls()), \
+                f"{exchange} made {stub.hits[exchange]} requests in {args.scans} scans"
+        arbitrage.close()
+
+
+def bench_compute(args):
+    """Pure Python vs NumPy opportunity search on synthetic price tables"""
+    for exchanges in args.exchanges:
+        prices = synthetic_prices(exchanges, args.pairs)
+        timings = {}
+        results = {}
+        for compute in DirectArbitrage.COMPUTE_ENGINES:
+            arbitrage = synthetic_scanner(prices, compute=compute)
+            start = time.perf_counter()
+            for _ in range(args.repeat):
+                results[compute] = arbitrage.compute_opportunities(prices)
+            timings[compute] = (time.perf_counter() - start) / args.repeat
+            arbitrage.close()
+
+        key = lambda op: (op.pair, op.buy_exchange, op.sell_exchange)
+        expected = sorted(results['python'], key=key)
+        print(f"{exchanges:3d} exchanges: python {timings['python'] * 1000:8.1f} ms, "
+              f"numpy {timings['numpy'] * 1000:7.1f} ms, "
+              f"speedup {timings['python'] / timings['numpy']:5.1f}x, "
+              f"{len(results['numpy'])} opportunities")
+        for compute, result in results.items():
+            assert sorted(result, key=key) == expected, f"{compute} differs from the python engine"
+
+
+def bench_incremental(args):
+    """Full recomputation vs incremental update after one exchange changes"""
+    rng = random.Random(1)
+    prices = synthetic_prices(args.exchanges, args.pairs)
+    full = synthetic_scanner(prices)
+    incremental = synthetic_scanner(prices, compute='incremental')
+    incremental.compute_opportunities(prices)
+
+    full_time = incremental_time = 0
+    for _ in range(args.updates):
+        # One venue ticks: move a handful of its pairs
+        exchange = rng.choice(list(prices))
+        snapshot = dict(prices[exchange])
+        for pair in rng.sample(list(snapshot), args.changed):
+            move = rng.uniform(0.997, 1.003)
+            quote = snapshot[pair]
+            snapshot[pair] = PriceQuote(quote.bid * move, quote.ask * move, quote.original_symbol)
+        prices = dict(prices, **{exchange: snapshot})
+
+        start = time.perf_counter()
+        expected = full.compute_opportunities(prices)
+        full_time += time.perf_counter() - start
+        start = time.perf_counter()
+        result = incremental.compute_opportunities(prices)
+        incremental_time += time.perf_counter() - start
+        assert [op.profit_percent for op in result] == [op.profit_percent for op in expected]
+
+    print(f"{args.exchanges} exchanges, {args.pairs} pairs, {args.changed} pairs changed per update")
+    print(f"full recompute: {full_time / args.updates * 1000:8.2f} ms/update")
+    print(f"incremental:    {incremental_time / args.updates * 1000:8.2f} ms/update")
+    full.close()
+    incremental.close()
+
+
+def bench_stream(args):
+    """Tick-to-opportunity latency of the streaming mode against a replay server"""
+    from streaming import ReplayServer
+
+    with StubServer(synthetic_payloads(args.pairs)) as stub, \
+            ReplayServer(synthetic_ws_messages(args.pairs), rate=args.rate) as replay:
+        arbitrage = DirectArbitrage(symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        for exchange in replay.messages:
+            arbitrage.exchanges[exchange].ws_url = replay.url(exchange)
+
+        with quiet():
+            stream = arbitrage.start_streaming(poll_interval=1)
+            time.sleep(args.seconds)
+            stats = stream.latency_stats()
+            connected = sorted(stream.connected)
+            opportunities = len(arbitrage.find_arbitrage_opportunities())
+            arbitrage.close()
+
+        print(f"streamed exchanges: {', '.join(connected)}")
+        print(f"ticks applied:      {stats.get('ticks', 0)} ({stats.get('ticks', 0) / args.seconds:.0f}/sec)")
+        if stats:
+            print(f"tick->opportunity:  p50 {stats['p50']:.3f} ms, p90 {stats['p90']:.3f} ms, "
+                  f"p99 {stats['p99']:.3f} ms, max {stats['max']:.3f} ms")
+        print(f"live opportunities: {opportunities}")
+
+
+STARTUP_SCRIPTS = {
+    'headless': (
+        "import direct_arbitrage, sys\n"
+        "direct_arbitrage.DirectArbitrage(symbols_cache=None).close()\n"
+        "assert 'PyQt6' not in sys.modules"
+    ),
+    'gui': (
+        "from PyQt6.QtWidgets import QApplication\n"
+        "app = QApplication([])\n"
+        "import arbitrage_gui\n"
+        "window = arbitrage_gui.DirectArbitrageGUI()\n"
+        "window.close()"
+    ),
+}
+
+
+def bench_startup(args):
+    """Cold-start time of a headless scanner vs the GUI, in fresh interpreters"""
+    env = dict(os.environ, QT_QPA_PLATFORM=os.environ.get('QT_QPA_PLATFORM', 'offscreen'))
+    here = os.path.dirname(os.path.abspath(__file__))
+    results = {}
+    for mode, script in STARTUP_SCRIPTS.items():
+        timings = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            subprocess.run([sys.executable, '-c', script], cwd=here, env=env, check=True,
+                           stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+            timings.append(time.perf_counter() - start)
+        results[mode] = sorted(timings)[len(timings) // 2]
+        print(f"{mode:<9} median {results[mode] * 1000:7.1f} ms over {args.runs} runs")
+    print(f"headless starts {results['gui'] / results['headless']:.1f}x faster")
+
+
+def fill_table_widget(table, opportunities):
+    """The per-refresh QTableWidget rebuild the GUI used before its item model"""
+    from PyQt6.QtCore import Qt
+    from PyQt6.QtGui import QColor
+    from PyQt6.QtWidgets import QTableWidgetItem
+    from opportunity_model import COLUMNS
+
+    table.setRowCount(len(opportunities))
+    for i, op in enumerate(opportunities):
+        for col, (_, item_type, formatter) in enumerate(COLUMNS):
+            item = QTableWidgetItem(formatter(op))
+            item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
+            item.setForeground(QColor("#4CAF50"))
+            if item_type == 'profit':
+                font = item.font()
+                font.setBold(True)
+                item.setFont(font)
+            table.setItem(i, col, item)
+        table.setRowHeight(i, 40)
+
+
+def bench_table(args):
+    """Opportunities table refresh: QTableWidget rebuild vs diffed item model"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    from PyQt6.QtWidgets import QApplication, QTableView, QTableWidget
+    from opportunity_model import COLUMNS, OpportunityTableModel
+
+    app = QApplication.instance() or QApplication([])
+    rng = random.Random(2)
+    prices = synthetic_prices(args.exchanges, args.pairs)
+    arbitrage = synthetic_scanner(prices, compute='incremental')
+    refreshes = [arbitrage.compute_opportunities(prices)]
+    for _ in range(args.refreshes):
+        exchange = rng.choice(list(prices))
+        snapshot = dict(prices[exchange])
+        for pair in rng.sample(list(snapshot), args.changed):
+            move = rng.uniform(0.997, 1.003)
+            quote = snapshot[pair]
+            snapshot[pair] = PriceQuote(quote.bid * move, quote.ask * move, quote.original_symbol)
+        prices = dict(prices, **{exchange: snapshot})
+        refreshes.append(arbitrage.compute_opportunities(prices))
+    arbitrage.close()
+
+    widget = QTableWidget()
+    widget.setColumnCount(len(COLUMNS))
+    model = OpportunityTableModel()
+    view = QTableView()
+    view.setModel(model)
+    view.verticalHeader().setDefaultSectionSize(40)
+    timings = {}
+    for name, table, refresh in [('widget', widget, lambda ops: fill_table_widget(widget, ops)),
+                                 ('model', view, model.update)]:
+        table.resize(1200, 700)
+        table.show()
+        refresh(refreshes[0])
+        app.processEvents()
+        start = time.perf_counter()
+        for opportunities in refreshes[1:]:
+            refresh(opportunities)
+            app.processEvents()  # Includes the repaint
+        timings[name] = (time.perf_counter() - start) / args.refreshes
+        table.hide()
+
+    print(f"rows per refresh:  {len(refreshes[-1])}")
+    print(f"QTableWidget:      {timings['widget'] * 1000:8.1f} ms per refresh")
+    print(f"item model (diff): {timings['model'] * 1000:8.1f} ms per refresh")
+    print(f"speedup:           {timings['widget'] / timings['model']:8.1f}x")
+
+
+def traced(build):
+    """Run ``build`` under tracemalloc, returning (retained bytes, peak bytes, live blocks)"""
+    gc.collect()
+    tracemalloc.start()
+    blocks = sys.getallocatedblocks()
+    result = build()
+    blocks = sys.getallocatedblocks() - blocks
+    current, peak = tracemalloc.get_traced_memory()
+    tracemalloc.stop()
+    del result
+    return current, peak, blocks
+
+
+def dict_opportunity(pair, buy_exchange, sell_exchange, buy_price, sell_price,
+                     profit_percent, profit_amount, investment,
+                     original_buy_symbol, original_sell_symbol,
+                     buy_fee, sell_fee, coins_bought, final_amount):
+    """An opportunity in the 14-key dict shape the engines used to build"""
+    return {
+        'pair': pair,
+        'buy_exchange': buy_exchange,
+        'sell_exchange': sell_exchange,
+        'buy_price': buy_price,
+        'sell_price': sell_price,
+        'profit_percent': profit_percent,
+        'profit_amount': profit_amount,
+        'investment': investment,
+        'original_buy_symbol': original_buy_symbol,
+        'original_sell_symbol': original_sell_symbol,
+        'buy_fee': buy_fee,
+        'sell_fee': sell_fee,
+        'coins_bought': coins_bought,
+        'final_amount': final_amount
+    }
+
+
+def bench_memory(args):
+    """Memory and allocations of slotted records vs the dicts they replaced"""
+    prices = synthetic_prices(args.exchanges, args.pairs)
+    arbitrage = synthetic_scanner(prices)
+    opportunities = arbitrage.compute_opportunities(prices)
+    arbitrage.close()
+
+    # Both shapes are built from the same values, so only the containers differ
+    quotes = {
+        exchange: [(pair, quote.bid, quote.ask, quote.original_symbol) for pair, quote in table.items()]
+        for exchange, table in prices.items()
+    }
+    fields = [opportunity.values() for opportunity in opportunities]
+    builds = {
+        'quotes': {
+            'dict': lambda: {
+                exchange: {
+                    pair: {'bid': bid, 'ask': ask, 'original_symbol': symbol}
+                    for pair, bid, ask, symbol in rows
+                }
+                for exchange, rows in quotes.items()
+            },
+            'slots': lambda: {
+                exchange: {pair: PriceQuote(bid, ask, symbol) for pair, bid, ask, symbol in rows}
+                for exchange, rows in quotes.items()
+            },
+        },
+        'opportunities': {
+            'dict': lambda: [dict_opportunity(*values) for values in fields],
+            'slots': lambda: [Opportunity(*values) for values in fields],
+        },
+    }
+
+    counts = {'quotes': sum(len(rows) for rows in quotes.values()), 'opportunities': len(fields)}
+    for name, shapes in builds.items():
+        print(f"{counts[name]} {name}:")
+        results = {shape: traced(build) for shape, build in shapes.items()}
+        for shape, (current, peak, blocks) in results.items():
+            print(f"  {shape:<5} retained {current / 2 ** 20:7.2f} MiB, peak {peak / 2 ** 20:7.2f} MiB, "
+                  f"{blocks:>8} live allocations")
+        print(f"  slots use {results['dict'][0] / results['slots'][0]:.1f}x less memory")
+
+
+def bench_symbols(args):
+    """Symbol normalization and display formatting: per-ticker work vs registry lookups"""
+    payloads = synthetic_payloads(args.pairs)
+    arbitrage = DirectArbitrage(symbols_cache=None)
+    registry = SymbolRegistry()
+    raw = []
+    for exchange, adapter in arbitrage.exchanges.items():
+        symbols = [adapter.quote(ticker)[0] for ticker in adapter.rows(payloads[exchange])]
+        for symbol, (base, quote, _) in zip(symbols, synthetic_tickers(args.pairs)):
+            registry.add(exchange, symbol, base, quote)
+        raw.extend((adapter, symbol) for symbol in symbols)
+    registry.install(arbitrage)
+    pairs = list(registry.display)
+
+    def timed(run):
+        start = time.perf_counter()
+        for _ in range(args.repeat):
+            run()
+        return (time.perf_counter() - start) / args.repeat
+
+    normalize = timed(lambda: [normalize_pair(symbol) for _, symbol in raw])
+    lookup = timed(lambda: [adapter.pair(symbol) for adapter, symbol in raw])
+    split = timed(lambda: [arbitrage.split_pair(pair) for pair in pairs])
+    display = timed(lambda: [arbitrage.display_pair(pair) for pair in pairs])
+    arbitrage.close()
+
+    print(f"{len(raw)} raw symbols, {len(pairs)} pairs")
+    print(f"normalize_pair:     {normalize * 1000:7.2f} ms, registry lookup {lookup * 1000:7.2f} ms "
+          f"({normalize / lookup:.1f}x)")
+    print(f"quote suffix scan:  {split * 1000:7.2f} ms, precomputed     {display * 1000:7.2f} ms "
+          f"({split / display:.1f}x)")
+
+    registry.add('Binance', 'USDTTRY', 'USDT', 'TRY')
+    registry.install(arbitrage)
+    print(f"USDTTRY: registry {arbitrage.exchanges['Binance'].pair('USDTTRY')} "
+          f"({arbitrage.display_pair('USDTTRY')})")
+
+
+def bench_decode(args):
+    """Decode time and peak memory per exchange payload: stdlib json vs the fast path"""
+    bodies = {name: json.dumps(payload).encode() for name, payload in synthetic_payloads(args.pairs).items()}
+    if args.recorded:
+        # Recorded ticker payloads saved as <Exchange>.json replace the synthetic ones
+        for name in list(bodies):
+            path = os.path.join(args.recorded, f"{name}.json")
+            if os.path.exists(path):
+                with open(path, 'rb') as f:
+                    bodies[name] = f.read()
+
+    decoders = {
+        'text+json': lambda body: json.loads(body.decode('utf-8')),  # What response.json() does
+        'json': json.loads,
+    }
+    if fast_json.orjson is not None:
+        decoders['orjson'] = fast_json.orjson.loads
+    print(f"fast path decoder: {fast_json.DECODER}")
+    print(f"{'exchange':8s} {'size':>8s}  " + "  ".join(f"{name:>20s}" for name in decoders))
+    for name, body in bodies.items():
+        cells = []
+        for decode in decoders.values():
+            timings = []
+            for _ in range(args.repeat):
+                start = time.perf_counter()
+                decode(body)
+                timings.append(time.perf_counter() - start)
+            _, peak, _ = traced(lambda: decode(body))
+            elapsed = sorted(timings)[len(timings) // 2]
+            cells.append(f"{elapsed * 1000:7.2f} ms {peak / 2 ** 20:6.1f} MiB")
+        print(f"{name:8s} {len(body) / 2 ** 20:6.2f}MB  " + "  ".join(f"{cell:>20s}" for cell in cells))
+
+
+def bench_depth(args):
+    """Top-of-book screen vs depth re-pricing, and sequential vs concurrent book fetches"""
+    from depth_engine import DepthEngine
+
+    rng = random.Random(3)
+    payloads = synthetic_payloads(args.pairs)
+    routes = dict(payloads)
+    for name, adapter_cls in ADAPTERS.items():
+        for quote in adapter_cls().parse(payloads[name]).values():
+            routes[f"depth/{name}/{quote.original_symbol}"] = synthetic_depth(name, quote, rng)
+    delays = {route: args.latency for route in routes if route.startswith('depth/')}
+
+    with StubServer(routes, delays) as stub:
+        arbitrage = DirectArbitrage(symbols_cache=None)
+        arbitrage.investment = args.investment
+        point_at_stub(arbitrage, stub)
+        with quiet():
+            top = arbitrage.find_arbitrage_opportunities()
+        engine = DepthEngine(arbitrage, max_candidates=args.candidates)
+        candidates = top[:args.candidates]
+        keys = {(op.buy_exchange, op.original_buy_symbol) for op in candidates}
+        keys |= {(op.sell_exchange, op.original_sell_symbol) for op in candidates}
+
+        start = time.perf_counter()
+        for exchange, symbol in keys:
+            engine.fetch_book(exchange, symbol)
+        sequential = time.perf_counter() - start
+        start = time.perf_counter()
+        refined = engine.refine(top)
+        concurrent = time.perf_counter() - start
+        engine.close()
+        arbitrage.close()
+
+    print(f"investment ${args.investment:.0f}, {len(keys)} books for {len(candidates)} candidates, "
+          f"{args.latency * 1000:.0f} ms per book request")
+    print(f"top-of-book opportunities:  {len(top)} ({len(candidates)} re-priced)")
+    print(f"profitable at depth:        {len(refined)}")
+    for op in refined[:3]:
+        print(f"  {op.pair:12s} {op.buy_exchange:>7s} -> {op.sell_exchange:<7s} "
+              f"top {op.top_profit_percent:.2f}% -> vwap {op.profit_percent:.2f}%, "
+              f"max size ${op.max_size:.0f} (+${op.max_profit_amount:.2f})")
+    print(f"book fetches: sequential {sequential * 1000:.0f} ms, concurrent {concurrent * 1000:.0f} ms "
+          f"({sequential / concurrent:.1f}x)")
+
+
+def bench_record(args):
+    """Sustained recorder writes/sec, cost added to a scan, and mmap read speed"""
+    from recorder import Recorder, read_blocks
+
+    prices = synthetic_prices(args.exchanges, args.pairs)
+    arbitrage = synthetic_scanner(prices)
+    opportunities = arbitrage.compute_opportunities(prices)
+    arbitrage.close()
+    rows_per_scan = sum(len(table) for table in prices.values()) + len(opportunities)
+
+    for compress in (False, True):
+        directory = tempfile.mkdtemp(prefix='recorder-')
+        recorder = Recorder(directory, compress=compress, max_bytes=args.segment_mb * 2 ** 20)
+        enqueue = []
+        start = time.perf_counter()
+        for scan in range(args.scans):
+            # Wait for the writer instead of dropping, to measure its sustained rate
+            while recorder.queue.qsize() > recorder.queue.maxsize - len(prices) - 1:
+                time.sleep(0.001)
+            stamp = time.time()
+            began = time.perf_counter()
+            for exchange, table in prices.items():
+                recorder.record_snapshot(exchange, table, stamp)
+            recorder.record_opportunities(opportunities, stamp)
+            enqueue.append(time.perf_counter() - began)
+        recorder.close()
+        elapsed = time.perf_counter() - start
+        segments = os.listdir(directory)
+        size = sum(os.path.getsize(os.path.join(directory, name)) for name in segments)
+
+        start = time.perf_counter()
+        read = sum(len(block['bid']) for block in read_blocks(directory, 'snapshots'))
+        read_time = time.perf_counter() - start
+        shutil.rmtree(directory)
+
+        print(f"{'zlib' if compress else 'raw':4s}: {recorder.rows_written} rows in {elapsed:.2f}s, "
+              f"{recorder.rows_written / elapsed:,.0f} rows/s sustained "
+              f"({recorder.rows_written / recorder.busy:,.0f} rows/s writer busy time), "
+              f"{recorder.dropped} dropped")
+        print(f"      {size / recorder.rows_written:.1f} bytes/row, {size / 2 ** 20:.1f} MiB in "
+              f"{len(segments)} segments; "
+              f"scan thread cost {sorted(enqueue)[len(enqueue) // 2] * 1e6:.0f} us per scan "
+              f"({rows_per_scan} rows); mmap read {read / read_time:,.0f} snapshot rows/s")
+
+
+def synthetic_recording(directory, pairs, ticks, changed, seed=0):
+    """Record ``ticks`` 1-second snapshots of every exchange, moving ``changed`` quotes per tick"""
+    from recorder import Recorder
+
+    rng = random.Random(seed)
+    tables = dict(zip(EXCHANGES, synthetic_prices(len(EXCHANGES), pairs, seed=seed).values()))
+    recorder = Recorder(directory, queue_size=len(EXCHANGES) * 4)
+    origin = 1_700_000_000.0
+    for tick in range(ticks):
+        for exchange, table in tables.items():
+            table = dict(table)
+            for pair in rng.sample(list(table), min(changed, len(table))):
+                quote = table[pair]
+                move = rng.uniform(0.998, 1.002)
+                table[pair] = PriceQuote(quote.bid * move, quote.ask * move, quote.original_symbol)
+            tables[exchange] = table
+            while recorder.queue.full():
+                time.sleep(0.001)
+            recorder.record_snapshot(exchange, table, origin + tick)
+    recorder.close()
+
+
+def bench_replay(args):
+    """Replay throughput of a synthetic 1-second recording, single process vs sharded"""
+    from replay import replay
+
+    directory = tempfile.mkdtemp(prefix='replay-')
+    try:
+        start = time.perf_counter()
+        synthetic_recording(directory, args.pairs, args.ticks, args.changed)
+        print(f"recorded {args.ticks} ticks x {len(EXCHANGES)} exchanges x {args.pairs} pairs "
+              f"in {time.perf_counter() - start:.1f}s")
+        results = {}
+        for workers in args.workers:
+            start = time.perf_counter()
+            with quiet():
+                result = replay(directory, workers=workers, min_profit=args.min_profit, compute=args.compute)
+            elapsed = time.perf_counter() - start
+            results[workers] = result['runs']
+            rate = result['scans'] / elapsed
+            print(f"{workers:2d} worker(s): {result['scans']} scans in {elapsed:6.2f}s, {rate:6.0f} scans/s, "
+                  f"a day of 1s snapshots in {86400 / rate / 60:5.1f} min; "
+                  f"{result['opportunities']} opportunities, {len(result['runs'])} spreads")
+        expected = results[args.workers[0]]
+        for workers, runs in results.items():
+            assert runs == expected, f"{workers} worker(s) found other spread runs than {args.workers[0]}"
+    finally:
+        shutil.rmtree(directory)
+
+
+def bench_graph(args):
+    """Multi-hop cycle search over the full fixture ticker universe, rebuilt vs incremental"""
+    from benchmark_suite import load_fixtures, scaled_venues
+    from graph_engine import GraphEngine
+
+    rng = random.Random(2)
+    bodies = load_fixtures()
+    for copies in args.copies:
+        venues = scaled_venues(bodies, ticker_copies=copies)
+        arbitrage = DirectArbitrage(symbols_cache=None)
+        arbitrage.min_profit_percent = args.min_profit
+        prices = {
+            name: adapter_cls().parse(fast_json.loads(body)) for name, (adapter_cls, body) in venues.items()
+        }
+        tickers = sum(len(table) for table in prices.values())
+        for hops in args.hops:
+            for cross in (True, False):
+                engine = GraphEngine(arbitrage, max_hops=hops, cross_exchange=cross)
+                start = time.perf_counter()
+                engine.update(prices)
+                build = time.perf_counter() - start
+                start = time.perf_counter()
+                cycles = engine.opportunities(prices)
+                search = time.perf_counter() - start
+
+                # One venue ticks per update: move a handful of its quotes
+                moved = prices
+                incremental = 0
+                for _ in range(args.updates):
+                    exchange = rng.choice(list(moved))
+                    snapshot = dict(moved[exchange])
+                    for pair in rng.sample(list(snapshot), args.changed):
+                        move = rng.uniform(0.997, 1.003)
+                        quote = snapshot[pair]
+                        snapshot[pair] = PriceQuote(quote.bid * move, quote.ask * move, quote.original_symbol)
+                    moved = dict(moved, **{exchange: snapshot})
+                    start = time.perf_counter()
+                    engine.opportunities(moved)
+                    incremental += time.perf_counter() - start
+
+                print(f"{tickers:6d} tickers, {hops} hops, {'cross-exchange' if cross else 'per exchange  '}: "
+                      f"{len(engine.adjacency):5d} nodes, {engine.edge_count():6d} edges, "
+                      f"build {build * 1000:7.1f} ms, search {search * 1000:7.1f} ms, "
+                      f"update+search {incremental / args.updates * 1000:6.1f} ms, {len(cycles)} cycles")
+        arbitrage.close()
+
+
+def bench_shards(args):
+    """Single process vs sharded opportunity search, 1 to N worker processes"""
+    prices = synthetic_prices(args.exchanges, args.pairs)
+    key = lambda op: (op.pair, op.buy_exchange, op.sell_exchange)
+
+    arbitrage = synthetic_scanner(prices)
+    start = time.perf_counter()
+    for _ in range(args.repeat):
+        expected = arbitrage.compute_opportunities(prices)
+    baseline = (time.perf_counter() - start) / args.repeat
+    arbitrage.close()
+    print(f"{args.exchanges} exchanges, {args.pairs} pairs, {os.cpu_count()} cores, "
+          f"{len(expected)} opportunities")
+    print(f"python:             {baseline * 1000:8.1f} ms/scan")
+
+    rng = random.Random(1)
+    for workers in args.workers:
+        arbitrage = synthetic_scanner(prices, compute='sharded', workers=workers)
+        start = time.perf_counter()
+        result = arbitrage.compute_opportunities(prices)  # Starts the pool and packs every exchange
+        first = time.perf_counter() - start
+        assert sorted(result, key=key) == sorted(expected, key=key), f"{workers} worker(s) differ from python"
+
+        start = time.perf_counter()
+        moved = prices
+        for _ in range(args.repeat):
+            # One venue ticks between scans, so only its column is rewritten
+            exchange = rng.choice(list(moved))
+            snapshot = dict(moved[exchange])
+            for pair in rng.sample(list(snapshot), args.changed):
+                quote = snapshot[pair]
+                snapshot[pair] = PriceQuote(quote.bid, quote.ask, quote.original_symbol)
+            moved = dict(moved, **{exchange: snapshot})
+            result = arbitrage.compute_opportunities(moved)
+        elapsed = (time.perf_counter() - start) / args.repeat
+        # Rewritten quotes keep their prices, so patched shards must still agree
+        assert sorted(result, key=key) == sorted(expected, key=key), f"{workers} worker(s) drifted from python"
+        print(f"sharded {workers:2d} worker(s): {elapsed * 1000:8.1f} ms/scan, "
+              f"{baseline / elapsed:5.2f}x python, first scan {first * 1000:7.1f} ms")
+        arbitrage.close()
+
+
+def bench_ratelimit(args):
+    """429s, bans and fresh snapshots of a refresh loop against rate limited venues"""
+    limits = {exchange: (args.requests, args.window) for exchange in EXCHANGES}
+    print(f"every venue allows {args.requests} requests per {args.window:g}s, "
+          f"polled every {args.interval:g}s for {args.seconds:g}s")
+    # ignore: no governor; backoff: real budgets, learning from 429s; budget: budgets match the stub
+    for mode in ('ignore', 'backoff', 'budget'):
+        with StubServer(synthetic_payloads(args.pairs), limits=limits, ban=args.ban) as stub:
+            arbitrage = DirectArbitrage(symbols_cache=None)
+            point_at_stub(arbitrage, stub)
+            governor = arbitrage.governor
+            governor.enabled = mode != 'ignore'
+            if mode == 'budget':
+                for adapter in arbitrage.exchanges.values():
+                    adapter.rate_limit = (args.requests * adapter.request_weights.get('tickers', 1), args.window)
+            scheduler = RefreshScheduler(arbitrage, interval=args.interval)
+            with quiet():
+                scheduler.start()
+                time.sleep(args.seconds)
+                scheduler.stop()
+            arbitrage.close()
+            report = governor.report()
+
+        requests = sum(stub.hits.values())
+        too_many = sum(refused.get(429, 0) for refused in stub.refused.values())
+        banned = sum(refused.get(418, 0) for refused in stub.refused.values())
+        held = sum(usage['held'] for usage in report.values())
+        stretch = max((usage['stretch'] for usage in report.values()), default=1)
+        print(f"{mode:8s} {requests:4d} requests, {requests - too_many - banned:4d} snapshots, "
+              f"{too_many:3d} x 429, {banned:3d} x 418, {held:3d} held back, "
+              f"{scheduler.cycles} scans, max stretch {stretch:g}x")
+        if mode != 'ignore':
+            # The stub bans whoever ignores its Retry-After
+            assert banned == 0, f"{mode}: {banned} requests were sent before Retry-After elapsed"
+
+
+def bench_bandwidth(args):
+    """Bytes per scan with compression, symbol-filtered batches and conditional requests"""
+    full = synthetic_payloads(args.pairs)
+    # Binance lists the whole universe, the other venues only its first --common pairs
+    payloads = dict(synthetic_payloads(args.common), Binance=full['Binance'])
+    print(f"Binance lists {args.pairs} pairs, the others {args.common}; "
+          f"{', '.join(args.moving)} tick between scans, the rest don't")
+    ticks = []
+    for scan in range(args.scans):
+        tick = synthetic_payloads(args.common, seed=scan + 1)
+        tick['Binance'] = synthetic_payloads(args.pairs, seed=scan + 1)['Binance']
+        ticks.append(tick)
+    modes = (
+        ('identity', dict(), False),
+        ('gzip', dict(compress=True), False),
+        ('gzip+filter', dict(compress=True), True),
+        ('gzip+filter+etag', dict(compress=True, etags=True), True),
+    )
+    for mode, options, filtered in modes:
+        with StubServer(payloads, filters={'Binance': 'symbol'}, **options) as stub:
+            arbitrage = DirectArbitrage(cache_duration=0, symbols_cache=None)
+            arbitrage.filter_symbols = filtered
+            point_at_stub(arbitrage, stub)
+            for exchange, adapter in arbitrage.exchanges.items():
+                tickers = synthetic_tickers(len(adapter.rows(payloads[exchange])))
+                for ticker, (base, quote, _) in zip(adapter.rows(payloads[exchange]), tickers):
+                    arbitrage.symbols.add(exchange, adapter.quote(ticker)[0], base, quote)
+            arbitrage.symbols.install(arbitrage)
+            if mode == 'identity':
+                for session in arbitrage.sessions.values():
+                    session.headers['Accept-Encoding'] = 'identity'
+
+            totals = dict.fromkeys(arbitrage.exchanges, 0)
+            elapsed = 0
+            for payload in ticks:
+                for exchange in args.moving:
+                    stub.payloads[exchange] = payload[exchange]
+                    stub.routes[exchange] = json.dumps(payload[exchange]).encode()
+                start = time.perf_counter()
+                with quiet():
+                    arbitrage.get_exchange_prices()
+                elapsed += (time.perf_counter() - start) / args.scans
+                for exchange, wire in arbitrage.metrics.scan_wire().items():
+                    totals[exchange] += wire
+            arbitrage.close()
+        per_scan = {exchange: total / args.scans / 1024 for exchange, total in totals.items()}
+        print(f"{mode:17s} {sum(per_scan.values()):7.1f} KiB/scan, {elapsed * 1000:5.0f} ms/scan  " +
+              ' '.join(f"{exchange} {kib:.0f}" for exchange, kib in per_scan.items()))
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description=__doc__.splitlines()[0])
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    fetch = commands.add_parser('fetch', help=bench_fetch.__doc__)
+    fetch.add_argument('--pairs', type=int, default=2000)
+    fetch.add_argument('--delay', type=float, default=0.2, help='per-exchange latency')
+    fetch.add_argument('--stall', type=float, default=2.0, help='LBank latency')
+    fetch.add_argument('--deadline', type=float, default=1.0, help='scan deadline')
+    fetch.set_defaults(func=bench_fetch)
+
+    backends = commands.add_parser('backends', help=bench_backends.__doc__)
+    backends.add_argument('--pairs', type=int, default=2000)
+    backends.add_argument('--delay', type=float, default=0.02, help='per-request latency')
+    backends.add_argument('--scans', type=int, default=20)
+    backends.set_defaults(func=bench_backends)
+
+    cache = commands.add_parser('cache', help=bench_cache.__doc__)
+    cache.add_argument('--pairs', type=int, default=500)
+    cache.add_argument('--refreshes', type=int, default=20)
+    cache.add_argument('--interval', type=float, default=0.25, help='seconds between refreshes')
+    cache.add_argument('--ttl', type=float, default=1.0)
+    cache.set_defaults(func=bench_cache)
+
+    parse = commands.add_parser('parse', help=bench_parse.__doc__)
+    parse.add_argument('--pairs', type=int, default=5000)
+    parse.add_argument('--repeat', type=int, default=10)
+    parse.set_defaults(func=bench_parse)
+
+    counts = commands.add_parser('requests', help=bench_requests.__doc__)
+    counts.add_argument('--pairs', type=int, default=200)
+    counts.add_argument('--scans', type=int, default=3)
+    counts.set_defaults(func=bench_requests)
+
+    compute = commands.add_parser('compute', help=bench_compute.__doc__)
+    compute.add_argument('--pairs', type=int, default=4000)
+    compute.add_argument('--exchanges', type=int, nargs='+', default=[7, 20, 50])
+    compute.add_argument('--repeat', type=int, default=3)
+    compute.set_defaults(func=bench_compute)
+
+    incremental = commands.add_parser('incremental', help=bench_incremental.__doc__)
+    incremental.add_argument('--pairs', type=int, default=4000)
+    incremental.add_argument('--exchanges', type=int, default=7)
+    incremental.add_argument('--changed', type=int, default=100)
+    incremental.add_argument('--updates', type=int, default=20)
+    incremental.set_defaults(func=bench_incremental)
+
+    stream = commands.add_parser('stream', help=bench_stream.__doc__)
+    stream.add_argument('--pairs', type=int, default=1000)
+    stream.add_argument('--seconds', type=float, default=5)
+    stream.add_argument('--rate', type=float, default=0, help='messages/sec per connection, 0 for max')
+    stream.set_defaults(func=bench_stream)
+
+    startup = commands.add_parser('startup', help=bench_startup.__doc__)
+    startup.add_argument('--runs', type=int, default=5)
+    startup.set_defaults(func=bench_startup)
+
+    table = commands.add_parser('table', help=bench_table.__doc__)
+    table.add_argument('--pairs', type=int, default=4000)
+    table.add_argument('--exchanges', type=int, default=7)
+    table.add_argument('--changed', type=int, default=100, help='pairs moved per refresh')
+    table.add_argument('--refreshes', type=int, default=20)
+    table.set_defaults(func=bench_table)
+
+    memory = commands.add_parser('memory', help=bench_memory.__doc__)
+    memory.add_argument('--pairs', type=int, default=5000)
+    memory.add_argument('--exchanges', type=int, default=20)
+    memory.set_defaults(func=bench_memory)
+
+    symbols = commands.add_parser('symbols', help=bench_symbols.__doc__)
+    symbols.add_argument('--pairs', type=int, default=5000)
+    symbols.add_argument('--repeat', type=int, default=20)
+    symbols.set_defaults(func=bench_symbols)
+
+    decode = commands.add_parser('decode', help=bench_decode.__doc__)
+    decode.add_argument('--pairs', type=int, default=5000)
+    decode.add_argument('--repeat', type=int, default=10)
+    decode.add_argument('--recorded', help='directory of recorded <Exchange>.json ticker payloads')
+    decode.set_defaults(func=bench_decode)
+
+    depth = commands.add_parser('depth', help=bench_depth.__doc__)
+    depth.add_argument('--pairs', type=int, default=300)
+    depth.add_argument('--investment', type=float, default=1000)
+    depth.add_argument('--candidates', type=int, default=50)
+    depth.add_argument('--latency', type=float, default=0.05, help='seconds per book request')
+    depth.set_defaults(func=bench_depth)
+
+    record = commands.add_parser('record', help=bench_record.__doc__)
+    record.add_argument('--pairs', type=int, default=4000)
+    record.add_argument('--exchanges', type=int, default=7)
+    record.add_argument('--scans', type=int, default=50)
+    record.add_argument('--segment-mb', type=float, default=64, help='segment rotation size')
+    record.set_defaults(func=bench_record)
+
+    replay = commands.add_parser('replay', help=bench_replay.__doc__)
+    replay.add_argument('--pairs', type=int, default=2000)
+    replay.add_argument('--ticks', type=int, default=600, help='recorded seconds')
+    replay.add_argument('--changed', type=int, default=100, help='quotes moved per exchange per tick')
+    replay.add_argument('--workers', type=int, nargs='+', default=[1, 4])
+    replay.add_argument('--min-profit', type=float, default=0.0)
+    replay.add_argument('--compute', choices=DirectArbitrage.COMPUTE_ENGINES, default='python')
+    replay.set_defaults(func=bench_replay)
+
+    graph = commands.add_parser('graph', help=bench_graph.__doc__)
+    graph.add_argument('--copies', type=int, nargs='+', default=[1, 4], help='ticker universe multiples')
+    graph.add_argument('--hops', type=int, nargs='+', default=[3, 4])
+    graph.add_argument('--changed', type=int, default=100, help='quotes moved per update')
+    graph.add_argument('--updates', type=int, default=20)
+    graph.add_argument('--min-profit', type=float, default=0.0)
+    graph.set_defaults(func=bench_graph)
+
+    shards = commands.add_parser('shards', help=bench_shards.__doc__)
+    shards.add_argument('--pairs', type=int, default=2000)
+    shards.add_argument('--exchanges', type=int, default=50)
+    shards.add_argument('--workers', type=int, nargs='+', default=[1, 2, 4, 8])
+    shards.add_argument('--changed', type=int, default=100, help='quotes rewritten between scans')
+    shards.add_argument('--repeat', type=int, default=3)
+    shards.set_defaults(func=bench_shards)
+
+    ratelimit = commands.add_parser('ratelimit', help=bench_ratelimit.__doc__)
+    ratelimit.add_argument('--pairs', type=int, default=500)
+    ratelimit.add_argument('--requests', type=int, default=5, help='requests the stub allows per window')
+    ratelimit.add_argument('--window', type=float, default=10)
+    ratelimit.add_argument('--ban', type=float, default=5, help='seconds of a 418 ban')
+    ratelimit.add_argument('--interval', type=float, default=0.5, help='seconds between scheduler ticks')
+    ratelimit.add_argument('--seconds', type=float, default=15)
+    ratelimit.set_defaults(func=bench_ratelimit)
+
+    bandwidth = commands.add_parser('bandwidth', help=bench_bandwidth.__doc__)
+    bandwidth.add_argument('--pairs', type=int, default=2000, help='pairs Binance lists')
+    bandwidth.add_argument('--common', type=int, default=300, help='pairs every other venue lists')
+    bandwidth.add_argument('--scans', type=int, default=5)
+    bandwidth.add_argument('--moving', nargs='+', default=['Binance', 'Bybit', 'OKX'],
+                           help='venues whose tickers change between scans')
+    bandwidth.set_defaults(func=bench_bandwidth)
+
+    args = parser.parse_args(argv)
+    args.func(args)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,551 @@
+"""Reproducible benchmark suite for every stage of a scan.
+
+The suite serves the recorded ticker responses in ``fixtures/`` (one per
+exchange) from the local stub server of benchmark.py. It times each stage of
+a scan separately:
+- fetch, decode, parse and symbol normalization, per exchange
+- the concurrent scan
+- the opportunity search, per compute engine
+- the multi-hop cycle search
+- table rendering
+Results are written as JSON, together with the commit they were measured on,
+so runs can be compared across commits:
+
+    python benchmark_suite.py run --output before.json
+    python benchmark_suite.py run --scales base pairs10 exchanges5 --output after.json
+    python benchmark_suite.py compare before.json after.json
+
+``pairs10`` replicates every exchange's tickers ten times under new symbols.
+``exchanges5`` serves every exchange five times with jittered prices.
+
+Fixtures are rebuilt with ``python benchmark_suite.py fixtures``. With
+``--from DIR`` they are copied from raw responses (a ``replay.py capture``
+tick directory); otherwise they are generated in each exchange's response
+format.
+"""
+import os
+import sys
+import copy
+import gzip
+import json
+import math
+import time
+import random
+import argparse
+import platform
+import subprocess
+from concurrent.futures import ThreadPoolExecutor
+from datetime import datetime
+
+import requests
+
+import fast_json
+from benchmark import StubServer, quiet
+from direct_arbitrage import DirectArbitrage
+from exchange_adapters import ADAPTERS, normalize_pair
+from graph_engine import GraphEngine
+
+FIXTURES = os.path.join(os.path.dirname(os.path.abspath(__file__)), 'fixtures')
+SCALES = {
+    # name: (ticker copies per exchange, copies of every exchange)
+    'base': (1, 1),
+    'pairs10': (10, 1),
+    'exchanges5': (1, 5),
+}
+# Symbol field and price fields (as key paths) of every exchange's tickers
+TICKER_FIELDS = {
+    'Binance': ('symbol', [('bidPrice',), ('askPrice',)]),
+    'KuCoin': ('symbol', [('buy',), ('sell',)]),
+    'MEXC': ('symbol', [('bidPrice',), ('askPrice',)]),
+    'Bybit': ('symbol', [('bid1Price',), ('ask1Price',)]),
+    'OKX': ('instId', [('bidPx',), ('askPx',)]),
+    'LBank': ('symbol', [('ticker', 'latest')]),
+    'Bitget': ('symbol', [('buyOne',), ('sellOne',)]),
+}
+
+# Well known bases with rough USD prices; the rest of the universe is synthetic
+MAJORS = {
+    'BTC': 65000, 'ETH': 3200, 'BNB': 580, 'SOL': 150, 'XRP': 0.52, 'DOGE': 0.13, 'ADA': 0.45,
+    'TRX': 0.12, 'AVAX': 28, 'LINK': 14, 'DOT': 6.5, 'LTC': 75, 'SHIB': 0.000018, 'UNI': 7.5,
+    'ATOM': 6.8, 'XLM': 0.1, 'ETC': 22, 'FIL': 4.5, 'APT': 7.2, 'ARB': 0.8, 'OP': 1.7,
+    'NEAR': 5.1, 'INJ': 22, 'SUI': 1.1, 'PEPE': 0.0000095, 'TON': 6.4, 'AAVE': 95, 'MKR': 2400,
+}
+# quote: (USD price, share of the pair universe)
+QUOTES = {
+    'USDT': (1.0, 0.62), 'USDC': (1.0, 0.12), 'BTC': (65000, 0.1), 'ETH': (3200, 0.06),
+    'FDUSD': (1.0, 0.04), 'EUR': (1.08, 0.03), 'TRY': (0.031, 0.03),
+}
+# Share of the universe every exchange lists
+LISTED = {'Binance': 0.85, 'KuCoin': 0.75, 'MEXC': 0.95, 'Bybit': 0.6, 'OKX': 0.6, 'LBank': 0.7, 'Bitget': 0.7}
+
+
+def universe(pairs, rng):
+    """(base, quote, mid price in quote units) of ``pairs`` distinct markets"""
+    bases = dict(MAJORS)
+    markets = []
+    seen = set()
+    quotes = list(QUOTES)
+    weights = [share for _, share in QUOTES.values()]
+    while len(markets) < pairs:
+        if len(bases) < pairs:
+            bases[f"T{len(bases):04d}"] = 10 ** rng.uniform(-5, 3)
+        base = rng.choice(list(bases))
+        quote = rng.choices(quotes, weights)[0]
+        if base == quote or (base, quote) in seen:
+            continue
+        seen.add((base, quote))
+        markets.append((base, quote, bases[base] / QUOTES[quote][0]))
+    return markets
+
+
+def price_text(value):
+    """Roughly six significant digits, the way most venues print prices"""
+    decimals = max(0, 5 - math.floor(math.log10(value)))
+    return f"{value:.{decimals}f}"
+
+
+def fixture_payloads(pairs=1500, seed=0):
+    """Ticker responses of every exchange in its own format, extra fields included
+
+    Every venue lists a share of one market universe with its own jitter. A
+    few entries are delisted (zero prices) or crossed, like in real responses.
+    """
+    rng = random.Random(seed)
+    markets = universe(pairs, rng)
+    now = 1_717_000_000_000
+    payloads = {}
+    for exchange, listed in LISTED.items():
+        rows = []
+        for base, quote, mid in markets:
+            if rng.random() > listed:
+                continue
+            mid *= rng.uniform(0.997, 1.003)
+            half_spread = mid * rng.uniform(0.0001, 0.003)
+            bid, ask = mid - half_spread, mid + half_spread
+            odd = rng.random()
+            if odd < 0.02:
+                bid = ask = 0.0  # Delisted or halted
+            elif odd < 0.025:
+                bid, ask = ask, bid  # Crossed book
+            sizes = [f"{rng.uniform(10, 5000) / mid:.4f}" for _ in range(2)]
+            volume = rng.uniform(1e3, 1e8)
+            rows.append((base, quote, bid, ask, mid, sizes, volume))
+        payloads[exchange] = FORMATTERS[exchange](rows, now)
+    return payloads
+
+
+def binance_like(rows, now):
+    return [
+        {'symbol': f"{b}{q}", 'bidPrice': f"{bid:.8f}", 'bidQty': bid_size,
+         'askPrice': f"{ask:.8f}", 'askQty': ask_size}
+        for b, q, bid, ask, mid, (bid_size, ask_size), volume in rows
+    ]
+
+
+def kucoin(rows, now):
+    return {'code': '200000', 'data': {'time': now, 'ticker': [
+        {'symbol': f"{b}-{q}", 'symbolName': f"{b}-{q}",
+         'buy': price_text(bid) if bid else None, 'bestBidSize': bid_size,
+         'sell': price_text(ask) if ask else None, 'bestAskSize': ask_size,
+         'changeRate': '0.0123', 'changePrice': price_text(mid * 0.0123),
+         'high': price_text(mid * 1.03), 'low': price_text(mid * 0.97),
+         'vol': f"{volume / mid:.4f}", 'volValue': f"{volume:.2f}", 'last': price_text(mid),
+         'averagePrice': price_text(mid), 'takerFeeRate': '0.001', 'makerFeeRate': '0.001',
+         'takerCoefficient': '1', 'makerCoefficient': '1'}
+        for b, q, bid, ask, mid, (bid_size, ask_size), volume in rows
+    ]}}
+
+
+def bybit(rows, now):
+    return {'retCode': 0, 'retMsg': 'OK', 'result': {'category': 'spot', 'list': [
+        {'symbol': f"{b}{q}", 'bid1Price': price_text(bid) if bid else '', 'bid1Size': bid_size,
+         'ask1Price': price_text(ask) if ask else '', 'ask1Size': ask_size,
+         'lastPrice': price_text(mid), 'prevPrice24h': price_text(mid * 0.99), 'price24hPcnt': '0.0101',
+         'highPrice24h': price_text(mid * 1.03), 'lowPrice24h': price_text(mid * 0.97),
+         'turnover24h': f"{volume:.4f}", 'volume24h': f"{volume / mid:.4f}", 'usdIndexPrice': ''}
+        for b, q, bid, ask, mid, (bid_size, ask_size), volume in rows
+    ]}, 'retExtInfo': {}, 'time': now}
+
+
+def okx(rows, now):
+    return {'code': '0', 'msg': '', 'data': [
+        {'instType': 'SPOT', 'instId': f"{b}-{q}", 'last': price_text(mid), 'lastSz': bid_size,
+         'askPx': price_text(ask) if ask else '', 'askSz': ask_size,
+         'bidPx': price_text(bid) if bid else '', 'bidSz': bid_size,
+         'open24h': price_text(mid * 0.99), 'high24h': price_text(mid * 1.03), 'low24h': price_text(mid * 0.97),
+         'volCcy24h': f"{volume:.2f}", 'vol24h': f"{volume / mid:.4f}", 'ts': str(now),
+         'sodUtc0': price_text(mid * 0.995), 'sodUtc8': price_text(mid * 1.002)}
+        for b, q, bid, ask, mid, (bid_size, ask_size), volume in rows
+    ]}
+
+
+def lbank(rows, now):
+    return [
+        {'symbol': f"{b.lower()}_{q.lower()}", 'timestamp': now, 'ticker': {
+            'high': price_text(mid * 1.03), 'vol': f"{volume / mid:.4f}", 'low': price_text(mid * 0.97),
+            'change': '1.23', 'turnover': f"{volume:.2f}", 'latest': price_text(mid) if bid else '0'}}
+        for b, q, bid, ask, mid, (bid_size, ask_size), volume in rows
+    ]
+
+
+def bitget(rows, now):
+    return {'code': '00000', 'msg': 'success', 'requestTime': now, 'data': [
+        {'symbol': f"{b}{q}", 'high24h': price_text(mid * 1.03), 'low24h': price_text(mid * 0.97),
+         'close': price_text(mid), 'quoteVol': f"{volume:.2f}", 'baseVol': f"{volume / mid:.4f}",
+         'usdtVol': f"{volume:.2f}", 'ts': str(now),
+         'buyOne': price_text(bid) if bid else '0', 'sellOne': price_text(ask) if ask else '0',
+         'bidSz': bid_size, 'askSz': ask_size, 'openUtc0': price_text(mid * 0.995),
+         'changeUtc': '0.0045', 'change': '0.0123'}
+        for b, q, bid, ask, mid, (bid_size, ask_size), volume in rows
+    ]}
+
+
+FORMATTERS = {
+    'Binance': binance_like, 'KuCoin': kucoin, 'MEXC': binance_like, 'Bybit': bybit,
+    'OKX': okx, 'LBank': lbank, 'Bitget': bitget,
+}
+
+
+def write_fixtures(directory=FIXTURES, pairs=1500, seed=0, source=None):
+    """Write <Exchange>.json.gz fixtures, from raw responses in ``source`` if given"""
+    os.makedirs(directory, exist_ok=True)
+    if source:
+        bodies = {}
+        for exchange in ADAPTERS:
+            with open(os.path.join(source, f"{exchange}.json"), 'rb') as f:
+                bodies[exchange] = f.read()
+        manifest = {'source': 'captured', 'from': os.path.abspath(source)}
+    else:
+        bodies = {
+            exchange: json.dumps(payload, separators=(',', ':')).encode()
+            for exchange, payload in fixture_payloads(pairs, seed).items()
+        }
+        manifest = {'source': 'generated', 'pairs': pairs, 'seed': seed}
+    for exchange, body in bodies.items():
+        # mtime=0 keeps regenerated fixtures byte for byte identical
+        with gzip.GzipFile(os.path.join(directory, f"{exchange}.json.gz"), 'wb', mtime=0) as f:
+            f.write(body)
+    manifest['bytes'] = {exchange: len(body) for exchange, body in bodies.items()}
+    with open(os.path.join(directory, 'manifest.json'), 'w') as f:
+        json.dump(manifest, f, indent=2)
+        f.write('\n')
+    return manifest
+
+
+def load_fixtures(directory=FIXTURES):
+    """{exchange: raw response bytes} of a fixture or capture directory"""
+    bodies = {}
+    for exchange in ADAPTERS:
+        path = os.path.join(directory, f"{exchange}.json")
+        if os.path.exists(path + '.gz'):
+            with gzip.open(path + '.gz', 'rb') as f:
+                bodies[exchange] = f.read()
+        elif os.path.exists(path):
+            with open(path, 'rb') as f:
+                bodies[exchange] = f.read()
+    return bodies
+
+
+def jitter(ticker, price_paths, factor):
+    for path in price_paths:
+        holder = ticker
+        for key in path[:-1]:
+            holder = holder[key]
+        try:
+            value = float(holder[path[-1]])
+        except (TypeError, ValueError):
+            continue
+        if value > 0:
+            holder[path[-1]] = f"{value * factor:.10g}"
+
+
+def scaled_venues(bodies, ticker_copies=1, exchange_copies=1, seed=0):
+    """{venue: (adapter class, body)} with every exchange's tickers and venues multiplied
+
+    Ticker copies get a prefixed base asset (X1BTC-USDT...), so they are new
+    pairs listed on every exchange. Exchange copies (Binance2...) carry the
+    same listings with prices moved by up to 0.3%.
+    """
+    rng = random.Random(seed)
+    venues = {}
+    for exchange, body in bodies.items():
+        adapter_cls = ADAPTERS[exchange]
+        if ticker_copies == 1 and exchange_copies == 1:
+            venues[exchange] = (adapter_cls, body)
+            continue
+        symbol_key, price_paths = TICKER_FIELDS[exchange]
+        payload = fast_json.loads(body)
+        rows = adapter_cls().rows(payload)
+        original = list(rows)
+        for n in range(1, ticker_copies):
+            prefix = f"x{n}" if exchange == 'LBank' else f"X{n}"
+            for ticker in original:
+                ticker = copy.deepcopy(ticker)
+                ticker[symbol_key] = prefix + ticker[symbol_key]
+                rows.append(ticker)
+        venues[exchange] = (adapter_cls, json.dumps(payload).encode())
+        for n in range(2, exchange_copies + 1):
+            clone = copy.deepcopy(payload)
+            for ticker in adapter_cls().rows(clone):
+                jitter(ticker, price_paths, rng.uniform(0.997, 1.003))
+            venues[f"{exchange}{n}"] = (adapter_cls, json.dumps(clone).encode())
+    return venues
+
+
+def venue_scanner(venues, stub):
+    """A scanner whose exchanges are ``venues``, each served by the stub"""
+    arbitrage = DirectArbitrage(cache_duration=0, symbols_cache=None)
+    arbitrage.min_profit_percent = 0  # Same search workload as revisions before the threshold existed
+    arbitrage.executor.shutdown()
+    for session in arbitrage.sessions.values():
+        session.close()
+    arbitrage.exchanges = {}
+    for name, (adapter_cls, _) in venues.items():
+        adapter = adapter_cls()
+        adapter.name = name
+        adapter.url = f"{stub.url}/{name}"
+        arbitrage.exchanges[name] = adapter
+    arbitrage.sessions = {name: requests.Session() for name in venues}
+    arbitrage.executor = ThreadPoolExecutor(max_workers=len(venues), thread_name_prefix='fetch')
+    return arbitrage
+
+
+def measure(run, repeat):
+    """Median and best wall time of ``run`` in ms, after one warm-up call"""
+    run()
+    timings = []
+    for _ in range(repeat):
+        start = time.perf_counter()
+        run()
+        timings.append(time.perf_counter() - start)
+    timings.sort()
+    return {'median_ms': timings[len(timings) // 2] * 1000, 'min_ms': timings[0] * 1000}
+
+
+def with_total(stage):
+    stage['total'] = {
+        key: sum(timing[key] for timing in stage.values()) for key in ('median_ms', 'min_ms')
+    }
+    return stage
+
+
+def render_stage(opportunities, repeat):
+    """First fill and diffed refresh of the opportunities table, painted offscreen"""
+    os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+    try:
+        from PyQt6.QtWidgets import QApplication, QTableView
+    except ImportError:
+        return None
+    from opportunity_model import OpportunityTableModel
+
+    app = QApplication.instance() or QApplication([])
+    view = QTableView()
+    view.verticalHeader().setDefaultSectionSize(40)
+    view.resize(1200, 700)
+    # The next scan: the same rows with every 20th one gone
+    moved = [op for i, op in enumerate(opportunities) if i % 20]
+
+    def fill():
+        model = OpportunityTableModel()
+        view.setModel(model)
+        model.update(opportunities)
+        view.grab()
+
+    def refresh():
+        model = view.model()
+        model.update(moved)
+        view.grab()
+        model.update(opportunities)
+        view.grab()
+
+    stage = {'fill': measure(fill, repeat), 'refresh': measure(refresh, repeat)}
+    stage['refresh'] = {key: value / 2 for key, value in stage['refresh'].items()}
+    view.deleteLater()
+    app.processEvents()
+    return stage
+
+
+def run_scale(bodies, ticker_copies, exchange_copies, repeat):
+    venues = scaled_venues(bodies, ticker_copies, exchange_copies)
+    result = {'exchanges': len(venues), 'stages': {}}
+    stages = result['stages']
+    with StubServer({name: body for name, (_, body) in venues.items()}) as stub, quiet():
+        arbitrage = venue_scanner(venues, stub)
+        fetch, decode, parse, normalize = {}, {}, {}, {}
+        prices = {}
+        for name, adapter in arbitrage.exchanges.items():
+            session = arbitrage.sessions[name]
+            fetch[name] = measure(lambda: session.get(adapter.url).content, repeat)
+            body = venues[name][1]
+            decode[name] = measure(lambda: fast_json.loads(body), repeat)
+            payload = fast_json.loads(body)
+            parse[name] = measure(lambda: adapter.parse(payload), repeat)
+            prices[name] = adapter.parse(payload)
+            symbols = [adapter.quote(ticker)[0] for ticker in adapter.rows(payload)]
+            normalize[name] = measure(lambda: [normalize_pair(symbol) for symbol in symbols], repeat)
+        stages['fetch'] = with_total(fetch)
+        stages['decode'] = with_total(decode)
+        stages['parse'] = with_total(parse)
+        stages['normalize'] = with_total(normalize)
+        stages['scan'] = measure(arbitrage.get_exchange_prices, repeat)
+
+        search = {}
+        opportunities = []
+        engines = ['python'] + (['numpy'] if has_numpy() else [])
+        for compute in engines:
+            arbitrage.compute = compute
+            search[compute] = measure(lambda: arbitrage.compute_opportunities(prices), repeat)
+            opportunities = arbitrage.compute_opportunities(prices)
+        stages['search'] = search
+        stages['cycles'] = measure(lambda: GraphEngine(arbitrage).opportunities(prices), repeat)
+        arbitrage.close()
+
+    render = render_stage(opportunities, repeat)
+    if render is not None:
+        stages['render'] = render
+    result['tickers'] = sum(len(table) for table in prices.values())
+    result['pairs'] = len({pair for table in prices.values() for pair in table})
+    result['opportunities'] = len(opportunities)
+    return result
+
+
+def has_numpy():
+    import vector_engine
+    return vector_engine.np is not None
+
+
+def git_revision():
+    here = os.path.dirname(os.path.abspath(__file__))
+    try:
+        commit = subprocess.run(['git', 'rev-parse', 'HEAD'], cwd=here, capture_output=True,
+                                text=True, check=True).stdout.strip()
+        dirty = subprocess.run(['git', 'status', '--porcelain', '--untracked-files=no'], cwd=here,
+                               capture_output=True, text=True, check=True).stdout.strip() != ''
+    except (OSError, subprocess.CalledProcessError):
+        return None, None
+    return commit, dirty
+
+
+def run_suite(scales=('base',), repeat=5, fixtures=FIXTURES):
+    bodies = load_fixtures(fixtures)
+    if not bodies:
+        raise FileNotFoundError(f"No fixtures in {fixtures}, run: python benchmark_suite.py fixtures")
+    commit, dirty = git_revision()
+    manifest_path = os.path.join(fixtures, 'manifest.json')
+    manifest = None
+    if os.path.exists(manifest_path):
+        with open(manifest_path) as f:
+            manifest = json.load(f)
+    results = {
+        'meta': {
+            'commit': commit,
+            'dirty': dirty,
+            'time': datetime.now().isoformat(timespec='seconds'),
+            'python': platform.python_version(),
+            'platform': platform.platform(),
+            'cpus': os.cpu_count(),
+            'decoder': fast_json.DECODER,
+            'repeat': repeat,
+            'fixtures': manifest,
+        },
+        'scales': {},
+    }
+    for name in scales:
+        ticker_copies, exchange_copies = SCALES[name]
+        results['scales'][name] = run_scale(bodies, ticker_copies, exchange_copies, repeat)
+    return results
+
+
+def flatten(results, metric='min_ms'):
+    """{'scale/stage/key': milliseconds} of a results document"""
+    timings = {}
+    for scale, result in results['scales'].items():
+        for stage, entries in result['stages'].items():
+            if metric in entries:
+                timings[f"{scale}/{stage}"] = entries[metric]
+                continue
+            for key, timing in entries.items():
+                timings[f"{scale}/{stage}/{key}"] = timing[metric]
+    return timings
+
+
+def print_summary(results):
+    for scale, result in results['scales'].items():
+        print(f"{scale}: {result['exchanges']} exchanges, {result['tickers']} tickers, "
+              f"{result['pairs']} pairs, {result['opportunities']} opportunities")
+        for stage, entries in result['stages'].items():
+            if 'median_ms' in entries:
+                print(f"  {stage:10s} {entries['median_ms']:9.2f} ms")
+            elif 'total' in entries:
+                print(f"  {stage:10s} {entries['total']['median_ms']:9.2f} ms over all exchanges")
+            else:
+                cells = ', '.join(f"{key} {timing['median_ms']:.2f} ms" for key, timing in entries.items())
+                print(f"  {stage:10s} {cells}")
+
+
+def compare(old, new, threshold=0.1, metric='min_ms'):
+    """Print timings side by side, returning the keys that got slower than ``threshold``
+
+    The best of the repeated runs is compared by default, as it is the least
+    noisy on a busy machine.
+    """
+    before, after = flatten(old, metric), flatten(new, metric)
+    regressions = []
+    print(f"{old['meta']['commit'] or '?'} -> {new['meta']['commit'] or '?'}")
+    for key in sorted(before.keys() & after.keys()):
+        ratio = after[key] / before[key] if before[key] else float('inf')
+        flag = ''
+        if ratio > 1 + threshold:
+            flag = '  REGRESSION'
+            regressions.append(key)
+        elif ratio < 1 - threshold:
+            flag = '  faster'
+        print(f"{key:40s} {before[key]:10.2f} ms {after[key]:10.2f} ms {ratio:6.2f}x{flag}")
+    return regressions
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Benchmark every stage of a scan against recorded fixtures')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='time every stage and write the results as JSON')
+    run.add_argument('--scales', nargs='+', choices=list(SCALES), default=['base'])
+    run.add_argument('--repeat', type=int, default=5)
+    run.add_argument('--fixtures', default=FIXTURES, help='directory of <Exchange>.json[.gz] responses')
+    run.add_argument('--output', help='JSON file to write the results to')
+
+    fixtures = commands.add_parser('fixtures', help='rebuild the fixtures')
+    fixtures.add_argument('--pairs', type=int, default=1500)
+    fixtures.add_argument('--seed', type=int, default=0)
+    fixtures.add_argument('--from', dest='source', help='directory of raw <Exchange>.json responses')
+    fixtures.add_argument('--output', default=FIXTURES)
+
+    diff = commands.add_parser('compare', help='compare two result files')
+    diff.add_argument('old')
+    diff.add_argument('new')
+    diff.add_argument('--threshold', type=float, default=0.1, help='relative slowdown reported as a regression')
+    diff.add_argument('--metric', choices=['min_ms', 'median_ms'], default='min_ms')
+    args = parser.parse_args(argv)
+
+    if args.command == 'fixtures':
+        manifest = write_fixtures(args.output, args.pairs, args.seed, args.source)
+        print(f"Wrote {len(manifest['bytes'])} fixtures to {args.output}")
+    elif args.command == 'compare':
+        with open(args.old) as f:
+            old = json.load(f)
+        with open(args.new) as f:
+            new = json.load(f)
+        if compare(old, new, args.threshold, args.metric):
+            sys.exit(1)
+    else:
+        results = run_suite(args.scales, args.repeat, args.fixtures)
+        print_summary(results)
+        if args.output:
+            with open(args.output, 'w') as f:
+                json.dump(results, f, indent=2)
+                f.write('\n')
+            print(f"Results written to {args.output}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,201 @@
+"""Order book depth re-pricing of top-of-book opportunities.
+
+The top-of-book screen assumes the whole investment fills at the best ask and
+best bid. DepthEngine takes the most profitable candidates of that screen,
+fetches the L2 books they need (each book once, concurrently, a few requests
+at a time per exchange) and walks the levels to price the investment at its
+VWAP. Candidates that are not profitable once size is applied are dropped.
+The survivors report the largest size at which every unit is still profitable.
+"""
+import threading
+from concurrent.futures import ThreadPoolExecutor, wait
+
+import requests
+
+from fast_json import loads
+from http_cache import ACCEPT_ENCODING
+from records import DepthOpportunity, by_profit
+
+
+def buy_fill(asks, investment):
+    """Coins bought by spending ``investment`` down the asks, None if the book is too thin"""
+    coins = 0.0
+    remaining = investment
+    for price, size in asks:
+        cost = price * size
+        if cost >= remaining:
+            return coins + remaining / price
+        coins += size
+        remaining -= cost
+    return None
+
+
+def sell_fill(bids, coins):
+    """Proceeds of selling ``coins`` down the bids, None if the book is too thin"""
+    proceeds = 0.0
+    remaining = coins
+    for price, size in bids:
+        if size >= remaining:
+            return proceeds + remaining * price
+        proceeds += size * price
+        remaining -= size
+    return None
+
+
+def max_profitable_size(asks, bids, buy_fee, sell_fee):
+    """Largest investment whose every unit is profitable, and the profit at that size
+
+    Both books are walked together; each step buys at the current ask level
+    what the current bid level can absorb, as long as that margin is positive.
+    """
+    invested = profit = 0.0
+    i = j = 0
+    ask_left = asks[0][1] if asks else 0
+    bid_left = bids[0][1] if bids else 0
+    while i < len(asks) and j < len(bids):
+        ask_price, bid_price = asks[i][0], bids[j][0]
+        # Profit of one more unit of quote currency spent at these two levels
+        margin = bid_price / ask_price * (1 - buy_fee) * (1 - sell_fee) - (1 + buy_fee)
+        if margin <= 0:
+            break
+        if ask_left * (1 - buy_fee) <= bid_left:
+            coins = ask_left  # The whole ask level sells into this bid level
+            bid_left -= coins * (1 - buy_fee)
+            i += 1
+            ask_left = asks[i][1] if i < len(asks) else 0
+        else:
+            coins = bid_left / (1 - buy_fee)
+            ask_left -= coins
+            j += 1
+            bid_left = bids[j][1] if j < len(bids) else 0
+        spent = coins * ask_price
+        invested += spent
+        profit += spent * margin
+    return invested, profit
+
+
+class DepthEngine:
+    """Re-price the best opportunities of a scan against L2 order books"""
+
+    def __init__(self, arbitrage, levels=20, max_candidates=50, per_exchange=4, deadline=3):
+        self.arbitrage = arbitrage
+        self.levels = levels  # Book levels requested per side
+        self.max_candidates = max_candidates  # Opportunities re-priced per scan, best first
+        self.per_exchange = per_exchange  # Concurrent book requests per exchange
+        self.deadline = deadline  # Max seconds a scan waits for books
+        self.executors = {}
+        self.local = threading.local()  # Per-thread sessions, requests.Session isn't thread safe
+        self.sessions = []  # Every session handed out, closed by close()
+        self.lock = threading.Lock()
+        self.fetched = 0  # Books fetched, for benchmarks
+
+    def executor(self, exchange):
+        executor = self.executors.get(exchange)
+        if executor is None:
+            executor = self.executors[exchange] = ThreadPoolExecutor(
+                max_workers=self.per_exchange, thread_name_prefix=f"depth-{exchange}"
+            )
+        return executor
+
+    def session(self):
+        """The calling worker thread's own HTTP session"""
+        session = getattr(self.local, 'session', None)
+        if session is None:
+            session = self.local.session = requests.Session()
+            session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+            with self.lock:
+                self.sessions.append(session)
+        return session
+
+    def fetch_book(self, exchange, symbol):
+        """Fetch and parse one order book as (bids, asks)"""
+        adapter = self.arbitrage.exchanges[exchange]
+        governor = self.arbitrage.governor
+        # Books are few and light, so wait for the budget rather than drop them
+        governor.acquire(exchange, 'depth', wait=self.deadline)
+        response = self.session().get(
+            adapter.depth_url(symbol, self.levels), timeout=self.arbitrage.request_timeout
+        )
+        governor.observe(exchange, response.status_code, response.headers)
+        response.raise_for_status()
+        return adapter.parse_depth(loads(response.content))
+
+    def fetch_books(self, keys):
+        """Fetch {(exchange, symbol): (bids, asks)} concurrently, skipping failures and late books"""
+        futures = {
+            self.executor(exchange).submit(self.fetch_book, exchange, symbol): (exchange, symbol)
+            for exchange, symbol in keys
+        }
+        done, _ = wait(futures, timeout=self.deadline)
+        books = {}
+        for future in done:
+            exchange, symbol = futures[future]
+            if future.exception() is not None:
+                print(f"Error fetching {symbol} order book from {exchange}: {str(future.exception())}")
+                continue
+            books[exchange, symbol] = future.result()
+        self.fetched += len(books)
+        return books
+
+    def refine(self, opportunities):
+        """Return the candidates that stay profitable at full size, sorted by profit"""
+        candidates = opportunities[:self.max_candidates]
+        keys = set()
+        for op in candidates:
+            keys.add((op.buy_exchange, op.original_buy_symbol))
+            keys.add((op.sell_exchange, op.original_sell_symbol))
+        books = self.fetch_books(keys)
+
+        refined = []
+        for op in candidates:
+            buy_book = books.get((op.buy_exchange, op.original_buy_symbol))
+            sell_book = books.get((op.sell_exchange, op.original_sell_symbol))
+            if buy_book is None or sell_book is None:
+                continue
+            opportunity = self.evaluate(op, buy_book[1], sell_book[0])
+            if opportunity is not None:
+                refined.append(opportunity)
+        refined.sort(key=by_profit, reverse=True)
+        return refined
+
+    def evaluate(self, op, asks, bids):
+        """Price a top-of-book opportunity at its VWAP fills, None if it isn't profitable"""
+        buy_fee = op.buy_fee / 100
+        sell_fee = op.sell_fee / 100
+        investment = op.investment
+
+        raw_coins = buy_fill(asks, investment)
+        if not raw_coins:
+            return None
+        coins_bought = raw_coins * (1 - buy_fee)
+        proceeds = sell_fill(bids, coins_bought)
+        if proceeds is None:
+            return None
+
+        buy_amount = investment * (1 + buy_fee)
+        sell_amount = proceeds * (1 - sell_fee)
+        profit_amount = sell_amount - buy_amount
+        profit_percent = (profit_amount / buy_amount) * 100
+        if profit_percent <= 0 or profit_percent < self.arbitrage.min_profit_percent:
+            return None
+
+        max_size, max_profit_amount = max_profitable_size(asks, bids, buy_fee, sell_fee)
+        return DepthOpportunity(
+            op.pair, op.buy_exchange, op.sell_exchange, op.buy_price, op.sell_price,
+            profit_percent, profit_amount, investment,
+            op.original_buy_symbol, op.original_sell_symbol,
+            op.buy_fee, op.sell_fee, coins_bought, sell_amount,
+            top_profit_percent=op.profit_percent,
+            buy_vwap=investment / raw_coins,
+            sell_vwap=proceeds / coins_bought,
+            max_size=max_size,
+            max_profit_amount=max_profit_amount
+        )
+
+    def close(self):
+        for executor in self.executors.values():
+            executor.shutdown(wait=False)
+        with self.lock:
+            for session in self.sessions:
+                session.close()
+            self.sessions = []
@@ -1,75 +1,140 @@
 import sys
 import time
+import heapq
 import json
+import asyncio
+import threading
+import argparse
+import contextlib
 import requests
 from datetime import datetime
-from concurrent.futures import ThreadPoolExecutor
-from PyQt6.QtWidgets import (
-    QApplication, QMainWindow, QWidget, QVBoxLayout, QHBoxLayout,
-    QPushButton, QLabel, QLineEdit, QTableWidget, QTableWidgetItem,
-    QHeaderView, QDialog, QTextEdit, QStyleFactory, QCheckBox, QGridLayout
-)
-from PyQt6.QtCore import Qt, QTimer
-from PyQt6.QtGui import QPalette, QColor, QFont
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+from exchange_adapters import ADAPTERS, is_valid_price, normalize_pair
+from fast_json import loads
+from http_cache import ACCEPT_ENCODING, ConditionalCache, wire_size
+from metrics import ScanMetrics
+from rate_limits import RateGovernor, RateLimited
+from records import Opportunity, by_profit
+from scheduler import RefreshScheduler
+from symbols import DEFAULT_CACHE, MAX_AGE, SymbolRegistry
+
+# The Qt front-end lives in arbitrage_gui and is only imported when the GUI is
+# requested, so headless runs never load PyQt6 (or need libGL).
+GUI_NAMES = ('DirectArbitrageGUI', 'ScanWorker')
+
+
+def __getattr__(name):
+    if name in GUI_NAMES:
+        import arbitrage_gui
+        return getattr(arbitrage_gui, name)
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
+
+class ScanCancelled(Exception):
+    """Raised when a scan is cancelled before all exchanges were fetched"""
+
 
 class DirectArbitrage:
-    def __init__(self):
+    BACKENDS = ('threads', 'async')
+    COMPUTE_ENGINES = ('python', 'numpy', 'incremental', 'sharded')
+
+    def __init__(self, backend='threads', cache_duration=10, compute='python', symbols_cache=DEFAULT_CACHE,
+                 depth=False, workers=None):
+        if backend not in self.BACKENDS:
+            raise ValueError(f"Unknown backend {backend!r}, expected one of {self.BACKENDS}")
+        if compute not in self.COMPUTE_ENGINES:
+            raise ValueError(f"Unknown compute engine {compute!r}, expected one of {self.COMPUTE_ENGINES}")
+        self.backend = backend
+        self.compute = compute
+        self.opportunity_index = None
+        self.workers = workers  # Processes of compute='sharded', None for one per core
+        self.shard_engine = None
+        self.depth = depth  # Re-price the best candidates against order book depth
+        self.depth_engine = None
+        self.graph_engine = None  # graph_engine.GraphEngine behind find_cycles
+        self.recorder = None  # recorder.Recorder that keeps every snapshot and scan on disk
+        self.price_source = None  # Serves prices instead of the exchanges, see replay.py
+        self.clock = time.time  # Wall clock of snapshots and recordings, simulated by replays
+        self.stream = None  # PriceStream while streaming mode is on
         self.sessions = {}
         self.last_prices = {}
         self.last_update = {}
-        self.cache_duration = 10  # Cache duration in seconds
+        self.cache_duration = cache_duration  # Snapshot TTL in seconds, 0 disables caching
+        self.cache_durations = {}  # Per-exchange TTL overrides, set by the refresh scheduler
+        self.cache_hits = 0
+        self.cache_misses = 0
         self.min_profit_percent = 0.5  # Minimum profit percentage
+        self.selected_exchanges = None  # Exchanges fetched and compared, None for all
+        self.max_opportunities = None  # Keep only the N most profitable opportunities, None for all
         self.investment = 100  # $1000 investment
-        
-        # Define exchange API endpoints and configurations
+        self.request_timeout = 5  # Per-exchange HTTP timeout in seconds
+        self.scan_deadline = 8  # Max seconds a scan waits for all exchanges
+        self.stale_exchanges = set()  # Exchanges served from an older snapshot
+        self.fetch_latency = {}  # Seconds the last successful fetch of each exchange took
+        self.metrics = ScanMetrics()  # Per-exchange latency, payload, parse and error metrics
+        self.http_cache = ConditionalCache()  # ETag/Last-Modified validators of the ticker URLs
+        self.filter_symbols = True  # Ask venues that can filter only for pairs another exchange lists
+        self.max_symbol_batches = 5  # More filtered requests than this fetch every ticker instead
+        
+        # One adapter per exchange owns its endpoint, fee and payload parsing
         self.exchanges = {
-            'Binance': {
-                'url': 'https://api.binance.com/api/v3/ticker/bookTicker',
-                'fee': 0.075  # 0.075% with BNB
-            },
-            'KuCoin': {
-                'url': 'https://api.kucoin.com/api/v1/market/allTickers',
-                'fee': 0.08  # 0.08% with KCS
-            },
-            'MEXC': {
-                'url': 'https://api.mexc.com/api/v3/ticker/price',
-                'fee': 0.2
-            },
-            'Bybit': {
-                'url': 'https://api.bybit.com/v5/market/tickers?category=spot',
-                'fee': 0.06  # 0.06% with BIT
-            },
-            'OKX': {
-                'url': 'https://www.okx.com/api/v5/market/tickers?instType=SPOT',
-                'fee': 0.08  # 0.08% with OKB
-            },
-            'LBank': {
-                'url': 'https://api.lbkex.com/v1/ticker.do?symbol=all',
-                'fee': 0.08  # 0.08% standard fee
-            },
-            'Bitget': {
-                'url': 'https://api.bitget.com/api/spot/v1/market/tickers',
-                'fee': 0.1  # 0.1% standard fee
-            }
+            name: adapter() for name, adapter in ADAPTERS.items()
         }
+        self.governor = RateGovernor(self)  # Per-exchange request budgets and backoff
         
         # Initialize sessions
-        self.sessions = {
-            exchange: requests.Session() for exchange in self.exchanges.keys()
-        }
+        self.sessions = {}
+        for exchange in self.exchanges:
+            session = self.sessions[exchange] = requests.Session()
+            session.headers['Accept-Encoding'] = ACCEPT_ENCODING
+        
+        # One worker per exchange so a stalled venue never blocks the others
+        self.executor = ThreadPoolExecutor(
+            max_workers=len(self.exchanges), thread_name_prefix='fetch'
+        )
+        self.pending_fetches = {}  # exchange -> in-flight future
+        
+        # The asyncio backend shares one keep-alive connection pool across exchanges
+        self.async_fetcher = None
+        if backend == 'async':
+            from async_engine import AsyncPriceFetcher
+            self.async_fetcher = AsyncPriceFetcher(self)
         
         self.quote_currencies = [
             'USDT', 'USDC', 'BUSD', 'DAI', 'TUSD', 'USDP', 
             'USDD', 'FDUSD', 'PYUSD', 'EURC', 'EUROC'
         ]
-        
+        # Quotes of crosses and fiat markets, tried after the stablecoins
+        self.cross_quotes = ['BTC', 'ETH', 'BNB', 'EUR', 'TRY']
+        
+        # Raw symbols map to canonical pairs through the registry, unknown ones are normalized
+        self.symbols_cache = symbols_cache
+        self.pair_display = {}  # canonical pair -> 'BASE/QUOTE'
+        self.symbols = SymbolRegistry.load(symbols_cache) if symbols_cache else SymbolRegistry()
+        self.symbols.install(self)
+        self.symbols_max_age = MAX_AGE  # Older cached listings are refetched in the background
+        self.symbols_thread = None
+        if symbols_cache and self.symbols.expired(self.symbols_max_age):
+            self.refresh_symbols_in_background()
+        
+    def close(self):
+        """Release HTTP sessions, worker threads and the async connection pool"""
+        self.stop_streaming()
+        if self.recorder is not None:
+            self.recorder.close()
+        if self.depth_engine is not None:
+            self.depth_engine.close()
+        if self.shard_engine is not None:
+            self.shard_engine.close()
+        if self.async_fetcher is not None:
+            self.async_fetcher.close()
+        for session in self.sessions.values():
+            session.close()
+        self.executor.shutdown(wait=False)
+
     def is_valid_price(self, price):
         """Validate price values"""
-        try:
-            price = float(price)
-            return price > 0 and price < 1000000  # Reasonable price range
-        except (TypeError, ValueError):
-            return False
+        return is_valid_price(price)
 
     def is_realistic_price_difference(self, price1, price2):
         """Check if the price difference between exchanges is realistic"""
@@ -85,248 +150,515 @@ class DirectArbitrage:
 
     def normalize_pair(self, pair):
         """Normalize trading pair format across exchanges"""
-        # Remove common separators and convert to uppercase
-        pair = pair.upper().replace('-', '').replace('_', '').replace('/', '')
+        return normalize_pair(pair)
+
+    def get_exchange_prices(self, refresh=(), progress=None, cancel=None):
+        """Get prices from all exchanges concurrently, bounded by the scan deadline
+        
+        Snapshots younger than ``cache_duration`` are reused unless their exchange
+        is listed in ``refresh``. Exchanges that miss the deadline are served from
+        their last snapshot and listed in ``stale_exchanges``; their late result
+        is kept for the next scan.
+        
+        ``progress(exchange, pairs)`` is called as each exchange completes, and
+        setting the ``cancel`` event aborts the scan with ScanCancelled.
+        """
+        if self.price_source is not None:
+            prices = self.price_source.get_exchange_prices(refresh, progress, cancel)
+            return {exchange: prices[exchange] for exchange in self.scanned_exchanges() if exchange in prices}
+        if self.backend == 'async':
+            return self.async_fetcher.run(
+                self.async_fetcher.get_exchange_prices(refresh, progress, cancel)
+            )
         
-        # Handle special cases for each exchange
-        if 'USDT' in pair:
-            # Ensure USDT pairs are properly formatted
-            if not pair.endswith('USDT'):
-                # Move USDT to end if it's in the middle
-                pair = pair.replace('USDT', '') + 'USDT'
-        return pair
-
-    def get_exchange_prices(self):
-        """Get prices from all exchanges with normalized pair formats and validation"""
         all_prices = {}
+        futures = {}
+        stale = set()
+        scan = self.metrics.start_scan()
+        for exchange in self.scanned_exchanges():
+            if exchange not in refresh:
+                cached = self.cached_snapshot(exchange)
+                if cached is not None:
+                    all_prices[exchange] = cached
+                    if progress is not None:
+                        progress(exchange, len(cached))
+                    continue
+            if self.rate_limited(exchange):
+                all_prices[exchange] = self.last_prices.get(exchange, {})
+                stale.add(exchange)
+                continue
+            
+            futures[self.submit_fetch(exchange, scan)] = exchange
+        
+        # Wait in short slices so progress is reported and cancellation is noticed
+        deadline = time.monotonic() + self.scan_deadline
+        done = set()
+        remaining = set(futures)
+        while remaining:
+            self.raise_if_cancelled(cancel)
+            timeout = deadline - time.monotonic()
+            if timeout <= 0:
+                break
+            finished, remaining = wait(remaining, timeout=min(timeout, 0.1), return_when=FIRST_COMPLETED)
+            done |= finished
+            if progress is not None:
+                for future in finished:
+                    progress(futures[future], len(future.result()))
+        
+        for future, exchange in futures.items():
+            if future in done:
+                all_prices[exchange] = self.fetched_or_stale(exchange, future.result(), stale)
+            else:
+                print(f"{exchange} missed the {self.scan_deadline}s scan deadline, using last snapshot")
+                self.metrics.observe_deadline_miss(exchange)
+                all_prices[exchange] = self.last_prices.get(exchange, {})
+                stale.add(exchange)
+        
+        self.stale_exchanges = stale
+        self.metrics.end_scan(list(all_prices), scan)
+        return all_prices
+
+    def submit_fetch(self, exchange, scan=None):
+        """Fetch an exchange on the executor, storing the snapshot once it arrives
+
+        ``scan`` is the metrics id of the scan the fetch's wire bytes count
+        towards. A fetch still in flight is reused and stays with its own scan.
+        """
+        future = self.pending_fetches.get(exchange)
+        # Don't pile up requests on a venue that is still stalled
+        if future is None or future.done():
+            future = self.executor.submit(self.fetch_exchange_prices, exchange, scan)
+            future.add_done_callback(
+                lambda f, exchange=exchange: self.store_snapshot(exchange, f)
+            )
+            self.pending_fetches[exchange] = future
+        return future
+
+    def scanned_exchanges(self):
+        """Names of the exchanges a scan fetches, in adapter order"""
+        if self.selected_exchanges is None:
+            return list(self.exchanges)
+        return [exchange for exchange in self.exchanges if exchange in self.selected_exchanges]
+
+    def rate_limited(self, exchange):
+        """Whether a fetch of an exchange must wait for its request budget or a backoff"""
+        wait = self.governor.hold(exchange)
+        if wait > 0:
+            print(f"{exchange} is rate limited for {wait:.1f}s, using last snapshot")
+            return True
+        return False
+
+    def fetched_or_stale(self, exchange, prices, stale):
+        """A fetch's snapshot, or the last one when the venue refused it or the budget held it back"""
+        if not prices and self.governor.wait_time(exchange) > 0:
+            stale.add(exchange)
+            return self.last_prices.get(exchange, {})
+        return prices
+
+    def raise_if_cancelled(self, cancel):
+        if cancel is not None and cancel.is_set():
+            raise ScanCancelled()
+
+    def refresh_exchange(self, exchange):
+        """Refetch one exchange, reusing the cached snapshots of the others"""
+        return self.get_exchange_prices(refresh={exchange})
+
+    def snapshot_ttl(self, exchange):
+        """Seconds a snapshot of an exchange is reused before it is refetched"""
+        return self.cache_durations.get(exchange, self.cache_duration)
+
+    def cached_snapshot(self, exchange):
+        """Return the cached snapshot of an exchange if it is still fresh"""
+        updated = self.last_update.get(exchange)
+        if updated is not None and self.clock() - updated < self.snapshot_ttl(exchange):
+            self.cache_hits += 1
+            return self.last_prices[exchange]
+        self.cache_misses += 1
+        return None
+
+    def invalidate_cache(self, exchanges=None):
+        """Force the next scan to refetch the given exchanges (default: all)"""
+        for exchange in (self.exchanges if exchanges is None else exchanges):
+            self.last_update.pop(exchange, None)
+
+    def cache_stats(self):
+        """Cache hit/miss counters and the age of every cached snapshot"""
+        now = self.clock()
+        lookups = self.cache_hits + self.cache_misses
+        return {
+            'hits': self.cache_hits,
+            'misses': self.cache_misses,
+            'hit_rate': self.cache_hits / lookups if lookups else 0.0,
+            'ages': {
+                exchange: now - updated for exchange, updated in self.last_update.items()
+            }
+        }
+
+    def store_snapshot(self, exchange, future):
+        """Remember the latest snapshot of an exchange, even if it arrived late"""
+        if future.cancelled() or future.exception() is not None:
+            return
+        prices = future.result()
+        # Failed fetches come back empty; don't cache them so the next scan retries
+        if not prices:
+            return
+        self.last_prices[exchange] = prices
+        self.last_update[exchange] = self.clock()
+        if self.recorder is not None:
+            self.recorder.record_snapshot(exchange, prices, self.last_update[exchange])
+
+    def exchange_urls(self, exchange):
+        """URLs whose payloads together make up one snapshot of an exchange
+
+        Venues that can filter their tickers are asked only for the symbols
+        wanted_symbols() returns, in batches of the adapter's ``symbol_batch``.
+        """
+        adapter = self.exchanges[exchange]
+        symbols = self.wanted_symbols(exchange)
+        if symbols is None:
+            return adapter.urls()
+        size = adapter.symbol_batch
+        return [adapter.batch_url(symbols[i:i + size]) for i in range(0, len(symbols), size)]
+
+    def wanted_symbols(self, exchange):
+        """Sorted symbols of an exchange that another scanned exchange lists too
+
+        None means every ticker is fetched: the venue can't filter, filtering
+        is off, a listing is not known yet or too many symbols are wanted.
+        Cycle searches need every market, so they always fetch every ticker.
+        Listings come from the symbol registry, or from the last full snapshot
+        of venues missing from it.
+        """
+        adapter = self.exchanges[exchange]
+        registry = self.symbols  # A background refresh may swap it mid-scan
+        listing = registry.pairs.get(exchange)
+        if not self.filter_symbols or self.graph_engine is not None or adapter.symbol_batch is None or not listing:
+            return None
+        counts = {}
+        for other in self.scanned_exchanges():
+            pairs = registry.pairs.get(other)
+            pairs = pairs.values() if pairs else self.last_prices.get(other)
+            if not pairs:
+                return None
+            for pair in set(pairs):
+                counts[pair] = counts.get(pair, 0) + 1
+        symbols = sorted(symbol for symbol, pair in listing.items() if counts.get(pair, 0) >= 2)
+        if not symbols or len(symbols) > adapter.symbol_batch * self.max_symbol_batches:
+            return None
+        return symbols
+
+    def fetch_exchange_prices(self, exchange, scan=None):
+        """Fetch and parse the prices of a single exchange, for the metrics scan ``scan``"""
+        started = time.perf_counter()
         
-        for exchange, api in self.exchanges.items():
+        try:
+            urls = self.exchange_urls(exchange)
             try:
-                response = requests.get(api['url'])
-                response.raise_for_status()
-                data = response.json()
-                prices = {}
-                
-                if exchange == 'Binance':
-                    for ticker in data:
-                        try:
-                            if not all(k in ticker for k in ['symbol', 'bidPrice', 'askPrice']):
-                                continue
-                                
-                            bid = float(ticker['bidPrice'])
-                            ask = float(ticker['askPrice'])
-                            
-                            if not (self.is_valid_price(bid) and self.is_valid_price(ask)):
-                                continue
-                                
-                            # Max 1% spread between bid and ask
-                            if bid >= ask or (ask - bid) / bid > 0.01:
-                                continue
-                                
-                            pair = self.normalize_pair(ticker['symbol'])
-                            prices[pair] = {
-                                'bid': bid,
-                                'ask': ask,
-                                'original_symbol': ticker['symbol']
-                            }
-                        except (KeyError, ValueError, TypeError) as e:
-                            continue
-                
-                elif exchange == 'KuCoin':
-                    if 'data' in data and 'ticker' in data['data']:
-                        for ticker in data['data']['ticker']:
-                            try:
-                                if not all(k in ticker for k in ['symbol', 'buy', 'sell']):
-                                    continue
-                                    
-                                bid = float(ticker['buy'])
-                                ask = float(ticker['sell'])
-                                
-                                if not (self.is_valid_price(bid) and self.is_valid_price(ask)):
-                                    continue
-                                    
-                                # Max 1% spread between bid and ask
-                                if bid >= ask or (ask - bid) / bid > 0.01:
-                                    continue
-                                    
-                                pair = self.normalize_pair(ticker['symbol'])
-                                prices[pair] = {
-                                    'bid': bid,
-                                    'ask': ask,
-                                    'original_symbol': ticker['symbol']
-                                }
-                            except (KeyError, ValueError, TypeError) as e:
-                                continue
-                
-                elif exchange == 'MEXC':
-                    try:
-                        # First get all symbols with their prices
-                        prices_response = requests.get(api['url'])
-                        prices_response.raise_for_status()
-                        prices_data = prices_response.json()
-                        
-                        # Then get the order book data for bid/ask
-                        book_url = 'https://api.mexc.com/api/v3/ticker/bookTicker'
-                        book_response = requests.get(book_url)
-                        book_response.raise_for_status()
-                        book_data = book_response.json()
-                        
-                        # Create a map of symbol to book data for faster lookup
-                        book_map = {item['symbol']: item for item in book_data}
-                        
-                        for price_item in prices_data:
-                            try:
-                                symbol = price_item['symbol']
-                                if symbol not in book_map:
-                                    continue
-                                    
-                                book_item = book_map[symbol]
-                                if not all(k in book_item for k in ['bidPrice', 'askPrice']):
-                                    continue
-                                    
-                                bid = float(book_item['bidPrice'])
-                                ask = float(book_item['askPrice'])
-                                
-                                if not (self.is_valid_price(bid) and self.is_valid_price(ask)):
-                                    continue
-                                    
-                                # Max 1% spread between bid and ask
-                                if bid >= ask or (ask - bid) / bid > 0.01:
-                                    continue
-                                    
-                                pair = self.normalize_pair(symbol)
-                                prices[pair] = {
-                                    'bid': bid,
-                                    'ask': ask,
-                                    'original_symbol': symbol
-                                }
-                            except (KeyError, ValueError, TypeError) as e:
-                                continue
-                    except Exception as e:
-                        print(f"Error fetching MEXC data: {str(e)}")
-                
-                elif exchange == 'Bybit':
-                    if 'result' in data and 'list' in data['result']:
-                        for ticker in data['result']['list']:
-                            try:
-                                if not all(k in ticker for k in ['symbol', 'bid1Price', 'ask1Price']):
-                                    continue
-                                    
-                                bid = float(ticker['bid1Price'])
-                                ask = float(ticker['ask1Price'])
-                                
-                                if not (self.is_valid_price(bid) and self.is_valid_price(ask)):
-                                    continue
-                                    
-                                # Max 1% spread between bid and ask
-                                if bid >= ask or (ask - bid) / bid > 0.01:
-                                    continue
-                                    
-                                pair = self.normalize_pair(ticker['symbol'])
-                                prices[pair] = {
-                                    'bid': bid,
-                                    'ask': ask,
-                                    'original_symbol': ticker['symbol']
-                                }
-                            except (KeyError, ValueError, TypeError) as e:
-                                continue
-                
-                elif exchange == 'OKX':
-                    if 'data' in data:
-                        for ticker in data['data']:
-                            try:
-                                if not all(k in ticker for k in ['instId', 'bidPx', 'askPx']):
-                                    continue
-                                    
-                                bid = float(ticker['bidPx'])
-                                ask = float(ticker['askPx'])
-                                
-                                if not (self.is_valid_price(bid) and self.is_valid_price(ask)):
-                                    continue
-                                    
-                                # Max 1% spread between bid and ask
-                                if bid >= ask or (ask - bid) / bid > 0.01:
-                                    continue
-                                    
-                                pair = self.normalize_pair(ticker['instId'])
-                                prices[pair] = {
-                                    'bid': bid,
-                                    'ask': ask,
-                                    'original_symbol': ticker['instId']
-                                }
-                            except (KeyError, ValueError, TypeError) as e:
-                                continue
-                
-                elif exchange == 'LBank':
-                    for ticker in data:
-                        try:
-                            if 'symbol' not in ticker or 'ticker' not in ticker:
-                                continue
-                                
-                            if 'bid' in ticker['ticker'] and 'ask' in ticker['ticker']:
-                                bid = float(ticker['ticker']['bid'])
-                                ask = float(ticker['ticker']['ask'])
-                            else:
-                                latest = float(ticker['ticker']['latest'])
-                                bid = latest * 0.999  # 0.1% spread
-                                ask = latest * 1.001
-                            
-                            if not (self.is_valid_price(bid) and self.is_valid_price(ask)):
-                                continue
-                                
-                            # Max 1% spread between bid and ask
-                            if bid >= ask or (ask - bid) / bid > 0.01:
-                                continue
-                                
-                            pair = self.normalize_pair(ticker['symbol'])
-                            prices[pair] = {
-                                'bid': bid,
-                                'ask': ask,
-                                'original_symbol': ticker['symbol']
-                            }
-                        except (KeyError, ValueError, TypeError) as e:
-                            continue
-                
-                elif exchange == 'Bitget':
-                    if 'data' in data:
-                        for ticker in data['data']:
-                            try:
-                                if not all(k in ticker for k in ['symbol', 'buyOne', 'sellOne']):
-                                    continue
-                                    
-                                bid = float(ticker['buyOne'])
-                                ask = float(ticker['sellOne'])
-                                
-                                if not (self.is_valid_price(bid) and self.is_valid_price(ask)):
-                                    continue
-                                    
-                                # Max 1% spread between bid and ask
-                                if bid >= ask or (ask - bid) / bid > 0.01:
-                                    continue
-                                    
-                                # Bitget uses USDT suffix, normalize it
-                                pair = self.normalize_pair(ticker['symbol'])
-                                prices[pair] = {
-                                    'bid': bid,
-                                    'ask': ask,
-                                    'original_symbol': ticker['symbol']
-                                }
-                            except (KeyError, ValueError, TypeError) as e:
-                                continue
-                
-                all_prices[exchange] = prices
-                print(f"Found {len(prices)} valid pairs on {exchange}")
-                
-            except Exception as e:
-                print(f"Error fetching prices from {exchange}: {str(e)}")
-                all_prices[exchange] = {}
+                payloads, unchanged = self.fetch_payloads(exchange, urls, scan)
+            except requests.HTTPError as e:
+                if not self.refused_filter(exchange, urls, e.response.status_code):
+                    raise
+                urls = self.exchanges[exchange].urls()
+                payloads, unchanged = self.fetch_payloads(exchange, urls, scan)
+            
+            prices = self.snapshot_from(exchange, urls, payloads, unchanged)
+            self.fetch_latency[exchange] = time.perf_counter() - started
+            print(f"Found {len(prices)} valid pairs on {exchange}")
+            
+        except RateLimited as e:
+            print(str(e))
+            self.metrics.observe_error(exchange, e)
+            prices = {}
+        except Exception as e:
+            print(f"Error fetching prices from {exchange}: {str(e)}")
+            self.metrics.observe_error(exchange, e)
+            prices = {}
         
-        return all_prices
+        return prices
+
+    def fetch_payloads(self, exchange, urls, scan=None):
+        """Decoded payloads of ``urls`` and how many of them came back 304 Not Modified"""
+        session = self.sessions[exchange]
+        payloads = []
+        unchanged = 0
+        for url in urls:
+            self.governor.acquire(exchange)
+            requested = time.perf_counter()
+            response = session.get(url, headers=self.http_cache.headers(exchange, url), timeout=self.request_timeout)
+            not_modified = response.status_code == 304
+            self.metrics.observe_request(
+                exchange, time.perf_counter() - requested, len(response.content),
+                wire_size(response), not_modified, scan
+            )
+            self.governor.observe(exchange, response.status_code, response.headers)
+            if not_modified:
+                payloads.append(self.http_cache.payload(exchange, url))
+                unchanged += 1
+                continue
+            response.raise_for_status()
+            payload = loads(response.content)
+            self.http_cache.store(exchange, url, response.headers, payload)
+            payloads.append(payload)
+        return payloads, unchanged
+
+    def refused_filter(self, exchange, urls, status):
+        """Whether a 4xx refused symbol-filtered ``urls``, forgetting the listing they came from
 
-    def find_arbitrage_opportunities(self):
+        Venues refuse a whole batch for one delisted symbol, so the listing is
+        dropped until the registry is refetched and the caller retries once
+        with every ticker.
+        """
+        if not 400 <= status < 500 or urls == self.exchanges[exchange].urls():
+            return False
+        print(f"{exchange} refused a filtered ticker request (HTTP {status}), fetching every ticker")
+        self.symbols.forget(exchange)
+        if self.symbols_cache:
+            self.refresh_symbols_in_background()
+        return True
+
+    def snapshot_from(self, exchange, urls, payloads, unchanged):
+        """Parse fetched payloads, or reuse the last snapshot when none of them changed"""
+        if unchanged == len(urls):
+            prices = self.http_cache.snapshot(exchange, urls)
+            if prices is not None:
+                self.metrics.observe_unchanged(exchange)
+                return prices
+        prices = self.parse_exchange_prices(exchange, *payloads)
+        self.http_cache.remember(exchange, urls, prices)
+        return prices
+
+    def parse_exchange_prices(self, exchange, *payloads):
+        """Turn raw exchange payloads into normalized, validated prices"""
+        started = time.perf_counter()
+        prices, rejected = self.exchanges[exchange].parse_counted(*payloads)
+        self.metrics.observe_parse(exchange, time.perf_counter() - started, len(prices), rejected)
+        return prices
+
+    def find_arbitrage_opportunities(self, refresh=(), progress=None, cancel=None):
         """Find arbitrage opportunities with exact pair matching"""
+        if self.stream is not None and self.stream.running:
+            # Streaming keeps opportunities up to date tick by tick
+            return self.record(self.streamed_opportunities())
+        prices = self.get_exchange_prices(refresh, progress, cancel)
+        self.raise_if_cancelled(cancel)
+        opportunities = self.compute_opportunities(prices)
+        if self.depth:
+            opportunities = self.apply_depth(opportunities)[:self.max_opportunities]
+        return self.record(opportunities)
+
+    def find_cycles(self, refresh=(), progress=None, cancel=None):
+        """Find profitable triangular and multi-hop cycles, see graph_engine.GraphEngine"""
+        if self.graph_engine is None:
+            from graph_engine import GraphEngine
+            self.graph_engine = GraphEngine(self)
+        prices = self.get_exchange_prices(refresh, progress, cancel)
+        self.raise_if_cancelled(cancel)
+        return self.graph_engine.opportunities(self.selected_prices(prices))
+
+    def streamed_opportunities(self):
+        """The stream's current opportunities between selected exchanges above the minimum profit"""
+        selected = set(self.scanned_exchanges())
+        opportunities = [
+            op for op in self.stream.opportunities()
+            if op.buy_exchange in selected and op.sell_exchange in selected
+            and op.profit_percent >= self.min_profit_percent
+        ]
+        return opportunities[:self.max_opportunities]
+
+    def record(self, opportunities):
+        """Hand the opportunities of a scan to the recorder, if any, and return them"""
+        if self.recorder is not None:
+            self.recorder.record_opportunities(opportunities, self.clock())
+        return opportunities
+
+    def apply_depth(self, opportunities):
+        """Keep the opportunities that stay profitable once filled through the order books"""
+        if self.depth_engine is None:
+            from depth_engine import DepthEngine
+            self.depth_engine = DepthEngine(self)
+        return self.depth_engine.refine(opportunities)
+
+    def start_streaming(self, **kwargs):
+        """Switch to WebSocket price feeds, see streaming.PriceStream for options"""
+        from streaming import PriceStream
+        self.stop_streaming()
+        self.stream = PriceStream(self, **kwargs).start()
+        return self.stream
+
+    def stop_streaming(self):
+        if self.stream is not None:
+            self.stream.stop()
+            self.stream = None
+
+    async def get_exchange_prices_async(self, refresh=(), progress=None, cancel=None):
+        """Async counterpart of get_exchange_prices on the pooled HTTP client"""
+        if self.price_source is not None:
+            return self.price_source.get_exchange_prices(refresh, progress, cancel)
+        if self.async_fetcher is None:
+            from async_engine import AsyncPriceFetcher
+            self.async_fetcher = AsyncPriceFetcher(self)
+        return await self.async_fetcher.get_exchange_prices(refresh, progress, cancel)
+
+    async def find_arbitrage_opportunities_async(self, refresh=(), progress=None, cancel=None):
+        """Async counterpart of find_arbitrage_opportunities"""
+        prices = await self.get_exchange_prices_async(refresh, progress, cancel)
+        self.raise_if_cancelled(cancel)
+        opportunities = self.compute_opportunities(prices)
+        if self.depth:
+            loop = asyncio.get_running_loop()
+            opportunities = await loop.run_in_executor(None, self.apply_depth, opportunities)
+            opportunities = opportunities[:self.max_opportunities]
+        return self.record(opportunities)
+
+    def evaluate_opportunity(self, pair, buy_exchange, buy_data, sell_exchange, sell_data):
+        """Return the opportunity of buying on one exchange and selling on another, if any"""
+        # Get prices
+        buy_price = buy_data.ask   # Price to buy
+        sell_price = sell_data.bid # Price to sell
+        
+        # Skip if prices are invalid or unrealistic
+        if not self.is_realistic_price_difference(buy_price, sell_price):
+            return None
+        
+        # Calculate profit with fees
+        buy_fee = self.exchanges[buy_exchange].fee / 100
+        sell_fee = self.exchanges[sell_exchange].fee / 100
+        
+        # Calculate amounts with fees
+        buy_amount = self.investment * (1 + buy_fee)
+        coins_bought = (self.investment / buy_price) * (1 - buy_fee)
+        sell_amount = (coins_bought * sell_price) * (1 - sell_fee)
+        
+        profit_amount = sell_amount - buy_amount
+        profit_percent = (profit_amount / buy_amount) * 100
+        
+        # Only show opportunities with realistic profits (max 3%)
+        if not 0 < profit_percent <= 3 or profit_percent < self.min_profit_percent:
+            return None
+        
+        return Opportunity(
+            pair=self.display_pair(pair),
+            buy_exchange=buy_exchange,
+            sell_exchange=sell_exchange,
+            buy_price=buy_price,
+            sell_price=sell_price,
+            profit_percent=profit_percent,
+            profit_amount=profit_amount,
+            investment=self.investment,
+            original_buy_symbol=buy_data.original_symbol,
+            original_sell_symbol=sell_data.original_symbol,
+            buy_fee=buy_fee * 100,
+            sell_fee=sell_fee * 100,
+            coins_bought=coins_bought,
+            final_amount=sell_amount
+        )
+
+    def refresh_symbols(self):
+        """Refetch every exchange's symbol listing and update the on-disk cache
+
+        The listings are fetched into a new registry that replaces the current
+        one in a single assignment, so scans never see it half filled.
+        Exchanges whose listing could not be fetched keep their previous one.
+        """
+        previous = self.symbols
+        registry = SymbolRegistry().refresh(self.exchanges, governor=self.governor)
+        if not registry.assets:
+            return previous  # Every listing failed, keep what we have
+        registry.merge_missing(previous)
+        registry.install(self)
+        self.symbols = registry
+        if self.symbols_cache:
+            registry.save(self.symbols_cache)
+        return registry
+
+    def refresh_symbols_in_background(self):
+        """Run refresh_symbols on a daemon thread unless one is already running"""
+        if self.symbols_thread is not None and self.symbols_thread.is_alive():
+            return self.symbols_thread
+
+        def run():
+            try:
+                self.refresh_symbols()
+            except Exception as e:
+                print(f"Error refreshing symbols: {str(e)}")
+
+        self.symbols_thread = threading.Thread(target=run, name='symbols-refresh', daemon=True)
+        self.symbols_thread.start()
+        return self.symbols_thread
+
+    def display_pair(self, pair):
+        """Format a normalized pair as BASE/QUOTE for display"""
+        display = self.pair_display.get(pair)
+        if display is None:
+            display = self.pair_display[pair] = self.split_pair(pair)
+        return display
+
+    def split_pair(self, pair):
+        """Guess BASE/QUOTE of a pair missing from the symbol registry"""
+        assets = self.split_assets(pair)
+        return f"{assets[0]}/{assets[1]}" if assets else pair
+
+    def split_assets(self, pair):
+        """Guess (base, quote) of a pair missing from the symbol registry, None if unknown"""
+        for quote in self.quote_currencies + self.cross_quotes:
+            if pair.endswith(quote) and len(pair) > len(quote):
+                return pair[:-len(quote)], quote
+        return None
+
+    def profit_threshold(self, exchanges):
+        """Lowest best bid / best ask ratio a pair needs for any opportunity between ``exchanges``
+
+        Pairs below it can't clear the cheapest fees plus the minimum profit on
+        any buy/sell combination and are skipped without being evaluated.
+        """
+        fee = min(self.exchanges[exchange].fee for exchange in exchanges) / 100
+        required = 1 + max(self.min_profit_percent, 0) / 100
+        # Slightly lenient so rounding never drops an opportunity evaluate_opportunity would keep
+        return required * (1 + fee) / (1 - fee) ** 2 * (1 - 1e-9)
+
+    def search_limit(self):
+        """Opportunities the search keeps; depth mode re-prices and trims them afterwards"""
+        return None if self.depth else self.max_opportunities
+
+    def rank(self, opportunities):
+        """Sort opportunities best first, keeping only the top ``search_limit()``"""
+        limit = self.search_limit()
+        if limit is not None and len(opportunities) > limit:
+            # A bounded heap is O(n log limit) instead of sorting everything
+            return heapq.nlargest(limit, opportunities, key=by_profit)
+        opportunities.sort(key=by_profit, reverse=True)
+        return opportunities
+
+    def selected_prices(self, prices):
+        """The snapshots of ``prices`` that belong to selected exchanges"""
+        if self.selected_exchanges is None:
+            return prices
+        return {
+            exchange: exchange_prices for exchange, exchange_prices in prices.items()
+            if exchange in self.selected_exchanges
+        }
+
+    def compute_opportunities(self, prices):
+        """Compare already fetched prices across exchanges"""
+        prices = self.selected_prices(prices)
+        if not prices:
+            return []
+        if self.compute == 'numpy':
+            import vector_engine
+            return vector_engine.compute_opportunities(self, prices)
+        if self.compute == 'incremental':
+            if self.opportunity_index is None:
+                from opportunity_index import OpportunityIndex
+                self.opportunity_index = OpportunityIndex(self)
+            return self.opportunity_index.update(prices)[:self.search_limit()]
+        if self.compute == 'sharded':
+            if self.shard_engine is None:
+                from shard_engine import ShardEngine
+                self.shard_engine = ShardEngine(self, self.workers)
+            return self.shard_engine.compute(prices)
+        
         opportunities = []
-        prices = self.get_exchange_prices()
+        threshold = self.profit_threshold(prices)
         
         # Get all unique normalized pairs across all exchanges
         all_pairs = set()
@@ -345,6 +677,12 @@ class DirectArbitrage:
             if len(exchanges_with_pair) < 2:
                 continue
             
+            # Skip pairs whose best bid can't beat the best ask by the fees and minimum profit
+            best_bid = max(prices[exchange][pair].bid for exchange in exchanges_with_pair)
+            best_ask = min(prices[exchange][pair].ask for exchange in exchanges_with_pair)
+            if best_bid < best_ask * threshold:
+                continue
+            
             # Compare each exchange combination for this pair
             for buy_exchange in exchanges_with_pair:
                 buy_data = prices[buy_exchange][pair]
@@ -352,536 +690,89 @@ class DirectArbitrage:
                 for sell_exchange in exchanges_with_pair:
                     if buy_exchange == sell_exchange:
                         continue
-                        
-                    sell_data = prices[sell_exchange][pair]
-                    
-                    # Get prices
-                    buy_price = buy_data['ask']   # Price to buy
-                    sell_price = sell_data['bid'] # Price to sell
                     
-                    # Skip if prices are invalid or unrealistic
-                    if not self.is_realistic_price_difference(buy_price, sell_price):
-                        continue
-                    
-                    # Calculate profit with fees
-                    buy_fee = self.exchanges[buy_exchange].get('fee', 0.1) / 100
-                    sell_fee = self.exchanges[sell_exchange].get('fee', 0.1) / 100
-                    
-                    # Calculate amounts with fees
-                    buy_amount = self.investment * (1 + buy_fee)
-                    coins_bought = (self.investment / buy_price) * (1 - buy_fee)
-                    sell_amount = (coins_bought * sell_price) * (1 - sell_fee)
-                    
-                    profit_amount = sell_amount - buy_amount
-                    profit_percent = (profit_amount / buy_amount) * 100
-                    
-                    # Only show opportunities with realistic profits (max 3%)
-                    if 0 < profit_percent <= 3:
-                        # Format pair for display
-                        display_pair = pair
-                        for quote in self.quote_currencies:
-                            if pair.endswith(quote):
-                                base = pair[:-len(quote)]
-                                display_pair = f"{base}/{quote}"
-                                break
-                        
-                        opportunities.append({
-                            'pair': display_pair,
-                            'buy_exchange': buy_exchange,
-                            'sell_exchange': sell_exchange,
-                            'buy_price': buy_price,
-                            'sell_price': sell_price,
-                            'profit_percent': profit_percent,
-                            'profit_amount': profit_amount,
-                            'investment': self.investment,
-                            'original_buy_symbol': buy_data['original_symbol'],
-                            'original_sell_symbol': sell_data['original_symbol'],
-                            'buy_fee': buy_fee * 100,
-                            'sell_fee': sell_fee * 100,
-                            'coins_bought': coins_bought,
-                            'final_amount': sell_amount
-                        })
+                    opportunity = self.evaluate_opportunity(
+                        pair, buy_exchange, buy_data, sell_exchange, prices[sell_exchange][pair]
+                    )
+                    if opportunity is not None:
+                        opportunities.append(opportunity)
         
         # Sort by profit percentage
-        opportunities.sort(key=lambda x: x['profit_percent'], reverse=True)
-        return opportunities
+        return self.rank(opportunities)
 
-class DirectArbitrageGUI(QMainWindow):
-    def __init__(self):
-        super().__init__()
-        self.arbitrage = DirectArbitrage()
-        self.opportunities = []
-        self.min_profit_percent = 0.5  # Minimum profit percentage to show
-        self.selected_exchanges = set(self.arbitrage.exchanges.keys())  # All exchanges selected by default
-        self.init_ui()
-
-    def init_ui(self):
-        """Initialize the user interface"""
-        self.setWindowTitle('Crypto Arbitrage')
-        self.setGeometry(100, 100, 1400, 800)
-        
-        # Create main widget and layout
-        main_widget = QWidget()
-        self.setCentralWidget(main_widget)
-        layout = QVBoxLayout(main_widget)
-        layout.setSpacing(15)
-        layout.setContentsMargins(15, 15, 15, 15)
-        
-        # Create top panel
-        top_panel = QWidget()
-        top_panel.setStyleSheet("""
-            QWidget {
-                background-color: #1E1E1E;
-                border-radius: 6px;
-            }
-        """)
-        top_panel.setFixedHeight(50)  # Fixed height for consistency
-        
-        top_layout = QHBoxLayout(top_panel)
-        top_layout.setContentsMargins(15, 0, 15, 0)
-        top_layout.setSpacing(15)
-        
-        # Left side - inputs
-        inputs_widget = QWidget()
-        inputs_layout = QHBoxLayout(inputs_widget)
-        inputs_layout.setSpacing(10)
-        inputs_layout.setContentsMargins(0, 0, 0, 0)
-        
-        self.investment_input = QLineEdit()
-        self.investment_input.setPlaceholderText('Investment $')
-        self.investment_input.setText('1000')
-        self.investment_input.setFixedWidth(120)
-        self.investment_input.setFixedHeight(32)
-        
-        self.profit_input = QLineEdit()
-        self.profit_input.setPlaceholderText('Min Profit %')
-        self.profit_input.setText('0.5')
-        self.profit_input.setFixedWidth(120)
-        self.profit_input.setFixedHeight(32)
-        
-        inputs_layout.addWidget(self.investment_input)
-        inputs_layout.addWidget(self.profit_input)
-        
-        # Center - exchanges in horizontal layout
-        exchanges_widget = QWidget()
-        exchanges_layout = QHBoxLayout(exchanges_widget)
-        exchanges_layout.setSpacing(15)
-        exchanges_layout.setContentsMargins(0, 0, 0, 0)
-        
-        self.exchange_checkboxes = {}
-        for exchange in self.arbitrage.exchanges.keys():
-            checkbox = QCheckBox(exchange)
-            checkbox.setChecked(True)
-            checkbox.stateChanged.connect(self.update_selected_exchanges)
-            self.exchange_checkboxes[exchange] = checkbox
-            exchanges_layout.addWidget(checkbox)
-        
-        # Right side - buttons
-        buttons_widget = QWidget()
-        buttons_layout = QHBoxLayout(buttons_widget)
-        buttons_layout.setSpacing(8)
-        buttons_layout.setContentsMargins(0, 0, 0, 0)
-        
-        self.start_btn = QPushButton('▶ Start')
-        self.start_btn.clicked.connect(self.start_monitoring)
-        self.start_btn.setFixedWidth(90)
-        self.start_btn.setFixedHeight(32)
-        
-        self.refresh_btn = QPushButton('↻ Refresh')
-        self.refresh_btn.clicked.connect(self.refresh_data)
-        self.refresh_btn.setFixedWidth(90)
-        self.refresh_btn.setFixedHeight(32)
-        
-        buttons_layout.addWidget(self.start_btn)
-        buttons_layout.addWidget(self.refresh_btn)
-        
-        # Add widgets to top layout with proper spacing
-        top_layout.addWidget(inputs_widget)
-        top_layout.addStretch(1)
-        top_layout.addWidget(exchanges_widget)
-        top_layout.addStretch(1)
-        top_layout.addWidget(buttons_widget)
-        
-        # Create table
-        self.table = QTableWidget()
-        self.table.setColumnCount(8)
-        self.table.setHorizontalHeaderLabels([
-            'Trading Pair', 'Buy From', 'Sell At', 
-            'Buy Price', 'Sell Price', 'Profit %',
-            'Profit $', 'Investment'
-        ])
-        
-        # Set table properties
-        header = self.table.horizontalHeader()
-        header.setSectionResizeMode(QHeaderView.ResizeMode.ResizeToContents)
-        header.setDefaultAlignment(Qt.AlignmentFlag.AlignLeft)
-        header.setFixedHeight(35)
-        header.setStyleSheet("""
-            QHeaderView::section {
-                background-color: #1E1E1E;
-                color: #888888;
-                border: none;
-                border-bottom: 1px solid #333333;
-                padding: 5px 10px;
-                font-size: 12px;
-                font-weight: bold;
-            }
-            QHeaderView::section:first {
-                padding-left: 15px;
-            }
-            QHeaderView::section:nth-child(6),
-            QHeaderView::section:nth-child(7) {
-                color: #4CAF50;
-            }
-        """)
-        
-        # Set table style
-        self.table.setStyleSheet("""
-            QTableWidget {
-                background-color: #121212;
-                color: white;
-                border: none;
-                border-radius: 6px;
-                gridline-color: #2A2A2A;
-                outline: none;
-            }
-            QTableWidget::item {
-                padding: 8px 10px;
-                border-bottom: 1px solid #1E1E1E;
-            }
-            QTableWidget::item:first {
-                padding-left: 15px;
-            }
-            QTableWidget::item:selected {
-                background-color: #2A2A2A;
-            }
-        """)
-        
-        self.table.setEditTriggers(QTableWidget.EditTrigger.NoEditTriggers)
-        self.table.setSelectionBehavior(QTableWidget.SelectionBehavior.SelectRows)
-        self.table.setAlternatingRowColors(True)
-        self.table.setShowGrid(False)
-        self.table.verticalHeader().setVisible(False)
-        self.table.setVerticalScrollMode(QTableWidget.ScrollMode.ScrollPerPixel)
-        self.table.horizontalHeader().setStretchLastSection(True)
-        
-        # Add widgets to main layout
-        layout.addWidget(top_panel)
-        layout.addWidget(self.table)
-        
-        # Update styles
-        self.setStyleSheet("""
-            QMainWindow {
-                background-color: #121212;
-            }
-            QLineEdit {
-                background-color: #252525;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 4px 12px;
-                font-size: 13px;
-                font-weight: bold;
-            }
-            QLineEdit::placeholder {
-                color: #888888;
-            }
-            QPushButton {
-                background-color: #4CAF50;
-                color: white;
-                border: none;
-                border-radius: 4px;
-                padding: 6px 12px;
-                font-size: 13px;
-                font-weight: bold;
-            }
-            QPushButton:hover {
-                background-color: #45a049;
-            }
-            QPushButton:pressed {
-                background-color: #3d8b40;
-            }
-            QCheckBox {
-                color: white;
-                spacing: 8px;
-                font-size: 13px;
-                font-weight: bold;
-                padding: 0px 4px;
-            }
-            QCheckBox::indicator {
-                width: 18px;
-                height: 18px;
-                border-radius: 3px;
-                border: 2px solid #4CAF50;
-            }
-            QCheckBox::indicator:unchecked {
-                background-color: transparent;
-            }
-            QCheckBox::indicator:checked {
-                background-color: #4CAF50;
-                border-color: #4CAF50;
-                image: url(check.png);
-            }
-        """)
-        
-        self.statusBar().showMessage('Ready')
 
-    def update_selected_exchanges(self):
-        """Update the set of selected exchanges based on checkbox states"""
-        self.selected_exchanges = {
-            exchange for exchange, checkbox in self.exchange_checkboxes.items()
-            if checkbox.isChecked()
-        }
+def write_opportunities(opportunities, out):
+    """Write opportunities as JSON lines stamped with the scan time"""
+    stamp = datetime.now().isoformat(timespec='seconds')
+    for opportunity in opportunities:
+        out.write(json.dumps({'time': stamp, **opportunity.as_dict()}) + '\n')
+    out.flush()
+
 
-    def refresh_data(self):
-        """Refresh arbitrage opportunities"""
+def run_headless(args):
+    """Scan in a loop without Qt, writing JSON lines to stdout or a file"""
+    out = sys.stdout if args.output == '-' else open(args.output, 'a')
+    arbitrage = DirectArbitrage(backend=args.backend, compute=args.compute, depth=args.depth, workers=args.workers)
+    arbitrage.investment = args.investment
+    arbitrage.min_profit_percent = args.min_profit
+    arbitrage.max_opportunities = args.top
+    if args.exchanges:
+        arbitrage.selected_exchanges = set(args.exchanges)
+    if args.record:
+        from recorder import Recorder
+        arbitrage.recorder = Recorder(args.record)
+    metrics_server = None
+    if args.metrics_port is not None:
+        from metrics import MetricsServer
+        metrics_server = MetricsServer(arbitrage, args.metrics_port, args.metrics_host).start()
+        print(f"Serving metrics at http://{args.metrics_host}:{metrics_server.port}/metrics", file=sys.stderr)
+
+    def on_scan(opportunities):
+        write_opportunities(opportunities, out)
+
+    # Progress messages go to stderr so stdout stays valid JSON lines
+    with contextlib.redirect_stdout(sys.stderr):
         try:
-            # Update investment amount
-            investment = float(self.investment_input.text())
-            self.arbitrage.investment = investment
-            
-            # Update minimum profit
-            self.min_profit_percent = float(self.profit_input.text())
-            
-            # Get opportunities
-            self.statusBar().showMessage('Fetching latest prices...')
-            all_opportunities = self.arbitrage.find_arbitrage_opportunities()
-            
-            # Filter opportunities by selected exchanges and minimum profit
-            self.opportunities = [
-                op for op in all_opportunities
-                if op['buy_exchange'] in self.selected_exchanges
-                and op['sell_exchange'] in self.selected_exchanges
-                and op['profit_percent'] >= self.min_profit_percent
-            ]
-            
-            self.update_table()
-            
-            if len(self.opportunities) > 0:
-                best_op = self.opportunities[0]
-                self.statusBar().showMessage(
-                    f"Found {len(self.opportunities)} opportunities. " +
-                    f"Best: {best_op['pair']} ({best_op['buy_exchange']} → {best_op['sell_exchange']}) {best_op['profit_percent']:.2f}%"
-                )
+            if args.once:
+                on_scan(arbitrage.find_arbitrage_opportunities())
             else:
-                self.statusBar().showMessage('No profitable opportunities found')
-                
-        except ValueError as e:
-            self.statusBar().showMessage('Invalid input values')
-        except Exception as e:
-            self.statusBar().showMessage(f'Error: {str(e)}')
+                RefreshScheduler(arbitrage, interval=args.interval, on_scan=on_scan).run_forever()
+        except KeyboardInterrupt:
+            pass
+        finally:
+            arbitrage.close()
+            if metrics_server is not None:
+                metrics_server.stop()
+            if out is not sys.stdout:
+                out.close()
 
-    def show_detailed_analysis(self, item):
-        """Show detailed analysis of the selected opportunity"""
-        row = item.row()
-        if row < len(self.opportunities):
-            op = self.opportunities[row]
-            
-            dialog = QDialog(self)
-            dialog.setWindowTitle(f"Detailed Analysis - {op['pair']}")
-            dialog.setMinimumWidth(600)
-            dialog.setStyleSheet("""
-                QDialog {
-                    background-color: #1e1e1e;
-                }
-                QTextEdit {
-                    background-color: #2d2d2d;
-                    color: #ffffff;
-                    border: none;
-                    border-radius: 8px;
-                    padding: 15px;
-                    selection-background-color: #2962ff;
-                }
-            """)
-            
-            layout = QVBoxLayout(dialog)
-            layout.setContentsMargins(20, 20, 20, 20)
-            layout.setSpacing(15)
-            
-            # Create title
-            title = QLabel(f"Trading Analysis for {op['pair']}")
-            title.setStyleSheet("""
-                font-size: 18px;
-                font-weight: bold;
-                color: #ffffff;
-                padding-bottom: 10px;
-            """)
-            layout.addWidget(title)
-            
-            # Create details with HTML formatting
-            details = f"""
-            <style>
-                .detail-table {{ 
-                    border-collapse: collapse; 
-                    width: 100%;
-                    margin: 10px 0;
-                }}
-                .detail-table td, .detail-table th {{ 
-                    padding: 12px; 
-                    text-align: left; 
-                    border-bottom: 1px solid #3d3d3d;
-                }}
-                .section-header {{
-                    color: #888888;
-                    font-size: 14px;
-                    font-weight: bold;
-                    padding: 15px 12px 5px 12px;
-                    background-color: #2d2d2d;
-                }}
-                .label {{
-                    color: #888888;
-                    width: 140px;
-                }}
-                .value {{
-                    color: #ffffff;
-                    font-weight: 500;
-                }}
-                .profit {{
-                    color: #00c853;
-                    font-weight: bold;
-                }}
-                .fee {{
-                    color: #ff5252;
-                }}
-                .exchange {{
-                    color: #ffb74d;
-                }}
-                .pair {{
-                    color: #42a5f5;
-                }}
-            </style>
-            
-            <div class='section-header'>TRADING PAIR INFORMATION</div>
-            <table class='detail-table'>
-                <tr>
-                    <td class='label'>Trading Pair:</td>
-                    <td class='value pair'>{op['pair']}</td>
-                </tr>
-                <tr>
-                    <td class='label'>Buy Exchange:</td>
-                    <td class='value exchange'>{op['buy_exchange']} ({op['original_buy_symbol']})</td>
-                </tr>
-                <tr>
-                    <td class='label'>Sell Exchange:</td>
-                    <td class='value exchange'>{op['sell_exchange']} ({op['original_sell_symbol']})</td>
-                </tr>
-            </table>
-
-            <div class='section-header'>PRICE INFORMATION</div>
-            <table class='detail-table'>
-                <tr>
-                    <td class='label'>Buy Price:</td>
-                    <td class='value'>${op['buy_price']:.8f}</td>
-                </tr>
-                <tr>
-                    <td class='label'>Sell Price:</td>
-                    <td class='value'>${op['sell_price']:.8f}</td>
-                </tr>
-                <tr>
-                    <td class='label'>Buy Fee:</td>
-                    <td class='value fee'>{op['buy_fee']:.2f}%</td>
-                </tr>
-                <tr>
-                    <td class='label'>Sell Fee:</td>
-                    <td class='value fee'>{op['sell_fee']:.2f}%</td>
-                </tr>
-            </table>
-
-            <div class='section-header'>PROFIT ANALYSIS</div>
-            <table class='detail-table'>
-                <tr>
-                    <td class='label'>Investment:</td>
-                    <td class='value'>${op['investment']:.2f}</td>
-                </tr>
-                <tr>
-                    <td class='label'>Coins Bought:</td>
-                    <td class='value'>{op['coins_bought']:.8f}</td>
-                </tr>
-                <tr>
-                    <td class='label'>Final Amount:</td>
-                    <td class='value'>${op['final_amount']:.2f}</td>
-                </tr>
-                <tr>
-                    <td class='label'>Profit Amount:</td>
-                    <td class='value profit'>${op['profit_amount']:.2f}</td>
-                </tr>
-                <tr>
-                    <td class='label'>Profit Percentage:</td>
-                    <td class='value profit'>{op['profit_percent']:.2f}%</td>
-                </tr>
-            </table>
-            """
-            
-            # Create text display
-            text_display = QTextEdit()
-            text_display.setHtml(details)
-            text_display.setReadOnly(True)
-            layout.addWidget(text_display)
-            
-            dialog.exec()
 
-    def update_table(self):
-        """Update the table with current opportunities"""
-        self.table.setRowCount(len(self.opportunities))
-        
-        for i, op in enumerate(self.opportunities):
-            # Format values
-            pair = op['pair'].replace('/', '-')
-            buy_exchange = op['buy_exchange']
-            sell_exchange = op['sell_exchange']
-            buy_price = f"${op['buy_price']:.8f}"
-            sell_price = f"${op['sell_price']:.8f}"
-            profit_percent = f"{op['profit_percent']:.2f}%"
-            profit_amount = f"${op['profit_amount']:.2f}"
-            investment = f"${op['investment']:.2f}"
-            
-            # Create items
-            items = [
-                self.create_table_item(pair, 'pair'),
-                self.create_table_item(buy_exchange, 'exchange'),
-                self.create_table_item(sell_exchange, 'exchange'),
-                self.create_table_item(buy_price, 'price'),
-                self.create_table_item(sell_price, 'price'),
-                self.create_table_item(profit_percent, 'profit'),
-                self.create_table_item(profit_amount, 'profit'),
-                self.create_table_item(investment, 'investment')
-            ]
-            
-            # Add items to table
-            for col, item in enumerate(items):
-                self.table.setItem(i, col, item)
-            
-            # Set row height
-            self.table.setRowHeight(i, 40)
-    
-    def create_table_item(self, text, item_type):
-        """Create a table item with appropriate styling"""
-        item = QTableWidgetItem(text)
-        item.setTextAlignment(Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter)
-        
-        # Set colors based on item type
-        if item_type == 'profit':
-            item.setForeground(QColor("#4CAF50"))  # Brighter green for profit
-            font = item.font()
-            font.setBold(True)
-            item.setFont(font)
-        elif item_type == 'exchange':
-            item.setForeground(QColor("#64B5F6"))  # Light blue for exchanges
-        elif item_type == 'pair':
-            item.setForeground(QColor("#FFA726"))  # Orange for trading pairs
-        elif item_type == 'price':
-            item.setForeground(QColor("#E0E0E0"))  # Light gray for prices
-        else:
-            item.setForeground(QColor("#FFFFFF"))  # White for other items
-        
-        return item
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Crypto arbitrage scanner')
+    parser.add_argument('--headless', action='store_true', help='scan without the GUI, writing JSON lines')
+    parser.add_argument('--output', default='-', help='JSON lines file to append to, - for stdout')
+    parser.add_argument('--interval', type=float, default=10, help='seconds between scans')
+    parser.add_argument('--once', action='store_true', help='scan once and exit')
+    parser.add_argument('--investment', type=float, default=1000)
+    parser.add_argument('--min-profit', type=float, default=0.5, help='minimum profit percentage')
+    parser.add_argument('--exchanges', nargs='+', choices=list(ADAPTERS), help='exchanges to scan (default: all)')
+    parser.add_argument('--top', type=int, metavar='N', help='report only the N most profitable opportunities')
+    parser.add_argument('--backend', choices=DirectArbitrage.BACKENDS, default='threads')
+    parser.add_argument('--compute', choices=DirectArbitrage.COMPUTE_ENGINES, default='python')
+    parser.add_argument('--workers', type=int, help='processes of --compute sharded (default: one per core)')
+    parser.add_argument('--depth', action='store_true', help='re-price the best opportunities against order books')
+    parser.add_argument('--record', metavar='DIR', help='also record every snapshot and scan to DIR')
+    parser.add_argument('--metrics-port', type=int, metavar='PORT',
+                        help='serve per-exchange metrics in the Prometheus format on PORT')
+    parser.add_argument('--metrics-host', default='127.0.0.1', help='address the metrics endpoint binds to')
+    args = parser.parse_args(argv)
+
+    if args.headless:
+        run_headless(args)
+    else:
+        from arbitrage_gui import main as run_gui
+        run_gui()
 
-    def start_monitoring(self):
-        """Start continuous monitoring of arbitrage opportunities"""
-        self.refresh_data()
 
 if __name__ == '__main__':
-    app = QApplication(sys.argv)
-    ex = DirectArbitrageGUI()
-    ex.show()
-    sys.exit(app.exec())
+    main()
@@ -0,0 +1,398 @@
+"""Per-exchange adapters for the arbitrage scanner.
+
+Every venue is a small ExchangeAdapter subclass that knows its endpoint, its
+taker fee and how to pull (symbol, bid, ask) out of its ticker payload. The
+shared validation lives in ExchangeAdapter.parse, so adding an exchange means
+registering one more subclass:
+
+    @register_adapter
+    class Gate(ExchangeAdapter):
+        name = 'Gate'
+        url = 'https://api.gateio.ws/api/v4/spot/tickers'
+        fee = 0.2
+
+        def rows(self, data):
+            return data
+
+        def quote(self, ticker):
+            return ticker['currency_pair'], ticker['highest_bid'], ticker['lowest_ask']
+"""
+import json
+from itertools import chain
+from urllib.parse import quote as url_quote
+
+from records import PriceQuote
+
+ADAPTERS = {}  # exchange name -> adapter class, in registration order
+# Reasons a ticker is left out of a snapshot, see ExchangeAdapter.parse_counted
+REJECT_RULES = ('malformed', 'invalid_price', 'crossed', 'wide_spread')
+
+
+def register_adapter(cls):
+    """Class decorator adding an adapter to the registry"""
+    ADAPTERS[cls.name] = cls
+    return cls
+
+
+def is_valid_price(price):
+    """Validate price values"""
+    try:
+        price = float(price)
+        return price > 0 and price < 1000000  # Reasonable price range
+    except (TypeError, ValueError):
+        return False
+
+
+def normalize_pair(pair):
+    """Normalize trading pair format across exchanges
+
+    Fallback for symbols missing from the symbol registry. USDT is left where
+    it is: in USDTTRY it is the base, not a misplaced quote.
+    """
+    # Remove common separators and convert to uppercase
+    return pair.upper().replace('-', '').replace('_', '').replace('/', '')
+
+
+class ExchangeAdapter:
+    """Endpoint, fee and payload parsing of a single exchange"""
+    name = None
+    url = None
+    fee = 0.1  # Taker fee in percent
+    max_spread = 0.01  # Max 1% spread between bid and ask
+    min_refresh = 1  # Shortest snapshot period in seconds the venue's rate limits allow
+    rate_limit = (20, 1)  # Request weight the venue allows per IP, per that many seconds
+    request_weights = {}  # Weight of 'tickers', 'depth' and 'symbols' requests, 1 if missing
+    used_weight_header = None  # Response header reporting the weight used so far
+    symbol_batch = None  # Most symbols one filtered ticker request may name, None if the venue can't filter
+    ws_url = None  # Public best bid/ask stream, None if the venue is polled over REST
+    ws_ping = None  # Application level keep-alive message, if the venue needs one
+    ws_max_streams = None  # Most symbols one stream connection may subscribe to, None if unlimited
+    ws_message_rate = None  # Subscribe messages sent per second on one connection, None if unlimited
+    symbols_url = None  # Listing of the venue's spot symbols with their base and quote assets
+    depth_endpoint = None  # L2 order book URL template, formatted with symbol and limit
+
+    def __init__(self):
+        self.symbols = {}  # raw symbol -> canonical pair, filled from the SymbolRegistry
+
+    def urls(self):
+        """URLs whose payloads together make up one snapshot"""
+        return [self.url]
+
+    def batch_url(self, symbols):
+        """URL of the tickers of only ``symbols``, for venues with a symbol_batch"""
+        raise NotImplementedError
+
+    def rows(self, data, *extra):
+        """Return the ticker entries of a raw payload"""
+        raise NotImplementedError
+
+    def quote(self, ticker):
+        """Return (symbol, bid, ask) of one ticker entry"""
+        raise NotImplementedError
+
+    def parse(self, data, *extra):
+        """Turn raw payloads into a table of normalized, validated prices"""
+        return self.parse_counted(data, *extra)[0]
+
+    def parse_counted(self, data, *extra):
+        """Like parse, also returning how many tickers each validation rule rejected"""
+        prices = {}
+        rejected = dict.fromkeys(REJECT_RULES, 0)
+        for ticker in self.rows(data, *extra):
+            try:
+                symbol, bid, ask = self.quote(ticker)
+            except (KeyError, ValueError, TypeError):
+                rejected['malformed'] += 1
+                continue
+            try:
+                bid = float(bid)
+                ask = float(ask)
+            except (ValueError, TypeError):
+                rejected['invalid_price'] += 1
+                continue
+            rule = self.rejection(bid, ask)
+            if rule is None:
+                prices[self.pair(symbol)] = PriceQuote(bid, ask, symbol)
+            else:
+                rejected[rule] += 1
+        return prices, rejected
+
+    def ws_subscriptions(self, symbols):
+        """Messages subscribing to the best bid/ask stream of ``symbols``"""
+        raise NotImplementedError
+
+    def ws_quotes(self, message):
+        """Return (symbol, bid, ask) updates of one decoded stream message
+
+        A side that did not change in this message is returned as None.
+        """
+        raise NotImplementedError
+
+    def symbol_assets(self, data):
+        """Return (symbol, base, quote) of every symbol in a symbols_url payload"""
+        raise NotImplementedError
+
+    def depth_url(self, symbol, limit):
+        """URL of the order book of one of this exchange's symbols"""
+        return self.depth_endpoint.format(symbol=symbol, limit=limit)
+
+    def depth_levels(self, data):
+        """Return the raw (bids, asks) entries of an order book payload, best first"""
+        raise NotImplementedError
+
+    def parse_depth(self, data):
+        """Turn an order book payload into (bids, asks) lists of (price, size)"""
+        bids, asks = self.depth_levels(data)
+        return (
+            [(float(level[0]), float(level[1])) for level in bids],
+            [(float(level[0]), float(level[1])) for level in asks]
+        )
+
+    def pair(self, symbol):
+        """Canonical pair of one of this exchange's symbols"""
+        pair = self.symbols.get(symbol)
+        if pair is None:
+            # Unregistered symbol, normalize it once and remember the result
+            pair = self.symbols[symbol] = normalize_pair(symbol)
+        return pair
+
+    def rejection(self, bid, ask):
+        """Name of the validation rule a quote breaks, None if it passes"""
+        if not (is_valid_price(bid) and is_valid_price(ask)):
+            return 'invalid_price'
+        if bid >= ask:
+            return 'crossed'
+        if (ask - bid) / bid > self.max_spread:
+            return 'wide_spread'
+        return None
+
+    def accept(self, symbol, bid, ask):
+        """Validate one quote, returning (pair, price entry) or None"""
+        bid = float(bid)
+        ask = float(ask)
+        if self.rejection(bid, ask) is not None:
+            return None
+        return self.pair(symbol), PriceQuote(bid, ask, symbol)
+
+
+@register_adapter
+class Binance(ExchangeAdapter):
+    name = 'Binance'
+    url = 'https://api.binance.com/api/v3/ticker/bookTicker'
+    fee = 0.075  # 0.075% with BNB
+    rate_limit = (6000, 60)
+    request_weights = {'tickers': 4, 'depth': 5, 'symbols': 20}  # All-symbols bookTicker weighs 4
+    used_weight_header = 'X-MBX-USED-WEIGHT-1M'
+    symbol_batch = 100
+    ws_url = 'wss://stream.binance.com:9443/ws'
+    ws_max_streams = 1024
+    ws_message_rate = 4  # Binance drops clients sending over 5 messages per second, pongs included
+    symbols_url = 'https://api.binance.com/api/v3/exchangeInfo'
+    depth_endpoint = 'https://api.binance.com/api/v3/depth?symbol={symbol}&limit={limit}'
+
+    def batch_url(self, symbols):
+        return f"{self.url}?symbols={url_quote(json.dumps(symbols, separators=(',', ':')))}"
+
+    def rows(self, data, *batches):
+        # Filtered snapshots arrive as one payload per batch of symbols
+        return chain(data, *batches) if batches else data
+
+    def quote(self, ticker):
+        return ticker['symbol'], ticker['bidPrice'], ticker['askPrice']
+
+    def symbol_assets(self, data):
+        return [(s['symbol'], s['baseAsset'], s['quoteAsset']) for s in data.get('symbols', [])]
+
+    def depth_levels(self, data):
+        return data['bids'], data['asks']
+
+    def ws_subscriptions(self, symbols):
+        streams = [f"{symbol.lower()}@bookTicker" for symbol in symbols]
+        return [
+            {'method': 'SUBSCRIBE', 'params': streams[i:i + 200], 'id': i // 200 + 1}
+            for i in range(0, len(streams), 200)
+        ]
+
+    def ws_quotes(self, message):
+        if 's' in message:
+            return [(message['s'], message['b'], message['a'])]
+        return []
+
+
+@register_adapter
+class KuCoin(ExchangeAdapter):
+    name = 'KuCoin'
+    url = 'https://api.kucoin.com/api/v1/market/allTickers'
+    fee = 0.08  # 0.08% with KCS
+    rate_limit = (2000, 30)  # Public resource pool
+    request_weights = {'tickers': 15, 'depth': 2, 'symbols': 4}
+    symbols_url = 'https://api.kucoin.com/api/v2/symbols'
+    depth_endpoint = 'https://api.kucoin.com/api/v1/market/orderbook/level2_20?symbol={symbol}'
+
+    def rows(self, data):
+        if 'data' in data and 'ticker' in data['data']:
+            return data['data']['ticker']
+        return []
+
+    def quote(self, ticker):
+        return ticker['symbol'], ticker['buy'], ticker['sell']
+
+    def symbol_assets(self, data):
+        return [(s['symbol'], s['baseCurrency'], s['quoteCurrency']) for s in data.get('data') or []]
+
+    def depth_levels(self, data):
+        return data['data']['bids'], data['data']['asks']
+
+
+@register_adapter
+class MEXC(ExchangeAdapter):
+    name = 'MEXC'
+    url = 'https://api.mexc.com/api/v3/ticker/bookTicker'
+    fee = 0.2
+    rate_limit = (500, 10)
+    request_weights = {'symbols': 10}
+    symbols_url = 'https://api.mexc.com/api/v3/exchangeInfo'
+    depth_endpoint = 'https://api.mexc.com/api/v3/depth?symbol={symbol}&limit={limit}'
+
+    def rows(self, data):
+        return data
+
+    def quote(self, ticker):
+        return ticker['symbol'], ticker['bidPrice'], ticker['askPrice']
+
+    def symbol_assets(self, data):
+        return [(s['symbol'], s['baseAsset'], s['quoteAsset']) for s in data.get('symbols', [])]
+
+    def depth_levels(self, data):
+        return data['bids'], data['asks']
+
+
+@register_adapter
+class Bybit(ExchangeAdapter):
+    name = 'Bybit'
+    url = 'https://api.bybit.com/v5/market/tickers?category=spot'
+    fee = 0.06  # 0.06% with BIT
+    rate_limit = (600, 5)
+    ws_url = 'wss://stream.bybit.com/v5/public/spot'
+    ws_ping = '{"op": "ping"}'
+    symbols_url = 'https://api.bybit.com/v5/market/instruments-info?category=spot'
+    depth_endpoint = 'https://api.bybit.com/v5/market/orderbook?category=spot&symbol={symbol}&limit={limit}'
+
+    def rows(self, data):
+        if 'result' in data and 'list' in data['result']:
+            return data['result']['list']
+        return []
+
+    def quote(self, ticker):
+        return ticker['symbol'], ticker['bid1Price'], ticker['ask1Price']
+
+    def symbol_assets(self, data):
+        return [(s['symbol'], s['baseCoin'], s['quoteCoin']) for s in self.rows(data)]
+
+    def depth_levels(self, data):
+        return data['result']['b'], data['result']['a']
+
+    def ws_subscriptions(self, symbols):
+        topics = [f"orderbook.1.{symbol}" for symbol in symbols]
+        return [
+            {'op': 'subscribe', 'args': topics[i:i + 10]}
+            for i in range(0, len(topics), 10)
+        ]
+
+    def ws_quotes(self, message):
+        book = message.get('data')
+        if not str(message.get('topic', '')).startswith('orderbook.') or not book:
+            return []
+        bids, asks = book.get('b'), book.get('a')
+        return [(
+            book['s'],
+            bids[0][0] if bids else None,
+            asks[0][0] if asks else None
+        )]
+
+
+@register_adapter
+class OKX(ExchangeAdapter):
+    name = 'OKX'
+    url = 'https://www.okx.com/api/v5/market/tickers?instType=SPOT'
+    fee = 0.08  # 0.08% with OKB
+    rate_limit = (20, 2)  # Tickers endpoint, the tightest of the three used
+    ws_url = 'wss://ws.okx.com:8443/ws/v5/public'
+    ws_ping = 'ping'
+    symbols_url = 'https://www.okx.com/api/v5/public/instruments?instType=SPOT'
+    depth_endpoint = 'https://www.okx.com/api/v5/market/books?instId={symbol}&sz={limit}'
+
+    def rows(self, data):
+        return data.get('data', [])
+
+    def quote(self, ticker):
+        return ticker['instId'], ticker['bidPx'], ticker['askPx']
+
+    def symbol_assets(self, data):
+        return [(s['instId'], s['baseCcy'], s['quoteCcy']) for s in self.rows(data)]
+
+    def depth_levels(self, data):
+        book = data['data'][0]
+        return book['bids'], book['asks']
+
+    def ws_subscriptions(self, symbols):
+        args = [{'channel': 'tickers', 'instId': symbol} for symbol in symbols]
+        return [
+            {'op': 'subscribe', 'args': args[i:i + 100]}
+            for i in range(0, len(args), 100)
+        ]
+
+    def ws_quotes(self, message):
+        if message.get('arg', {}).get('channel') != 'tickers':
+            return []
+        return [self.quote(ticker) for ticker in message.get('data', [])]
+
+
+@register_adapter
+class LBank(ExchangeAdapter):
+    name = 'LBank'
+    url = 'https://api.lbkex.com/v1/ticker.do?symbol=all'
+    fee = 0.08  # 0.08% standard fee
+    rate_limit = (200, 10)
+    symbols_url = 'https://api.lbkex.com/v2/currencyPairs.do'
+    depth_endpoint = 'https://api.lbkex.com/v2/depth.do?symbol={symbol}&size={limit}'
+
+    def rows(self, data):
+        return data
+
+    def symbol_assets(self, data):
+        # Only the symbols are listed, and they are always base_quote
+        return [(symbol, *symbol.upper().split('_', 1)) for symbol in data.get('data', []) if '_' in symbol]
+
+    def depth_levels(self, data):
+        return data['data']['bids'], data['data']['asks']
+
+    def quote(self, ticker):
+        book = ticker['ticker']
+        if 'bid' in book and 'ask' in book:
+            return ticker['symbol'], book['bid'], book['ask']
+        # Only the last trade is published, assume a 0.1% spread around it
+        latest = float(book['latest'])
+        return ticker['symbol'], latest * 0.999, latest * 1.001
+
+
+@register_adapter
+class Bitget(ExchangeAdapter):
+    name = 'Bitget'
+    url = 'https://api.bitget.com/api/spot/v1/market/tickers'
+    fee = 0.1  # 0.1% standard fee
+    symbols_url = 'https://api.bitget.com/api/spot/v1/public/products'
+    depth_endpoint = 'https://api.bitget.com/api/spot/v1/market/depth?symbol={symbol}_SPBL&type=step0&limit={limit}'
+
+    def rows(self, data):
+        return data.get('data', [])
+
+    def quote(self, ticker):
+        return ticker['symbol'], ticker['buyOne'], ticker['sellOne']
+
+    def symbol_assets(self, data):
+        # Tickers use symbolName (BTCUSDT), not the product id (BTCUSDT_SPBL)
+        return [(s['symbolName'], s['baseCoin'], s['quoteCoin']) for s in self.rows(data)]
+
+    def depth_levels(self, data):
+        return data['data']['bids'], data['data']['asks']
@@ -0,0 +1,23 @@
+"""JSON decoding of exchange payloads.
+
+Ticker payloads run to several megabytes, and ``requests``' ``response.json()``
+first decodes the body to text and then parses it with the stdlib decoder.
+``loads`` parses the raw bytes with orjson when it is installed, which is
+several times faster and allocates less, and falls back to the stdlib
+``json`` module otherwise. Both produce the same Python objects.
+"""
+import json
+
+try:
+    import orjson
+except ImportError:  # Optional dependency, the stdlib decoder is used instead
+    orjson = None
+
+DECODER = 'orjson' if orjson is not None else 'json'
+
+
+def loads(data):
+    """Decode a JSON document given as bytes or str"""
+    if orjson is not None:
+        return orjson.loads(data)
+    return json.loads(data)
@@ -0,0 +1,298 @@
+"""Triangular and multi-hop arbitrage over a currency graph.
+
+Every quote of every snapshot becomes two edges between its assets, each net
+of the exchange's taker fee:
+- buying the base with the quote at the ask;
+- selling the base for the quote at the bid.
+
+Edges are weighted by -log(rate). A round trip is therefore profitable exactly
+when its weights sum below zero, which makes the search a negative cycle
+search.
+
+By default the same asset on different exchanges is one node, assuming
+transfers are free as the direct scan does, and only the best rate between
+two assets is kept. Cycles therefore mix exchanges freely. With
+``cross_exchange=False``, each exchange keeps a separate graph and only cycles
+that can be executed on one venue are found.
+
+The graph is patched in place from the quotes that changed since the last
+scan rather than rebuilt. The search expands hop-bounded Bellman-Ford layers
+out of every asset that is the quote of some market, because every cycle
+passes through one. Each start only looks for cycles avoiding the starts
+searched before it. Layers keep the ``max_hops - 2`` best simple routes into
+every asset, and every layer is closed back to its start. Up to 4 hops this
+finds the best cycle of every length through every closing asset. Longer
+cycles can be missed when better routes crowd them out of a layer:
+
+    python graph_engine.py --max-hops 4 --min-profit 0.1 --top 20
+"""
+import sys
+import math
+import argparse
+import contextlib
+
+from records import CycleOpportunity, by_profit
+
+
+class GraphEngine:
+    """Profitable cycles of up to ``max_hops`` trades, kept up to date incrementally"""
+
+    def __init__(self, arbitrage, max_hops=4, min_hops=3, cross_exchange=True, max_profit_percent=3):
+        if not 2 <= min_hops <= max_hops:
+            raise ValueError(f"Expected 2 <= min_hops <= max_hops, got {min_hops} and {max_hops}")
+        self.arbitrage = arbitrage
+        self.max_hops = max_hops
+        self.min_hops = min_hops  # 2-hop cycles are the direct opportunities of the main scan
+        self.cross_exchange = cross_exchange
+        self.max_profit_percent = max_profit_percent  # Larger profits come from stale or delisted quotes
+        self.snapshots = {}  # exchange -> last full snapshot object applied
+        self.markets = {}  # exchange -> pair -> (base, quote, PriceQuote)
+        self.offers = {}  # (from node, to node) -> exchange -> edge
+        self.adjacency = {}  # from node -> to node -> best edge
+        self.fees = self.current_fees()
+        self.changed = True  # Best edges moved since the last search
+        self.cycles = []  # (nodes, edges) of the last search
+        self.search_key = None
+        self.updated_edges = 0  # Best edges replaced by the last update, for benchmarks
+
+    def current_fees(self):
+        return {name: adapter.fee for name, adapter in self.arbitrage.exchanges.items()}
+
+    def node(self, exchange, asset):
+        return asset if self.cross_exchange else (exchange, asset)
+
+    def asset(self, node):
+        return node if self.cross_exchange else node[1]
+
+    def assets(self, exchange, pair, quote):
+        """(base, quote asset) of a market, from the symbol registry or guessed from the pair"""
+        assets = self.arbitrage.symbols.assets.get(exchange, {}).get(quote.original_symbol)
+        return assets or self.arbitrage.split_assets(pair)
+
+    def edge_count(self):
+        return sum(len(targets) for targets in self.adjacency.values())
+
+    def update(self, prices):
+        """Bring the graph in line with ``prices``, touching only changed quotes"""
+        self.updated_edges = 0
+        if self.current_fees() != self.fees:
+            self.clear()
+
+        for exchange in list(self.markets):
+            if exchange not in prices:
+                self.apply_changes(exchange, dict.fromkeys(self.markets[exchange]))
+                del self.markets[exchange]
+                self.snapshots.pop(exchange, None)
+        for exchange, snapshot in prices.items():
+            # Cached snapshots are the same object, nothing to do for them
+            if self.snapshots.get(exchange) is not snapshot:
+                self.snapshots[exchange] = snapshot
+                self.update_exchange(exchange, snapshot)
+
+    def clear(self):
+        self.snapshots = {}
+        self.markets = {}
+        self.offers = {}
+        self.adjacency = {}
+        self.fees = self.current_fees()
+        self.changed = True
+
+    def update_exchange(self, exchange, snapshot):
+        old = self.markets.get(exchange, {})
+        changes = {}
+        for pair, data in snapshot.items():
+            previous = old.get(pair)
+            if previous is None or previous[2].bid != data.bid or previous[2].ask != data.ask:
+                changes[pair] = data
+        for pair in old:
+            if pair not in snapshot:
+                changes[pair] = None
+        self.apply_changes(exchange, changes)
+
+    def apply_changes(self, exchange, changes):
+        """Apply {pair: price entry, or None when delisted} updates of one exchange"""
+        market = self.markets.setdefault(exchange, {})
+        keep = 1 - self.arbitrage.exchanges[exchange].fee / 100
+        touched = set()
+        for pair, data in changes.items():
+            entry = market.get(pair)
+            if entry is not None:
+                base, quote = entry[0], entry[1]
+            elif data is not None:
+                assets = self.assets(exchange, pair, data)
+                if assets is None:
+                    continue  # Neither listed in the registry nor a known quote currency
+                base, quote = assets
+            else:
+                continue
+            buy = (self.node(exchange, quote), self.node(exchange, base))
+            sell = (buy[1], buy[0])
+            if data is None:
+                del market[pair]
+                self.offers[buy].pop(exchange, None)
+                self.offers[sell].pop(exchange, None)
+            else:
+                market[pair] = (base, quote, data)
+                symbol = data.original_symbol
+                buy_rate = keep / data.ask
+                sell_rate = data.bid * keep
+                self.offers.setdefault(buy, {})[exchange] = (
+                    -math.log(buy_rate), buy_rate, exchange, symbol, 'buy', data.ask
+                )
+                self.offers.setdefault(sell, {})[exchange] = (
+                    -math.log(sell_rate), sell_rate, exchange, symbol, 'sell', data.bid
+                )
+            touched.add(buy)
+            touched.add(sell)
+        for key in touched:
+            self.refresh_edge(key)
+
+    def refresh_edge(self, key):
+        """Point the edge between two nodes at the best offer of any exchange"""
+        offers = self.offers.get(key)
+        best = min(offers.values()) if offers else None
+        if not offers:
+            self.offers.pop(key, None)
+        source, target = key
+        targets = self.adjacency.get(source)
+        current = targets.get(target) if targets else None
+        if best is current:
+            return
+        self.updated_edges += 1
+        self.changed = True
+        if best is None:
+            del targets[target]
+            if not targets:
+                del self.adjacency[source]
+        else:
+            self.adjacency.setdefault(source, {})[target] = best
+
+    def sources(self):
+        """Nodes that are the quote of some market, stablecoins first, then by market count"""
+        counts = {}
+        for exchange, market in self.markets.items():
+            for _, quote, _ in market.values():
+                node = self.node(exchange, quote)
+                counts[node] = counts.get(node, 0) + 1
+        homes = {asset: rank for rank, asset in enumerate(self.arbitrage.quote_currencies)}
+        nodes = [node for node in counts if node in self.adjacency]
+        return sorted(nodes, key=lambda node: (
+            homes.get(self.asset(node), len(homes)), -counts[node], str(node)
+        ))
+
+    def search(self):
+        """Return (nodes, edges) of every profitable cycle found, deduplicated by rotation"""
+        limit = -math.log1p(max(self.arbitrage.min_profit_percent, 0) / 100)  # Weights must sum below this
+        floor = -math.log1p(self.max_profit_percent / 100)
+        adjacency = self.adjacency
+        keep = max(1, self.max_hops - 2)  # Routes kept per node and layer
+        found = {}
+        done = set()  # Starts searched already, every cycle through them was found from them
+        for source in self.sources():
+            done.add(source)
+            # layer[node] = up to ``keep`` (weight, nodes) of the lightest simple routes from source
+            layer = {source: [(0.0, (source,))]}
+            for hops in range(1, self.max_hops):
+                closing = hops + 1 >= self.min_hops
+                last = hops == self.max_hops - 1  # Only closed, never extended
+                extended = {}
+                for node, routes in layer.items():
+                    for target, edge in adjacency.get(node, {}).items():
+                        if target in done:
+                            continue
+                        back = adjacency[target].get(source) if closing else None
+                        for distance, nodes in routes:
+                            if target in nodes:
+                                continue
+                            candidate = distance + edge[0]
+                            # Every edge is tried as the one before the way back, not only the best
+                            if back is not None and floor <= candidate + back[0] < limit:
+                                cycle = list(nodes) + [target]
+                                found.setdefault(self.rotation(cycle), cycle)
+                            if last:
+                                continue
+                            kept = extended.setdefault(target, [])
+                            if len(kept) < keep:
+                                kept.append((candidate, nodes + (target,)))
+                                kept.sort()
+                            elif candidate < kept[-1][0]:
+                                kept[-1] = (candidate, nodes + (target,))
+                                kept.sort()
+                layer = extended
+        cycles = []
+        for nodes in found.values():
+            route = nodes + [nodes[0]]
+            cycles.append((nodes, [adjacency[a][b] for a, b in zip(route, route[1:])]))
+        return cycles
+
+    def rotation(self, nodes):
+        """The same key for every rotation of a cycle"""
+        start = nodes.index(min(nodes, key=str))
+        return tuple(nodes[start:] + nodes[:start])
+
+    def opportunities(self, prices):
+        """Apply ``prices`` and return the profitable cycles, best first"""
+        arbitrage = self.arbitrage
+        self.update(prices)
+        key = (arbitrage.min_profit_percent, self.max_hops, self.min_hops, self.max_profit_percent)
+        if self.changed or key != self.search_key:
+            self.cycles = self.search()
+            self.changed = False
+            self.search_key = key
+
+        investment = arbitrage.investment
+        opportunities = [self.evaluate(nodes, edges, investment) for nodes, edges in self.cycles]
+        opportunities.sort(key=by_profit, reverse=True)
+        return opportunities[:arbitrage.max_opportunities]
+
+    def evaluate(self, nodes, edges, investment):
+        amount = investment
+        legs = []
+        for _, rate, exchange, symbol, side, price in edges:
+            amount *= rate
+            legs.append((exchange, symbol, side, price))
+        profit_amount = amount - investment
+        return CycleOpportunity(
+            route=' → '.join(self.asset(node) for node in nodes + [nodes[0]]),
+            hops=len(edges),
+            profit_percent=profit_amount / investment * 100,
+            profit_amount=profit_amount,
+            investment=investment,
+            final_amount=amount,
+            legs=tuple(legs)
+        )
+
+
+def main(argv=None):
+    from direct_arbitrage import DirectArbitrage
+
+    parser = argparse.ArgumentParser(description='Scan once for triangular and multi-hop arbitrage')
+    parser.add_argument('--max-hops', type=int, default=4)
+    parser.add_argument('--min-hops', type=int, default=3)
+    parser.add_argument('--min-profit', type=float, default=0.1, help='minimum profit percentage')
+    parser.add_argument('--investment', type=float, default=1000)
+    parser.add_argument('--top', type=int, default=20)
+    parser.add_argument('--single-exchange', action='store_true', help='only cycles within one exchange')
+    args = parser.parse_args(argv)
+
+    arbitrage = DirectArbitrage()
+    arbitrage.investment = args.investment
+    arbitrage.min_profit_percent = args.min_profit
+    arbitrage.max_opportunities = args.top
+    arbitrage.graph_engine = GraphEngine(
+        arbitrage, max_hops=args.max_hops, min_hops=args.min_hops, cross_exchange=not args.single_exchange
+    )
+    try:
+        with contextlib.redirect_stdout(sys.stderr):
+            cycles = arbitrage.find_cycles()
+    finally:
+        arbitrage.close()
+    for cycle in cycles:
+        legs = ', '.join(f"{side} {symbol}@{exchange}" for exchange, symbol, side, _ in cycle.legs)
+        print(f"{cycle.profit_percent:6.3f}%  {cycle.route}  ({legs})")
+    if not cycles:
+        print('No profitable cycles found')
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,68 @@
+"""Conditional ticker requests.
+
+Ticker payloads are requested compressed. A response that carries an ETag or
+Last-Modified validator is remembered with its decoded payload. The next
+request for that URL sends If-None-Match / If-Modified-Since, and a 304
+answer reuses the remembered payload. When every URL of a snapshot comes
+back 304, the previous snapshot object itself is reused. Cached snapshots
+keep their identity, so incremental engines skip them.
+
+Venues that send no validators are never asked conditionally, so their
+payloads are never kept. Entries are kept per exchange, and each new snapshot
+drops the entries of URLs it wasn't built from. Filtered batch URLs change
+with the listings, so old ones would otherwise pile up.
+"""
+ACCEPT_ENCODING = 'gzip, deflate'
+
+
+def wire_size(response):
+    """Bytes a requests response took over the network, before decompression"""
+    try:
+        return response.raw.tell()
+    except (AttributeError, OSError):
+        return len(response.content)
+
+
+class ConditionalCache:
+    """Validators and payloads of the last responses, per URL"""
+
+    def __init__(self):
+        self.entries = {}  # exchange -> url -> (conditional request headers, decoded payload)
+        self.snapshots = {}  # exchange -> (urls, prices) of the last snapshot parsed from them
+
+    def headers(self, exchange, url):
+        """Headers revalidating the payload cached for ``url``, empty if there is none"""
+        entry = self.entries.get(exchange, {}).get(url)
+        return entry[0] if entry is not None else {}
+
+    def store(self, exchange, url, headers, payload):
+        validators = {}
+        if headers.get('ETag'):
+            validators['If-None-Match'] = headers['ETag']
+        if headers.get('Last-Modified'):
+            validators['If-Modified-Since'] = headers['Last-Modified']
+        if validators:
+            self.entries.setdefault(exchange, {})[url] = (validators, payload)
+        else:
+            self.entries.get(exchange, {}).pop(url, None)
+
+    def payload(self, exchange, url):
+        """Payload of a URL that answered 304 Not Modified"""
+        return self.entries[exchange][url][1]
+
+    def snapshot(self, exchange, urls):
+        """The snapshot last parsed from exactly ``urls``, if any"""
+        cached = self.snapshots.get(exchange)
+        if cached is not None and cached[0] == tuple(urls):
+            return cached[1]
+        return None
+
+    def remember(self, exchange, urls, prices):
+        """Keep the snapshot parsed from ``urls``, and only the entries of those URLs"""
+        entries = self.entries.get(exchange, {})
+        for url in set(entries) - set(urls):
+            del entries[url]
+        if all(url in entries for url in urls):
+            self.snapshots[exchange] = (tuple(urls), prices)
+        else:
+            self.snapshots.pop(exchange, None)
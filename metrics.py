@@ -0,0 +1,325 @@
+"""Per-exchange scan metrics.
+
+Every fetch records its request latency, its payload size and the bytes it
+took over the wire, and every parse records its duration and how many tickers
+each validation rule rejected. Wire bytes are also credited to the scan that
+started the fetch, even when it completes after that scan has ended.
+Failed fetches are counted by error kind instead of only being printed. The
+GUI shows the metrics in the exchange tooltips and the status bar. Headless
+runs can serve them in the Prometheus text format:
+
+    python direct_arbitrage.py --headless --metrics-port 9108
+    curl localhost:9108/metrics
+"""
+import threading
+from bisect import bisect_left
+from collections import OrderedDict, deque
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+from exchange_adapters import REJECT_RULES
+
+LATENCY_BUCKETS = (0.05, 0.1, 0.25, 0.5, 1, 2, 5, 10)
+PARSE_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 1)
+
+
+class Histogram:
+    """Cumulative histogram with Prometheus-style ``le`` buckets"""
+
+    def __init__(self, buckets):
+        self.buckets = buckets
+        self.counts = [0] * (len(buckets) + 1)  # The last slot is +Inf
+        self.sum = 0.0
+        self.count = 0
+
+    def observe(self, value):
+        self.counts[bisect_left(self.buckets, value)] += 1
+        self.sum += value
+        self.count += 1
+
+    def cumulative(self):
+        """(upper bound, observations <= bound) for every bucket, +Inf last"""
+        total = 0
+        bounds = [str(bound) for bound in self.buckets] + ['+Inf']
+        result = []
+        for bound, count in zip(bounds, self.counts):
+            total += count
+            result.append((bound, total))
+        return result
+
+
+class ExchangeMetrics:
+    """Everything measured about one exchange"""
+
+    def __init__(self):
+        self.latency = Histogram(LATENCY_BUCKETS)
+        self.recent = deque(maxlen=100)  # Latest request latencies, for percentiles
+        self.requests = 0
+        self.errors = {}  # error kind -> count
+        self.last_error = None
+        self.failing = False  # Whether the last fetch failed
+        self.bytes_total = 0  # Decoded payload bytes
+        self.last_bytes = 0
+        self.wire_total = 0  # Bytes received over the network, compressed
+        self.not_modified = 0  # Requests answered 304 Not Modified
+        self.unchanged = 0  # Snapshots reused because no payload changed
+        self.parse = Histogram(PARSE_BUCKETS)
+        self.last_parse = None
+        self.accepted = 0  # Pairs of the last snapshot
+        self.rejected = dict.fromkeys(REJECT_RULES, 0)  # Tickers rejected from the last snapshot
+        self.rejected_total = dict.fromkeys(REJECT_RULES, 0)
+        self.deadline_misses = 0
+
+    def percentile(self, q):
+        if not self.recent:
+            return None
+        ordered = sorted(self.recent)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * q))]
+
+
+def error_kind(error):
+    """Short label of a fetch error: 'HTTP 429', 'Timeout', 'ConnectionError'..."""
+    response = getattr(error, 'response', None)
+    status = getattr(response, 'status_code', None) or getattr(error, 'status', None)
+    if status:
+        return f"HTTP {status}"
+    return type(error).__name__
+
+
+class ScanMetrics:
+    """Metrics of every exchange of one scanner, safe to update from fetch threads"""
+
+    def __init__(self, max_scans=64):
+        self.exchanges = {}
+        self.lock = threading.Lock()
+        self.scan = 0  # Id of the latest scan started
+        self.last_scan = None  # Id of the latest scan ended
+        self.scans = OrderedDict()  # scan id -> exchange -> wire bytes, the latest max_scans
+        self.max_scans = max_scans
+
+    def get(self, exchange):
+        metrics = self.exchanges.get(exchange)
+        if metrics is None:
+            metrics = self.exchanges.setdefault(exchange, ExchangeMetrics())
+        return metrics
+
+    def observe_request(self, exchange, seconds, size, wire=None, not_modified=False, scan=None):
+        """Record a response of ``size`` decoded bytes, ``wire`` of them over the network
+
+        The wire bytes are credited to ``scan``, the id start_scan() gave the
+        scan that submitted the fetch. Fetches outside of a scan pass None.
+        """
+        wire = size if wire is None else wire
+        with self.lock:
+            metrics = self.get(exchange)
+            metrics.requests += 1
+            metrics.latency.observe(seconds)
+            metrics.recent.append(seconds)
+            metrics.wire_total += wire
+            scan_bytes = self.scans.get(scan)
+            if scan_bytes is not None:
+                scan_bytes[exchange] = scan_bytes.get(exchange, 0) + wire
+            if not_modified:
+                metrics.not_modified += 1
+            else:
+                metrics.bytes_total += size
+                metrics.last_bytes = size
+
+    def observe_unchanged(self, exchange):
+        with self.lock:
+            metrics = self.get(exchange)
+            metrics.unchanged += 1
+            metrics.failing = False
+
+    def start_scan(self):
+        """Open the wire byte count of a new scan and return its id"""
+        with self.lock:
+            self.scan += 1
+            self.scans[self.scan] = {}
+            while len(self.scans) > self.max_scans:
+                self.scans.popitem(last=False)
+            return self.scan
+
+    def end_scan(self, exchanges, scan):
+        """Make ``scan`` the one reported as the last scan, returning its {exchange: bytes} so far"""
+        with self.lock:
+            self.last_scan = scan
+            scan_bytes = self.scans.get(scan, {})
+            return {exchange: scan_bytes.get(exchange, 0) for exchange in exchanges}
+
+    def scan_wire(self, scan=None):
+        """{exchange: wire bytes} of a scan, by default the last one ended"""
+        with self.lock:
+            return dict(self.scans.get(self.last_scan if scan is None else scan, {}))
+
+    def observe_parse(self, exchange, seconds, accepted, rejected):
+        with self.lock:
+            metrics = self.get(exchange)
+            metrics.parse.observe(seconds)
+            metrics.last_parse = seconds
+            metrics.accepted = accepted
+            metrics.rejected = rejected
+            for rule, count in rejected.items():
+                metrics.rejected_total[rule] = metrics.rejected_total.get(rule, 0) + count
+            metrics.failing = False
+
+    def observe_error(self, exchange, error):
+        kind = error_kind(error)
+        with self.lock:
+            metrics = self.get(exchange)
+            metrics.errors[kind] = metrics.errors.get(kind, 0) + 1
+            metrics.last_error = f"{kind}: {str(error)}" if str(error) else kind
+            metrics.failing = True
+
+    def observe_deadline_miss(self, exchange):
+        with self.lock:
+            self.get(exchange).deadline_misses += 1
+
+    def describe(self, exchange, age=None):
+        """Multi-line summary of one exchange, for tooltips"""
+        with self.lock:
+            metrics = self.get(exchange)
+            scan_wire = self.scans.get(self.last_scan, {}).get(exchange, 0)
+            p50, p90 = metrics.percentile(0.5), metrics.percentile(0.9)
+            lines = [exchange]
+            if p50 is not None:
+                lines.append(f"Latency p50 {p50 * 1000:.0f} ms, p90 {p90 * 1000:.0f} ms "
+                             f"over {len(metrics.recent)} requests")
+                lines.append(f"Payload {metrics.last_bytes / 1024:.0f} KiB, "
+                             f"parse {(metrics.last_parse or 0) * 1000:.1f} ms")
+                lines.append(f"Last scan {scan_wire / 1024:.0f} KiB over the wire, "
+                             f"{metrics.not_modified} not modified")
+            lines.append(f"Pairs {metrics.accepted}, rejected " + ', '.join(
+                f"{rule} {count}" for rule, count in metrics.rejected.items()
+            ))
+            if age is not None:
+                lines.append(f"Snapshot age {age:.1f}s")
+            if metrics.errors:
+                lines.append('Errors ' + ', '.join(f"{kind} x{count}" for kind, count in metrics.errors.items()))
+            if metrics.deadline_misses:
+                lines.append(f"Missed the scan deadline {metrics.deadline_misses}x")
+            if metrics.failing:
+                lines.append(f"Last fetch failed: {metrics.last_error}")
+            return '\n'.join(lines)
+
+    def summary(self, exchanges):
+        """One line naming the slowest exchange and those failing, for status bars"""
+        with self.lock:
+            latencies = {
+                exchange: self.get(exchange).percentile(0.5) for exchange in exchanges
+            }
+            failing = [exchange for exchange in exchanges if self.get(exchange).failing]
+            scan_bytes = self.scans.get(self.last_scan, {})
+            scan_wire = sum(scan_bytes.get(exchange, 0) for exchange in exchanges)
+        latencies = {exchange: latency for exchange, latency in latencies.items() if latency is not None}
+        parts = [f"Last scan {scan_wire / 1024:.0f} KiB"] if scan_wire else []
+        if latencies:
+            slowest = max(latencies, key=latencies.get)
+            parts.append(f"Slowest: {slowest} {latencies[slowest] * 1000:.0f} ms")
+        if failing:
+            parts.append(f"Failing: {', '.join(failing)}")
+        return ' | '.join(parts)
+
+    def prometheus(self, ages=None):
+        """Every metric in the Prometheus text exposition format"""
+        ages = ages or {}
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        def histogram(name, help_text, attribute):
+            samples = []
+            for exchange, metrics in items:
+                hist = getattr(metrics, attribute)
+                for bound, count in hist.cumulative():
+                    samples.append(({'exchange': exchange, 'le': bound}, count))
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} histogram")
+            for labels, value in samples:
+                lines.append(f'{name}_bucket{{exchange="{labels["exchange"]}",le="{labels["le"]}"}} {value}')
+            for exchange, metrics in items:
+                hist = getattr(metrics, attribute)
+                lines.append(f'{name}_sum{{exchange="{exchange}"}} {hist.sum}')
+                lines.append(f'{name}_count{{exchange="{exchange}"}} {hist.count}')
+
+        with self.lock:
+            items = sorted(self.exchanges.items())
+            scan_bytes = self.scans.get(self.last_scan, {})
+            histogram('arbitrage_request_duration_seconds', 'HTTP request latency per exchange', 'latency')
+            family('arbitrage_requests_total', 'counter', 'HTTP requests per exchange',
+                   [({'exchange': exchange}, m.requests) for exchange, m in items])
+            family('arbitrage_request_errors_total', 'counter', 'Failed fetches per exchange and error kind',
+                   [({'exchange': exchange, 'kind': kind}, count)
+                    for exchange, m in items for kind, count in sorted(m.errors.items())])
+            family('arbitrage_payload_bytes_total', 'counter', 'Decoded payload bytes received per exchange',
+                   [({'exchange': exchange}, m.bytes_total) for exchange, m in items])
+            family('arbitrage_payload_bytes', 'gauge', 'Size of the last payload per exchange',
+                   [({'exchange': exchange}, m.last_bytes) for exchange, m in items])
+            family('arbitrage_wire_bytes_total', 'counter', 'Bytes received over the network per exchange',
+                   [({'exchange': exchange}, m.wire_total) for exchange, m in items])
+            family('arbitrage_scan_wire_bytes', 'gauge', 'Bytes received over the network by the last scan',
+                   [({'exchange': exchange}, scan_bytes.get(exchange, 0)) for exchange, m in items])
+            family('arbitrage_not_modified_total', 'counter', 'Requests answered 304 Not Modified',
+                   [({'exchange': exchange}, m.not_modified) for exchange, m in items])
+            histogram('arbitrage_parse_duration_seconds', 'Payload parse time per exchange', 'parse')
+            family('arbitrage_pairs_accepted', 'gauge', 'Pairs in the last snapshot per exchange',
+                   [({'exchange': exchange}, m.accepted) for exchange, m in items])
+            family('arbitrage_pairs_rejected', 'gauge', 'Tickers rejected from the last snapshot per rule',
+                   [({'exchange': exchange, 'rule': rule}, count)
+                    for exchange, m in items for rule, count in m.rejected.items()])
+            family('arbitrage_pairs_rejected_total', 'counter', 'Tickers rejected per exchange and rule',
+                   [({'exchange': exchange, 'rule': rule}, count)
+                    for exchange, m in items for rule, count in m.rejected_total.items()])
+            family('arbitrage_deadline_misses_total', 'counter', 'Fetches that missed the scan deadline',
+                   [({'exchange': exchange}, m.deadline_misses) for exchange, m in items])
+            family('arbitrage_exchange_up', 'gauge', 'Whether the last fetch of the exchange succeeded',
+                   [({'exchange': exchange}, 0 if m.failing else 1) for exchange, m in items])
+        family('arbitrage_snapshot_age_seconds', 'gauge', 'Age of the cached snapshot per exchange',
+               [({'exchange': exchange}, round(age, 3)) for exchange, age in sorted(ages.items())])
+        return '\n'.join(lines) + '\n'
+
+
+class MetricsServer:
+    """Serve a scanner's metrics at http://host:port/metrics from a daemon thread"""
+
+    def __init__(self, arbitrage, port=9108, host='127.0.0.1'):
+        self.arbitrage = arbitrage
+        server = self
+
+        class Handler(BaseHTTPRequestHandler):
+            def do_GET(self):
+                if self.path.split('?', 1)[0] != '/metrics':
+                    self.send_error(404)
+                    return
+                body = server.render().encode()
+                self.send_response(200)
+                self.send_header('Content-Type', 'text/plain; version=0.0.4')
+                self.send_header('Content-Length', str(len(body)))
+                self.end_headers()
+                self.wfile.write(body)
+
+            def log_message(self, format, *args):
+                pass
+
+        self.httpd = ThreadingHTTPServer((host, port), Handler)
+        self.httpd.daemon_threads = True
+        self.port = self.httpd.server_address[1]
+        self.thread = threading.Thread(target=self.httpd.serve_forever, name='metrics', daemon=True)
+
+    def render(self):
+        arbitrage = self.arbitrage
+        now = arbitrage.clock()
+        ages = {exchange: now - updated for exchange, updated in list(arbitrage.last_update.items())}
+        return arbitrage.metrics.prometheus(ages) + arbitrage.governor.prometheus()
+
+    def start(self):
+        self.thread.start()
+        return self
+
+    def stop(self):
+        self.httpd.shutdown()
+        self.httpd.server_close()
@@ -0,0 +1,138 @@
+"""Incremental opportunity search for DirectArbitrage.
+
+OpportunityIndex keeps every live opportunity keyed by
+(pair, buy exchange, sell exchange) together with a list of those keys sorted
+by profit. When an exchange delivers a new snapshot, or a stream delivers a
+few ticks, only the rows touching that exchange's changed pairs are
+re-evaluated, and the sorted list is patched with bisect instead of being
+rebuilt.
+"""
+from bisect import bisect_left, insort
+
+
+class OpportunityIndex:
+    """Opportunities maintained incrementally from per-exchange snapshots"""
+
+    def __init__(self, arbitrage):
+        self.arbitrage = arbitrage
+        self.snapshots = {}  # exchange -> last full snapshot object applied
+        self.prices = {}  # exchange -> pair -> price entry, owned by the index
+        self.listings = {}  # pair -> set of exchanges listing it
+        self.rows = {}  # (pair, buy, sell) -> Opportunity
+        self.ordered = []  # (-profit_percent, key), best first
+        self.investment = arbitrage.investment
+        self.min_profit_percent = arbitrage.min_profit_percent
+        self.fees = self.current_fees()
+        self.evaluated = 0  # Rows evaluated by the last update, for benchmarks
+
+    def current_fees(self):
+        return {name: adapter.fee for name, adapter in self.arbitrage.exchanges.items()}
+
+    def settings_changed(self):
+        """Whether investment, fees or the profit threshold changed since the rows were evaluated"""
+        return (self.arbitrage.investment != self.investment
+                or self.arbitrage.min_profit_percent != self.min_profit_percent
+                or self.current_fees() != self.fees)
+
+    def refresh_settings(self):
+        """Re-evaluate every row from the current books if the settings changed
+
+        For callers that feed the index with update_exchange or apply_changes
+        rather than update().
+        """
+        if not self.settings_changed():
+            return
+        books = self.prices
+        self.clear()
+        for exchange, book in books.items():
+            self.update_exchange(exchange, book)
+
+    def update(self, prices):
+        """Bring the index in line with ``prices`` and return sorted opportunities"""
+        self.evaluated = 0
+        if self.settings_changed():
+            self.clear()
+
+        for exchange in list(self.prices):
+            if exchange not in prices:
+                self.update_exchange(exchange, {})
+                del self.prices[exchange]
+                self.snapshots.pop(exchange, None)
+        for exchange, snapshot in prices.items():
+            # Cached snapshots are the same object, nothing to do for them
+            if self.snapshots.get(exchange) is not snapshot:
+                self.snapshots[exchange] = snapshot
+                self.update_exchange(exchange, snapshot)
+        return self.opportunities()
+
+    def clear(self):
+        self.snapshots = {}
+        self.prices = {}
+        self.listings = {}
+        self.rows = {}
+        self.ordered = []
+        self.investment = self.arbitrage.investment
+        self.min_profit_percent = self.arbitrage.min_profit_percent
+        self.fees = self.current_fees()
+
+    def update_exchange(self, exchange, snapshot):
+        """Apply a new snapshot of one exchange, re-evaluating only changed pairs"""
+        old = self.prices.get(exchange, {})
+        changes = {}
+        for pair, data in snapshot.items():
+            previous = old.get(pair)
+            if previous is None or previous.bid != data.bid or previous.ask != data.ask:
+                changes[pair] = data
+        for pair in old:
+            if pair not in snapshot:
+                changes[pair] = None
+        self.apply_changes(exchange, changes)
+
+    def apply_changes(self, exchange, changes):
+        """Apply {pair: price entry, or None when delisted} updates of one exchange"""
+        book = self.prices.setdefault(exchange, {})
+        for pair, data in changes.items():
+            if data is None:
+                if book.pop(pair, None) is not None:
+                    listed = self.listings[pair]
+                    listed.discard(exchange)
+                    if not listed:
+                        del self.listings[pair]
+            else:
+                if pair not in book:
+                    self.listings.setdefault(pair, set()).add(exchange)
+                book[pair] = data
+
+        for pair in changes:
+            for other in self.listings.get(pair, ()):
+                if other == exchange:
+                    continue
+                # Rows of a pair delisted here are dropped by refresh_row
+                self.refresh_row(pair, exchange, other)
+                self.refresh_row(pair, other, exchange)
+
+    def refresh_row(self, pair, buy_exchange, sell_exchange):
+        key = (pair, buy_exchange, sell_exchange)
+        self.remove_row(key)
+        buy_data = self.prices[buy_exchange].get(pair)
+        sell_data = self.prices[sell_exchange].get(pair)
+        if buy_data is None or sell_data is None:
+            return
+        self.evaluated += 1
+        opportunity = self.arbitrage.evaluate_opportunity(
+            pair, buy_exchange, buy_data, sell_exchange, sell_data
+        )
+        if opportunity is not None:
+            self.rows[key] = opportunity
+            insort(self.ordered, (-opportunity.profit_percent, key))
+
+    def remove_row(self, key):
+        opportunity = self.rows.pop(key, None)
+        if opportunity is None:
+            return
+        entry = (-opportunity.profit_percent, key)
+        del self.ordered[bisect_left(self.ordered, entry)]
+
+    def opportunities(self):
+        """Current opportunities sorted by profit percentage"""
+        return [self.rows[key] for _, key in self.ordered]
@@ -0,0 +1,143 @@
+"""Qt item model of the opportunities table.
+
+The view only asks for the cells it paints, so values are formatted lazily in
+data() and colors and fonts are shared instead of allocated per cell. A
+refresh is applied as a diff against the rows already shown: vanished
+opportunities are removed, reordered ones are moved with their persistent
+indexes, new ones are inserted and changed ones are repainted. This keeps the
+selection and the scroll position across refreshes.
+"""
+from PyQt6.QtCore import Qt, QAbstractTableModel, QModelIndex
+from PyQt6.QtGui import QColor, QFont
+
+COLUMNS = [
+    # header, item type, formatter
+    ('Trading Pair', 'pair', lambda op: op['pair'].replace('/', '-')),
+    ('Buy From', 'exchange', lambda op: op['buy_exchange']),
+    ('Sell At', 'exchange', lambda op: op['sell_exchange']),
+    ('Buy Price', 'price', lambda op: f"${op['buy_price']:.8f}"),
+    ('Sell Price', 'price', lambda op: f"${op['sell_price']:.8f}"),
+    ('Profit %', 'profit', lambda op: f"{op['profit_percent']:.2f}%"),
+    ('Profit $', 'profit', lambda op: f"${op['profit_amount']:.2f}"),
+    ('Investment', 'investment', lambda op: f"${op['investment']:.2f}"),
+]
+
+COLORS = {
+    'profit': QColor("#4CAF50"),  # Brighter green for profit
+    'exchange': QColor("#64B5F6"),  # Light blue for exchanges
+    'pair': QColor("#FFA726"),  # Orange for trading pairs
+    'price': QColor("#E0E0E0"),  # Light gray for prices
+    'investment': QColor("#FFFFFF"),  # White for other items
+}
+
+
+def opportunity_key(op):
+    """Identity of a table row across refreshes"""
+    return op['pair'], op['buy_exchange'], op['sell_exchange']
+
+
+def ranges(rows):
+    """Group sorted row numbers into (first, last) runs of consecutive rows"""
+    runs = []
+    for row in rows:
+        if runs and runs[-1][1] == row - 1:
+            runs[-1][1] = row
+        else:
+            runs.append([row, row])
+    return runs
+
+
+class OpportunityTableModel(QAbstractTableModel):
+    """Opportunities as table rows, updated in place from successive scans"""
+
+    def __init__(self, parent=None):
+        super().__init__(parent)
+        self.opportunities = []
+        self.keys = []
+        self.bold = QFont()
+        self.bold.setBold(True)
+        self.alignment = Qt.AlignmentFlag.AlignLeft | Qt.AlignmentFlag.AlignVCenter
+
+    def rowCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(self.opportunities)
+
+    def columnCount(self, parent=QModelIndex()):
+        return 0 if parent.isValid() else len(COLUMNS)
+
+    def headerData(self, section, orientation, role=Qt.ItemDataRole.DisplayRole):
+        if orientation == Qt.Orientation.Horizontal and role == Qt.ItemDataRole.DisplayRole:
+            return COLUMNS[section][0]
+        return None
+
+    def data(self, index, role=Qt.ItemDataRole.DisplayRole):
+        if not index.isValid():
+            return None
+        _, item_type, formatter = COLUMNS[index.column()]
+        if role == Qt.ItemDataRole.DisplayRole:
+            return formatter(self.opportunities[index.row()])
+        if role == Qt.ItemDataRole.ForegroundRole:
+            return COLORS[item_type]
+        if role == Qt.ItemDataRole.FontRole and item_type == 'profit':
+            return self.bold
+        if role == Qt.ItemDataRole.TextAlignmentRole:
+            return self.alignment
+        return None
+
+    def opportunity(self, row):
+        return self.opportunities[row]
+
+    def update(self, opportunities):
+        """Show ``opportunities``, emitting only the row changes since the last update"""
+        new_keys = [opportunity_key(op) for op in opportunities]
+        new_rows = {key: row for row, key in enumerate(new_keys)}
+        if len(new_rows) != len(new_keys):
+            # Duplicate keys can't be diffed, fall back to a full reset
+            self.beginResetModel()
+            self.opportunities = list(opportunities)
+            self.keys = new_keys
+            self.endResetModel()
+            return
+
+        # Remove vanished rows, bottom up so earlier row numbers stay valid
+        removed = [row for row, key in enumerate(self.keys) if key not in new_rows]
+        for first, last in reversed(ranges(removed)):
+            self.beginRemoveRows(QModelIndex(), first, last)
+            del self.opportunities[first:last + 1]
+            del self.keys[first:last + 1]
+            self.endRemoveRows()
+
+        # Reorder the surviving rows, carrying selections and the current index along
+        kept = sorted(self.keys, key=new_rows.__getitem__)
+        if kept != self.keys:
+            self.layoutAboutToBeChanged.emit()
+            old_rows = {key: row for row, key in enumerate(self.keys)}
+            order = [old_rows[key] for key in kept]
+            moved_to = {old: new for new, old in enumerate(order)}
+            self.opportunities = [self.opportunities[old] for old in order]
+            self.keys = kept
+            persistent = self.persistentIndexList()
+            self.changePersistentIndexList(persistent, [
+                self.index(moved_to[index.row()], index.column()) for index in persistent
+            ])
+            self.layoutChanged.emit()
+
+        # Insert new rows at their final positions, top down
+        current = set(self.keys)
+        inserted = [row for row, key in enumerate(new_keys) if key not in current]
+        for first, last in ranges(inserted):
+            self.beginInsertRows(QModelIndex(), first, last)
+            self.opportunities[first:first] = opportunities[first:last + 1]
+            self.keys[first:first] = new_keys[first:last + 1]
+            self.endInsertRows()
+
+        # Repaint rows whose prices or profit moved
+        inserted = set(inserted)
+        changed = []
+        for row, op in enumerate(opportunities):
+            if row not in inserted and self.opportunities[row] != op:
+                changed.append(row)
+            self.opportunities[row] = op
+        for first, last in ranges(changed):
+            self.dataChanged.emit(
+                self.index(first, 0), self.index(last, len(COLUMNS) - 1)
+            )
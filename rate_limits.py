@@ -0,0 +1,281 @@
+"""Per-exchange request budgets.
+
+Every REST request to a venue is charged its weight against a token bucket
+sized from the adapter's ``rate_limit``. A ticker snapshot that would overdraw
+the budget is not sent. The scan then serves the venue's last snapshot, as it
+does for one that missed the deadline.
+
+HTTP 429 (too many requests) and 418 (IP banned) responses block the venue
+until its Retry-After, or until an exponential backoff when the header is
+missing. Each one also doubles the venue's ``stretch``: the refresh scheduler
+multiplies the venue's cadence by it, so polling slows down instead of being
+banned again. Stretch halves again after a run of successful requests.
+
+``report()`` tells how much of each budget its last period used:
+
+    for exchange, usage in arbitrage.governor.report().items():
+        print(exchange, f"{usage['utilization']:.0%}")
+"""
+import time
+import threading
+from collections import deque
+from email.utils import parsedate_to_datetime
+
+BAN_STATUSES = (429, 418)
+
+
+class RateLimited(Exception):
+    """A request was refused by a venue, or held back to stay within its budget"""
+
+    def __init__(self, exchange, retry_after, status=None):
+        self.exchange = exchange
+        self.retry_after = retry_after  # Seconds until the venue may be queried again
+        self.status = status  # HTTP status, None if the request was never sent
+        reason = f"HTTP {status}" if status else 'request budget exhausted'
+        super().__init__(f"{exchange} rate limited ({reason}), retry in {retry_after:.1f}s")
+
+
+def retry_after_seconds(value, now=None):
+    """Seconds of a Retry-After header, given as seconds or as an HTTP date"""
+    if value is None:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        moment = parsedate_to_datetime(value)
+    except (TypeError, ValueError):
+        return None
+    return max(0.0, moment.timestamp() - (time.time() if now is None else now))
+
+
+class TokenBucket:
+    """``capacity`` tokens refilled continuously over ``period`` seconds"""
+
+    def __init__(self, capacity, period, now):
+        self.capacity = capacity
+        self.rate = capacity / period  # Tokens per second
+        self.tokens = float(capacity)
+        self.updated = now
+
+    def refill(self, now):
+        self.tokens = min(self.capacity, self.tokens + (now - self.updated) * self.rate)
+        self.updated = now
+
+    def wait(self, weight, now):
+        """Seconds until ``weight`` tokens are available"""
+        self.refill(now)
+        return max(0.0, (weight - self.tokens) / self.rate)
+
+
+class ExchangeBudget:
+    """Bucket, backoff and usage history of one exchange"""
+
+    def __init__(self, adapter, now):
+        capacity, period = adapter.rate_limit
+        self.adapter = adapter
+        self.period = period
+        self.bucket = TokenBucket(capacity, period, now)
+        self.history = deque()  # (time, weight) of the requests sent within the last period
+        self.used_reported = None  # Weight the venue says was used, from its response headers
+        self.reported_at = None
+        self.blocked_until = 0.0
+        self.strikes = 0  # Consecutive 429/418 responses
+        self.successes = 0  # Successful requests since stretch last moved
+        self.stretch = 1.0
+        self.limited = {}  # HTTP status -> responses
+        self.held = 0  # Requests held back by the bucket or a backoff
+
+
+class RateGovernor:
+    """Request budgets of every exchange of one scanner, safe to use from fetch threads
+
+    ``enabled=False`` only counts requests and refusals, without ever holding a
+    request back or backing off.
+    """
+
+    def __init__(self, arbitrage, clock=time.monotonic, budget_share=0.5, max_stretch=16,
+                 recovery=5, max_backoff=300, enabled=True):
+        self.arbitrage = arbitrage
+        self.clock = clock
+        self.budget_share = budget_share  # Share of a budget ticker polling may plan on using
+        self.max_stretch = max_stretch
+        self.recovery = recovery  # Successful requests that halve the stretch
+        self.max_backoff = max_backoff  # Longest backoff without a Retry-After, in seconds
+        self.enabled = enabled
+        self.lock = threading.Lock()
+        self.budgets = {}  # exchange -> ExchangeBudget, created on first use
+
+    def budget(self, exchange):
+        budget = self.budgets.get(exchange)
+        if budget is None:
+            adapter = self.arbitrage.exchanges[exchange]
+            with self.lock:
+                budget = self.budgets.setdefault(exchange, ExchangeBudget(adapter, self.clock()))
+        return budget
+
+    def weight(self, exchange, endpoint):
+        return self.budget(exchange).adapter.request_weights.get(endpoint, 1)
+
+    def acquire(self, exchange, endpoint='tickers', wait=0):
+        """Charge one request to an exchange's budget, sleeping at most ``wait`` seconds
+
+        Raises RateLimited instead of sending a request that would overdraw the
+        budget or ignore a backoff.
+        """
+        weight = self.weight(exchange, endpoint)
+        budget = self.budget(exchange)
+        while True:
+            with self.lock:
+                now = self.clock()
+                delay = max(budget.blocked_until - now, budget.bucket.wait(weight, now))
+                if not self.enabled or delay <= 0:
+                    budget.bucket.tokens -= weight
+                    budget.history.append((now, weight))
+                    return
+                if delay > wait:
+                    budget.held += 1
+                    raise RateLimited(exchange, delay)
+            time.sleep(delay)
+            wait -= delay
+
+    def observe(self, exchange, status, headers):
+        """Account for a response, raising RateLimited on 429 and 418"""
+        budget = self.budget(exchange)
+        header = budget.adapter.used_weight_header
+        with self.lock:
+            now = self.clock()
+            used = headers.get(header) if header else None
+            if used is not None:
+                try:
+                    budget.used_reported = float(used)
+                    budget.reported_at = now
+                except ValueError:
+                    pass
+                else:
+                    # Other clients on this IP share the budget, trust the venue's count
+                    budget.bucket.refill(now)
+                    budget.bucket.tokens = min(budget.bucket.tokens, budget.bucket.capacity - budget.used_reported)
+            if status not in BAN_STATUSES:
+                budget.strikes = 0
+                budget.successes += 1
+                if budget.successes >= self.recovery and budget.stretch > 1:
+                    budget.stretch = max(1.0, budget.stretch / 2)
+                    budget.successes = 0
+                return
+            budget.limited[status] = budget.limited.get(status, 0) + 1
+            budget.strikes += 1
+            budget.successes = 0
+            delay = retry_after_seconds(headers.get('Retry-After'))
+            if delay is None:
+                # Bans last longer than plain throttling
+                base = 60 if status == 418 else 1
+                delay = min(self.max_backoff, base * 2 ** (budget.strikes - 1))
+            if self.enabled:
+                budget.blocked_until = max(budget.blocked_until, now + delay)
+                budget.stretch = min(self.max_stretch, budget.stretch * 2)
+                budget.bucket.tokens = min(budget.bucket.tokens, 0.0)
+        raise RateLimited(exchange, delay, status)
+
+    def wait_time(self, exchange, endpoint='tickers'):
+        """Seconds until a request to an exchange may be sent, 0 if it may be sent now"""
+        if not self.enabled:
+            return 0.0
+        weight = self.weight(exchange, endpoint)
+        budget = self.budget(exchange)
+        with self.lock:
+            now = self.clock()
+            return max(0.0, budget.blocked_until - now, budget.bucket.wait(weight, now))
+
+    def hold(self, exchange, endpoint='tickers'):
+        """Like wait_time, counting the request as held back when it has to wait"""
+        wait = self.wait_time(exchange, endpoint)
+        if wait > 0:
+            with self.lock:
+                self.budget(exchange).held += 1
+        return wait
+
+    def min_interval(self, exchange):
+        """Shortest refresh period of an exchange's tickers within its budget share"""
+        budget = self.budget(exchange)
+        weight = self.weight(exchange, 'tickers') * len(budget.adapter.urls())
+        return weight / (budget.bucket.rate * self.budget_share)
+
+    def stretch(self, exchange):
+        """Factor an exchange's refresh cadence is slowed by after rate limiting"""
+        return self.budget(exchange).stretch
+
+    def used(self, budget, now):
+        history = budget.history
+        while history and now - history[0][0] > budget.period:
+            history.popleft()
+        return sum(weight for _, weight in history)
+
+    def report(self):
+        """Budget use of every exchange over its last rate limit period"""
+        with self.lock:
+            now = self.clock()
+            report = {}
+            for exchange, budget in list(self.budgets.items()):
+                used = self.used(budget, now)
+                if budget.reported_at is not None and now - budget.reported_at <= budget.period:
+                    used = max(used, budget.used_reported)
+                report[exchange] = {
+                    'used': used,
+                    'capacity': budget.bucket.capacity,
+                    'period': budget.period,
+                    'utilization': used / budget.bucket.capacity,
+                    'blocked_for': max(0.0, budget.blocked_until - now),
+                    'stretch': budget.stretch,
+                    'limited': dict(budget.limited),
+                    'held': budget.held,
+                }
+            return report
+
+    def describe(self, exchange):
+        """One line about an exchange's budget, for tooltips"""
+        self.budget(exchange)
+        usage = self.report()[exchange]
+        line = (f"Rate limit {usage['utilization']:.0%} of {usage['capacity']:g} "
+                f"per {usage['period']:g}s used")
+        if usage['stretch'] > 1:
+            line += f", polling {usage['stretch']:g}x slower"
+        if usage['blocked_for']:
+            line += f", backing off {usage['blocked_for']:.0f}s"
+        return line
+
+    def summary(self, exchanges):
+        """Exchanges backing off and for how long, for status bars"""
+        now = self.clock()
+        backing_off = []
+        for exchange in exchanges:
+            left = self.budget(exchange).blocked_until - now
+            if left > 0:
+                backing_off.append(f"{exchange} {left:.0f}s")
+        return f"Rate limited: {', '.join(backing_off)}" if backing_off else ''
+
+    def prometheus(self):
+        """Budget metrics in the Prometheus text exposition format"""
+        report = sorted(self.report().items())
+        lines = []
+
+        def family(name, kind, help_text, samples):
+            lines.append(f"# HELP {name} {help_text}")
+            lines.append(f"# TYPE {name} {kind}")
+            for labels, value in samples:
+                label_text = ','.join(f'{key}="{value}"' for key, value in labels.items())
+                lines.append(f"{name}{{{label_text}}} {value}")
+
+        family('arbitrage_rate_limit_utilization', 'gauge', 'Share of the request budget used over its period',
+               [({'exchange': exchange}, round(usage['utilization'], 4)) for exchange, usage in report])
+        family('arbitrage_rate_limit_backoff_seconds', 'gauge', 'Seconds the exchange is still backed off for',
+               [({'exchange': exchange}, round(usage['blocked_for'], 3)) for exchange, usage in report])
+        family('arbitrage_rate_limit_stretch', 'gauge', 'Factor the refresh cadence is stretched by',
+               [({'exchange': exchange}, usage['stretch']) for exchange, usage in report])
+        family('arbitrage_rate_limited_total', 'counter', 'Responses refusing a request, per HTTP status',
+               [({'exchange': exchange, 'status': status}, count)
+                for exchange, usage in report for status, count in sorted(usage['limited'].items())])
+        family('arbitrage_requests_held_total', 'counter', 'Requests held back to stay within the budget',
+               [({'exchange': exchange}, usage['held']) for exchange, usage in report])
+        return '\n'.join(lines) + '\n'
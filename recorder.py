@@ -0,0 +1,426 @@
+"""Append-only columnar recording of snapshots and opportunities.
+
+DirectArbitrage forgets every scan once the next one arrives. A Recorder keeps
+them on disk so questions like "how long did this spread persist?" can be
+answered afterwards:
+
+    arbitrage.recorder = Recorder('recordings')
+    python recorder.py spreads recordings
+
+Each kind of record (``snapshots``, ``opportunities``, ``scans``) is written
+to its own segment files. Every scan leaves one ``scans`` row, even a scan
+that found nothing, so gaps in a spread can be told from gaps in the
+recording. A segment has a small JSON header naming its columns, then
+blocks. Each block holds one batch of rows column by column: float columns as
+raw doubles, and string columns as uint32 ids into a dictionary that is built
+per segment. Every block carries the strings it introduced. Blocks are
+zlib-compressed unless ``compress=False``, and are only ever appended. A
+crash can therefore lose at most the unfinished tail of the last block, which
+readers skip. Segments rotate by size and age, and the oldest are deleted
+beyond ``max_segments``.
+
+The scan thread only puts a reference on a queue. Encoding, compression and
+disk writes happen on the recorder's own thread. When the queue is full,
+records are dropped and counted instead of slowing the scan down. Readers map
+segments into memory. Columns of uncompressed blocks are zero-copy views of
+the file.
+"""
+import os
+import sys
+import mmap
+import json
+import time
+import zlib
+import queue
+import struct
+import argparse
+import threading
+from array import array
+from operator import attrgetter
+
+from records import Opportunity
+
+SUFFIX = '.rec'
+SEGMENT_MAGIC = b'ARBS'
+BLOCK_MAGIC = b'ARBB'
+# magic, rows, new strings, raw payload bytes, stored payload bytes, codec
+BLOCK_HEADER = struct.Struct('<4sIIIII')
+RAW, ZLIB = 0, 1
+TYPECODES = {'d': 'd', 's': 'I'}  # Column type -> array typecode of its stored values
+
+STRING_FIELDS = {'pair', 'buy_exchange', 'sell_exchange', 'original_buy_symbol', 'original_sell_symbol'}
+SCHEMAS = {
+    'snapshots': (
+        ('time', 'd'), ('exchange', 's'), ('pair', 's'),
+        ('bid', 'd'), ('ask', 'd'), ('original_symbol', 's'),
+    ),
+    'opportunities': (('time', 'd'),) + tuple(
+        (field, 's' if field in STRING_FIELDS else 'd') for field in Opportunity.fields
+    ),
+    'scans': (('time', 'd'), ('opportunities', 'd')),
+}
+opportunity_values = attrgetter(*Opportunity.fields)
+
+
+def padding(size):
+    """Bytes needed to bring ``size`` to a multiple of 8, so doubles stay aligned"""
+    return -size % 8
+
+
+class Segment:
+    """One segment file being appended to"""
+
+    def __init__(self, path, kind, columns, compress):
+        self.path = path
+        self.columns = columns
+        self.compress = compress
+        self.strings = {}  # string -> id, local to this segment
+        self.created = time.time()
+        header = json.dumps({
+            'kind': kind, 'columns': columns, 'created': self.created, 'byteorder': sys.byteorder
+        }).encode()
+        header += b' ' * padding(len(SEGMENT_MAGIC) + 4 + len(header))
+        self.file = open(path, 'ab')
+        self.file.write(SEGMENT_MAGIC + struct.pack('<I', len(header)) + header)
+        self.size = self.file.tell()
+
+    def encode(self, column_values):
+        """Serialize one batch of rows, given as one list of values per column"""
+        new_strings = []
+        parts = []
+        for (_, kind), values in zip(self.columns, column_values):
+            if kind == 's':
+                strings = self.strings
+                ids = []
+                for value in values:
+                    string_id = strings.get(value)
+                    if string_id is None:
+                        string_id = strings[value] = len(strings)
+                        new_strings.append(value)
+                    ids.append(string_id)
+                values = ids
+            data = array(TYPECODES[kind], values).tobytes()
+            parts.append(data + b'\0' * padding(len(data)))
+        # New strings first, so a reader knows every id before it reads the columns
+        text = '\n'.join(new_strings).encode()
+        strings = struct.pack('<I', len(text)) + text
+        strings += b'\0' * padding(len(strings))
+        return len(new_strings), strings + b''.join(parts)
+
+    def append(self, column_values):
+        """Write one block and return its size on disk"""
+        rows = len(column_values[0])
+        new_strings, payload = self.encode(column_values)
+        stored = zlib.compress(payload, 1) if self.compress else payload
+        codec = ZLIB if self.compress else RAW
+        block = BLOCK_HEADER.pack(BLOCK_MAGIC, rows, new_strings, len(payload), len(stored), codec)
+        block += stored + b'\0' * padding(len(stored))
+        self.file.write(block)
+        self.file.flush()
+        self.size += len(block)
+        return len(block)
+
+    def close(self):
+        self.file.close()
+
+
+class Recorder:
+    """Record snapshots and opportunities to ``directory`` from a background thread"""
+
+    def __init__(self, directory, compress=True, max_bytes=64 * 2 ** 20, max_age=3600,
+                 max_segments=None, batch_rows=50000, flush_interval=1.0, queue_size=256):
+        self.directory = directory
+        self.compress = compress
+        self.max_bytes = max_bytes  # Rotate a segment once it is this large
+        self.max_age = max_age  # ... or this many seconds old
+        self.max_segments = max_segments  # Segments kept per kind, None keeps all
+        self.batch_rows = batch_rows  # Rows buffered before a block is written
+        self.flush_interval = flush_interval  # Max seconds rows wait in the buffer
+        self.queue = queue.Queue(maxsize=queue_size)
+        self.segments = {}  # kind -> open Segment
+        self.buffers = {kind: [[] for _ in columns] for kind, columns in SCHEMAS.items()}
+        self.sequence = 0
+        self.rows_written = 0
+        self.blocks_written = 0
+        self.bytes_written = 0
+        self.dropped = 0  # Records lost to a full queue
+        self.busy = 0.0  # Seconds the writer spent encoding and writing
+        os.makedirs(directory, exist_ok=True)
+        self.thread = threading.Thread(target=self.run, name='recorder', daemon=True)
+        self.thread.start()
+
+    def submit(self, item):
+        try:
+            self.queue.put_nowait(item)
+        except queue.Full:
+            self.dropped += 1
+
+    def record_snapshot(self, exchange, prices, stamp=None):
+        """Queue a ``{pair: PriceQuote}`` snapshot; it must not be mutated afterwards"""
+        self.submit(('snapshots', time.time() if stamp is None else stamp, exchange, prices))
+
+    def record_opportunities(self, opportunities, stamp=None):
+        """Queue the opportunities of one scan, also marking the scan when there are none"""
+        self.submit(('opportunities', time.time() if stamp is None else stamp, None, opportunities))
+
+    def run(self):
+        deadline = time.monotonic() + self.flush_interval
+        while True:
+            try:
+                item = self.queue.get(timeout=max(0, deadline - time.monotonic()))
+            except queue.Empty:
+                item = False
+            if item is None:
+                break
+            started = time.perf_counter()
+            try:
+                if item:
+                    self.buffer(*item)
+                if time.monotonic() >= deadline:
+                    self.flush()
+                    deadline = time.monotonic() + self.flush_interval
+            except Exception as e:
+                print(f"Error recording: {str(e)}")
+            self.busy += time.perf_counter() - started
+        self.flush()
+        for segment in self.segments.values():
+            segment.close()
+        self.segments.clear()
+
+    def buffer(self, kind, stamp, exchange, records):
+        columns = self.buffers[kind]
+        if kind == 'snapshots':
+            times, exchanges, pairs, bids, asks, symbols = columns
+            times.extend([stamp] * len(records))
+            exchanges.extend([exchange] * len(records))
+            pairs.extend(records)
+            for quote in records.values():
+                bids.append(quote.bid)
+                asks.append(quote.ask)
+                symbols.append(quote.original_symbol)
+        else:
+            columns[0].extend([stamp] * len(records))
+            for column, values in zip(columns[1:], zip(*map(opportunity_values, records))):
+                column.extend(values)
+            times, counts = self.buffers['scans']
+            times.append(stamp)
+            counts.append(len(records))
+        if len(columns[0]) >= self.batch_rows:
+            self.flush(kind)
+
+    def flush(self, kind=None):
+        """Write the buffered rows of ``kind`` (default: all kinds) as blocks"""
+        for name in (SCHEMAS if kind is None else (kind,)):
+            columns = self.buffers[name]
+            if not columns[0]:
+                continue
+            segment = self.segment(name)
+            self.bytes_written += segment.append(columns)
+            self.rows_written += len(columns[0])
+            self.blocks_written += 1
+            self.buffers[name] = [[] for _ in columns]
+
+    def segment(self, kind):
+        """The segment to append ``kind`` to, rotating the current one if it is due"""
+        segment = self.segments.get(kind)
+        if segment is not None and (
+            segment.size >= self.max_bytes or time.time() - segment.created >= self.max_age
+        ):
+            segment.close()
+            segment = None
+        if segment is None:
+            self.sequence += 1
+            name = f"{kind}-{time.strftime('%Y%m%d-%H%M%S')}-{self.sequence:04d}{SUFFIX}"
+            segment = self.segments[kind] = Segment(
+                os.path.join(self.directory, name), kind, SCHEMAS[kind], self.compress
+            )
+            self.prune(kind)
+        return segment
+
+    def prune(self, kind):
+        if self.max_segments is None:
+            return
+        for path in segment_paths(self.directory, kind)[:-self.max_segments]:
+            os.remove(path)
+
+    def close(self):
+        """Write everything still queued or buffered and stop the writer"""
+        if self.thread is None:
+            return
+        self.queue.put(None)
+        self.thread.join()
+        self.thread = None
+
+
+def segment_paths(directory, kind):
+    """Segment files of ``kind`` in ``directory``, oldest first"""
+    names = sorted(
+        name for name in os.listdir(directory) if name.startswith(kind + '-') and name.endswith(SUFFIX)
+    )
+    return [os.path.join(directory, name) for name in names]
+
+
+class Block:
+    """Columns of one block, by name; string columns are decoded to lists"""
+
+    def __init__(self, rows, columns):
+        self.rows = rows
+        self.columns = columns
+
+    def __getitem__(self, name):
+        return self.columns[name]
+
+    def __len__(self):
+        return self.rows
+
+    def __iter__(self):
+        """Rows as tuples, in column order"""
+        return zip(*self.columns.values())
+
+
+class SegmentReader:
+    """Memory-mapped reader of one segment file
+
+    Float columns of uncompressed blocks are views into the mapping, which
+    stays alive for as long as any of them does.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        self.file = open(path, 'rb')
+        size = os.fstat(self.file.fileno()).st_size
+        self.map = mmap.mmap(self.file.fileno(), 0, access=mmap.ACCESS_READ) if size else b''
+        self.columns = []
+        self.offset = 0
+        if len(self.map) >= 8 and self.map[:4] == SEGMENT_MAGIC:
+            header_length, = struct.unpack_from('<I', self.map, 4)
+            header = json.loads(bytes(self.map[8:8 + header_length]))
+            self.kind = header['kind']
+            self.columns = [tuple(column) for column in header['columns']]
+            self.created = header['created']
+            self.swap = header['byteorder'] != sys.byteorder
+            self.offset = 8 + header_length
+
+    def blocks(self):
+        """Yield every complete Block, stopping at a torn or missing tail"""
+        view = memoryview(self.map)
+        strings = []
+        offset = self.offset
+        while self.columns and offset + BLOCK_HEADER.size <= len(view):
+            magic, rows, new_strings, raw_length, stored_length, codec = \
+                BLOCK_HEADER.unpack_from(view, offset)
+            start = offset + BLOCK_HEADER.size
+            if magic != BLOCK_MAGIC or start + stored_length > len(view):
+                break
+            payload = view[start:start + stored_length]
+            if codec == ZLIB:
+                payload = memoryview(zlib.decompress(payload))
+            offset = start + stored_length + padding(stored_length)
+
+            text_length, = struct.unpack_from('<I', payload, 0)
+            if new_strings:
+                strings.extend(bytes(payload[4:4 + text_length]).decode().split('\n'))
+            position = 4 + text_length + padding(4 + text_length)
+            columns = {}
+            for name, kind in self.columns:
+                typecode = TYPECODES[kind]
+                length = rows * array(typecode).itemsize
+                values = payload[position:position + length].cast(typecode)
+                position += length + padding(length)
+                if self.swap:
+                    values = array(typecode, values.tobytes())
+                    values.byteswap()
+                if kind == 's':
+                    values = [strings[string_id] for string_id in values]
+                columns[name] = values
+            yield Block(rows, columns)
+
+    def close(self):
+        if isinstance(self.map, mmap.mmap):
+            try:
+                self.map.close()
+            except BufferError:
+                pass  # Columns still point into the mapping; it goes away with them
+        self.file.close()
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        self.close()
+
+
+def read_blocks(directory, kind):
+    """Yield the blocks of every ``kind`` segment in ``directory``, oldest first"""
+    for path in segment_paths(directory, kind):
+        with SegmentReader(path) as reader:
+            yield from reader.blocks()
+
+
+def spread_persistence(directory, min_scans=2):
+    """How long each (pair, buy exchange, sell exchange) spread lasted
+
+    A spread persists for as long as it shows up in consecutive recorded
+    scans. Scans are numbered from the ``scans`` markers, so a scan that found
+    nothing breaks every run. Recordings made before the markers existed only
+    know the scans that found something. Returns (pair, buy, sell, seconds,
+    scans, best profit %) runs, longest first.
+    """
+    seen = {}  # key -> [(scan time, profit %)]
+    for block in read_blocks(directory, 'opportunities'):
+        for stamp, pair, buy, sell, profit in zip(
+            block['time'], block['pair'], block['buy_exchange'],
+            block['sell_exchange'], block['profit_percent']
+        ):
+            seen.setdefault((pair, buy, sell), []).append((stamp, profit))
+    scans = {stamp for block in read_blocks(directory, 'scans') for stamp in block['time']}
+    scans = sorted(scans | {stamp for rows in seen.values() for stamp, _ in rows})
+    index = {stamp: i for i, stamp in enumerate(scans)}
+
+    runs = []
+    for (pair, buy, sell), rows in seen.items():
+        rows.sort()
+        first = previous = rows[0][0]
+        best = rows[0][1]
+        count = 1
+        for stamp, profit in rows[1:] + [(None, None)]:
+            if stamp is not None and index[stamp] == index[previous] + 1:
+                previous = stamp
+                best = max(best, profit)
+                count += 1
+                continue
+            if count >= min_scans:
+                runs.append((pair, buy, sell, previous - first, count, best))
+            if stamp is not None:
+                first = previous = stamp
+                best = profit
+                count = 1
+    runs.sort(key=lambda run: run[3], reverse=True)
+    return runs
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Inspect recorded scans')
+    commands = parser.add_subparsers(dest='command', required=True)
+    info = commands.add_parser('info', help='rows, blocks and size of every segment')
+    info.add_argument('directory')
+    spreads = commands.add_parser('spreads', help='longest persisting spreads')
+    spreads.add_argument('directory')
+    spreads.add_argument('--top', type=int, default=20)
+    args = parser.parse_args(argv)
+
+    if args.command == 'info':
+        for kind in SCHEMAS:
+            for path in segment_paths(args.directory, kind):
+                with SegmentReader(path) as reader:
+                    counts = [len(block) for block in reader.blocks()]
+                print(f"{os.path.basename(path)}: {sum(counts)} rows in {len(counts)} blocks, "
+                      f"{os.path.getsize(path) / 2 ** 20:.2f} MiB")
+    else:
+        for pair, buy, sell, seconds, scans, best in spread_persistence(args.directory)[:args.top]:
+            print(f"{pair:14s} {buy:>8s} -> {sell:<8s} {seconds:8.0f}s over {scans:4d} scans, "
+                  f"best {best:.2f}%")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,131 @@
+"""Compact records for price snapshots and opportunities.
+
+A full-universe scan holds hundreds of thousands of quotes and opportunities,
+so both are ``__slots__`` records instead of dicts: no per-instance dict, and
+a fraction of the memory and allocations. Fields are read as attributes on hot
+paths. ``record['field']`` and ``as_dict()`` keep the old dict shape available
+for display code, and ``quote_dicts``/``opportunity_dicts`` convert whole
+results for consumers that want plain dicts.
+"""
+from operator import attrgetter
+
+
+class Record:
+    """Base of the slotted records, readable like the dicts they replace"""
+    __slots__ = ()
+    fields = ()  # Every field in order, including those of base records
+
+    def __getitem__(self, field):
+        try:
+            return getattr(self, field)
+        except AttributeError:
+            raise KeyError(field) from None
+
+    def values(self):
+        return tuple(getattr(self, field) for field in self.fields)
+
+    def as_dict(self):
+        return dict(zip(self.fields, self.values()))
+
+    def __eq__(self, other):
+        if type(other) is not type(self):
+            return NotImplemented
+        return self.values() == other.values()
+
+    __hash__ = None
+
+    def __repr__(self):
+        fields = ', '.join(f"{field}={getattr(self, field)!r}" for field in self.fields)
+        return f"{type(self).__name__}({fields})"
+
+
+class PriceQuote(Record):
+    """Validated best bid/ask of one pair on one exchange"""
+    __slots__ = fields = ('bid', 'ask', 'original_symbol')
+
+    def __init__(self, bid, ask, original_symbol):
+        self.bid = bid
+        self.ask = ask
+        self.original_symbol = original_symbol
+
+
+class Opportunity(Record):
+    """Buying a pair on one exchange and selling it on another"""
+    __slots__ = fields = (
+        'pair', 'buy_exchange', 'sell_exchange', 'buy_price', 'sell_price',
+        'profit_percent', 'profit_amount', 'investment',
+        'original_buy_symbol', 'original_sell_symbol',
+        'buy_fee', 'sell_fee', 'coins_bought', 'final_amount'
+    )
+
+    def __init__(self, pair, buy_exchange, sell_exchange, buy_price, sell_price,
+                 profit_percent, profit_amount, investment,
+                 original_buy_symbol, original_sell_symbol,
+                 buy_fee, sell_fee, coins_bought, final_amount):
+        self.pair = pair
+        self.buy_exchange = buy_exchange
+        self.sell_exchange = sell_exchange
+        self.buy_price = buy_price
+        self.sell_price = sell_price
+        self.profit_percent = profit_percent
+        self.profit_amount = profit_amount
+        self.investment = investment
+        self.original_buy_symbol = original_buy_symbol
+        self.original_sell_symbol = original_sell_symbol
+        self.buy_fee = buy_fee
+        self.sell_fee = sell_fee
+        self.coins_bought = coins_bought
+        self.final_amount = final_amount
+
+
+class DepthOpportunity(Opportunity):
+    """Opportunity re-priced against order book depth
+
+    Profit, coins and final amount are those of filling the whole investment
+    level by level; buy_price and sell_price stay top of book.
+    """
+    __slots__ = ('top_profit_percent', 'buy_vwap', 'sell_vwap', 'max_size', 'max_profit_amount')
+    fields = Opportunity.fields + __slots__
+
+    def __init__(self, *args, top_profit_percent, buy_vwap, sell_vwap, max_size, max_profit_amount):
+        super().__init__(*args)
+        self.top_profit_percent = top_profit_percent
+        self.buy_vwap = buy_vwap
+        self.sell_vwap = sell_vwap
+        self.max_size = max_size  # Largest investment every unit of which is still profitable
+        self.max_profit_amount = max_profit_amount  # Profit at max_size
+
+
+class CycleOpportunity(Record):
+    """Trading through a chain of markets back into the starting currency
+
+    ``legs`` holds (exchange, symbol, 'buy' or 'sell', price) of every trade.
+    """
+    __slots__ = fields = (
+        'route', 'hops', 'profit_percent', 'profit_amount', 'investment', 'final_amount', 'legs'
+    )
+
+    def __init__(self, route, hops, profit_percent, profit_amount, investment, final_amount, legs):
+        self.route = route
+        self.hops = hops
+        self.profit_percent = profit_percent
+        self.profit_amount = profit_amount
+        self.investment = investment
+        self.final_amount = final_amount
+        self.legs = legs
+
+
+by_profit = attrgetter('profit_percent')
+
+
+def quote_dicts(prices):
+    """Convert {exchange: {pair: PriceQuote}} to the old nested dict shape"""
+    return {
+        exchange: {pair: quote.as_dict() for pair, quote in snapshot.items()}
+        for exchange, snapshot in prices.items()
+    }
+
+
+def opportunity_dicts(opportunities):
+    """Convert Opportunity records to the old 14-key dicts"""
+    return [opportunity.as_dict() for opportunity in opportunities]
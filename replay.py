@@ -0,0 +1,364 @@
+"""Offline replay of recorded prices through the scanner.
+
+A replay feeds recorded prices to an ordinary DirectArbitrage, so parsing and
+opportunity search are exactly those of a live scan. Prices come in through
+its ``price_source`` hook instead of the exchanges, and time through its
+``clock``, which the replay moves forward one ``step`` per scan. Spreads are
+followed from scan to scan to measure how long each one stays open. That
+makes replays useful for comparing fee, investment and threshold settings:
+
+    python replay.py run recordings --min-profit 0.3 --fee Binance=0.075
+    python replay.py run recordings --workers 8   # split the day across cores
+    python replay.py capture payloads --interval 1 --count 3600
+
+The input is either a Recorder directory of snapshot segments, or raw
+exchange payloads saved by ``capture`` as ``<dir>/<unix time>/<Exchange>.json``.
+Raw payloads are parsed again by the adapters. With ``workers`` > 1, the time
+range is cut into contiguous chunks that are replayed in separate processes.
+Spreads that cross a chunk boundary are joined again afterwards, so the
+results match a single-process replay.
+"""
+import os
+import time
+import math
+import argparse
+import multiprocessing
+
+from direct_arbitrage import DirectArbitrage
+from fast_json import loads
+from records import PriceQuote
+from recorder import read_blocks, segment_paths
+
+
+class SimulatedClock:
+    """Clock that only moves when the replay sets it"""
+
+    def __init__(self, now=0.0):
+        self.now = now
+
+    def __call__(self):
+        return self.now
+
+
+def is_recording(path):
+    return bool(segment_paths(path, 'snapshots'))
+
+
+def recorded_snapshots(directory, start=None, end=None):
+    """Yield (time, exchange, {pair: PriceQuote}) snapshots of a Recorder directory"""
+    key = prices = None
+    for block in read_blocks(directory, 'snapshots'):
+        times = block['time']
+        if (start is not None and max(times) < start) or (end is not None and min(times) > end):
+            continue
+        for stamp, exchange, pair, bid, ask, symbol in block:
+            if (stamp, exchange) != key:
+                if prices:
+                    yield key + (prices,)
+                key = (stamp, exchange)
+                prices = {}
+            prices[pair] = PriceQuote(bid, ask, symbol)
+    if prices:
+        yield key + (prices,)
+
+
+def payload_ticks(directory):
+    """(time, path) of every captured tick directory, oldest first"""
+    ticks = []
+    for name in os.listdir(directory):
+        try:
+            ticks.append((float(name), os.path.join(directory, name)))
+        except ValueError:
+            continue
+    ticks.sort()
+    return ticks
+
+
+def captured_payloads(directory, arbitrage, start=None, end=None):
+    """Yield (time, exchange, prices) by parsing captured payloads with the scanner's adapters"""
+    for stamp, path in payload_ticks(directory):
+        if (start is not None and stamp < start) or (end is not None and stamp > end):
+            continue
+        for exchange in arbitrage.exchanges:
+            # Exchanges with several URLs have <Exchange>.1.json, <Exchange>.2.json...
+            names = [f"{exchange}.json"]
+            while os.path.exists(os.path.join(path, f"{exchange}.{len(names)}.json")):
+                names.append(f"{exchange}.{len(names)}.json")
+            if not os.path.exists(os.path.join(path, names[0])):
+                continue
+            payloads = []
+            for name in names:
+                with open(os.path.join(path, name), 'rb') as f:
+                    payloads.append(loads(f.read()))
+            try:
+                yield stamp, exchange, arbitrage.parse_exchange_prices(exchange, *payloads)
+            except Exception as e:
+                print(f"Error parsing {exchange} payload of {stamp}: {str(e)}")
+
+
+def open_events(path, arbitrage, start=None, end=None):
+    if is_recording(path):
+        return recorded_snapshots(path, start, end)
+    return captured_payloads(path, arbitrage, start, end)
+
+
+def time_range(path):
+    """First and last snapshot time of a recording or payload capture"""
+    if is_recording(path):
+        first = last = None
+        for block in read_blocks(path, 'snapshots'):
+            times = block['time']
+            first = min(times) if first is None else min(first, min(times))
+            last = max(times) if last is None else max(last, max(times))
+        return first, last
+    ticks = payload_ticks(path)
+    return (ticks[0][0], ticks[-1][0]) if ticks else (None, None)
+
+
+class ReplaySource:
+    """Price source serving each exchange's latest snapshot as of the simulated clock
+
+    Snapshots older than ``max_age`` are left out, as if their exchange had
+    stopped answering.
+    """
+
+    def __init__(self, events, clock, exchanges, max_age=60):
+        self.events = iter(events)
+        self.clock = clock
+        self.exchanges = exchanges
+        self.max_age = max_age
+        self.pending = next(self.events, None)
+        self.snapshots = {}  # exchange -> (time, prices)
+
+    def advance(self):
+        now = self.clock()
+        while self.pending is not None and self.pending[0] <= now:
+            stamp, exchange, prices = self.pending
+            current = self.snapshots.get(exchange)
+            if exchange in self.exchanges and (current is None or stamp >= current[0]):
+                self.snapshots[exchange] = (stamp, prices)
+            self.pending = next(self.events, None)
+
+    def get_exchange_prices(self, refresh=(), progress=None, cancel=None):
+        self.advance()
+        now = self.clock()
+        prices = {}
+        for exchange, (stamp, snapshot) in self.snapshots.items():
+            if now - stamp <= self.max_age:
+                prices[exchange] = snapshot
+                if progress is not None:
+                    progress(exchange, len(snapshot))
+        return prices
+
+
+class LifetimeTracker:
+    """Follow spreads across scans and collect how long each stayed open
+
+    A run is (pair, buy exchange, sell exchange, first seen, last seen, scans,
+    best profit %, profit $ when first seen).
+    """
+
+    def __init__(self):
+        self.open = {}  # key -> [first seen, last seen, scans, best profit %, first profit $]
+        self.runs = []
+        self.seen = 0  # Opportunities over all scans
+
+    def update(self, stamp, opportunities):
+        current = {}
+        for op in opportunities:
+            key = (op.pair, op.buy_exchange, op.sell_exchange)
+            run = self.open.pop(key, None)
+            if run is None:
+                run = [stamp, stamp, 0, op.profit_percent, op.profit_amount]
+            run[1] = stamp
+            run[2] += 1
+            run[3] = max(run[3], op.profit_percent)
+            current[key] = run
+        # Whatever was open and isn't anymore has closed
+        self.runs.extend(key + tuple(run) for key, run in self.open.items())
+        self.open = current
+        self.seen += len(opportunities)
+
+    def finish(self):
+        self.runs.extend(key + tuple(run) for key, run in self.open.items())
+        self.open = {}
+        return self.runs
+
+
+def merge_runs(runs, step):
+    """Join runs of the same spread that continue across a chunk boundary"""
+    runs = sorted(runs, key=lambda run: (run[:3], run[3]))
+    merged = []
+    for run in runs:
+        last = merged[-1] if merged else None
+        # Within one chunk, two runs of a spread are at least two ticks apart
+        if last is not None and last[:3] == run[:3] and run[3] - last[4] < step * 1.5:
+            merged[-1] = last[:4] + (run[4], last[5] + run[5], max(last[6], run[6]), last[7])
+        else:
+            merged.append(run)
+    return merged
+
+
+def replay_chunk(path, origin, step, first, last, settings):
+    """Replay ticks ``origin + i * step`` for first <= i < last
+
+    Returns (scans, opportunities seen, runs, seconds spent).
+    """
+    started = time.perf_counter()
+    max_age = settings.get('max_age', 60)
+    arbitrage = DirectArbitrage(compute=settings.get('compute', 'python'), symbols_cache=None)
+    arbitrage.min_profit_percent = settings.get('min_profit', 0.0)
+    if settings.get('exchanges'):
+        arbitrage.exchanges = {
+            name: adapter for name, adapter in arbitrage.exchanges.items() if name in settings['exchanges']
+        }
+    for name, fee in (settings.get('fees') or {}).items():
+        arbitrage.exchanges[name].fee = fee
+    arbitrage.investment = settings.get('investment', 1000)
+
+    clock = SimulatedClock(origin + first * step)
+    arbitrage.clock = clock
+    # Start reading max_age early so every tick sees the snapshots a full replay would
+    events = open_events(path, arbitrage, clock.now - max_age, origin + last * step)
+    arbitrage.price_source = ReplaySource(events, clock, arbitrage.exchanges, max_age)
+
+    tracker = LifetimeTracker()
+    try:
+        for tick in range(first, last):
+            clock.now = origin + tick * step
+            opportunities = arbitrage.find_arbitrage_opportunities()
+            tracker.update(clock.now, opportunities)
+    finally:
+        arbitrage.close()
+    return last - first, tracker.seen, tracker.finish(), time.perf_counter() - started
+
+
+def replay(path, start=None, end=None, step=1.0, workers=1, **settings):
+    """Replay ``path`` from ``start`` to ``end`` one ``step`` at a time
+
+    Returns a dict with the number of scans, opportunities seen and the
+    merged spread runs, longest first.
+    """
+    first_time, last_time = time_range(path)
+    start = first_time if start is None else start
+    end = last_time if end is None else end
+    if start is None:
+        raise ValueError(f"No recorded snapshots in {path}")
+    ticks = int(math.floor((end - start) / step + 1e-9)) + 1  # Both ends included
+
+    if workers <= 1:
+        results = [replay_chunk(path, start, step, 0, ticks, settings)]
+    else:
+        bounds = [ticks * n // workers for n in range(workers + 1)]
+        chunks = [
+            (path, start, step, first, last, settings)
+            for first, last in zip(bounds, bounds[1:]) if last > first
+        ]
+        with multiprocessing.Pool(len(chunks)) as pool:
+            results = pool.starmap(replay_chunk, chunks)
+
+    runs = merge_runs([run for result in results for run in result[2]], step)
+    runs.sort(key=lambda run: run[4] - run[3], reverse=True)
+    return {
+        'start': start,
+        'end': end,
+        'scans': sum(result[0] for result in results),
+        'opportunities': sum(result[1] for result in results),
+        'runs': runs,
+        'busy': sum(result[3] for result in results),
+    }
+
+
+def capture(directory, interval=1.0, count=60):
+    """Save raw exchange payloads every ``interval`` seconds for replay"""
+    arbitrage = DirectArbitrage(symbols_cache=None)
+
+    def fetch(exchange):
+        session = arbitrage.sessions[exchange]
+        bodies = []
+        for url in arbitrage.exchange_urls(exchange):
+            arbitrage.governor.acquire(exchange, wait=interval)
+            response = session.get(url, timeout=arbitrage.request_timeout)
+            arbitrage.governor.observe(exchange, response.status_code, response.headers)
+            response.raise_for_status()
+            bodies.append(response.content)
+        return exchange, bodies
+
+    try:
+        next_tick = time.time()
+        for _ in range(count):
+            path = os.path.join(directory, f"{next_tick:.3f}")
+            os.makedirs(path, exist_ok=True)
+            for future in [arbitrage.executor.submit(fetch, exchange) for exchange in arbitrage.exchanges]:
+                try:
+                    exchange, bodies = future.result()
+                except Exception as e:
+                    print(f"Error capturing payload: {str(e)}")
+                    continue
+                for n, body in enumerate(bodies):
+                    name = f"{exchange}.json" if n == 0 else f"{exchange}.{n}.json"
+                    with open(os.path.join(path, name), 'wb') as f:
+                        f.write(body)
+            next_tick += interval
+            time.sleep(max(0, next_tick - time.time()))
+    finally:
+        arbitrage.close()
+
+
+def parse_fee(value):
+    exchange, _, fee = value.partition('=')
+    return exchange, float(fee)
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay recorded prices through the scanner')
+    commands = parser.add_subparsers(dest='command', required=True)
+
+    run = commands.add_parser('run', help='replay a recording or payload capture')
+    run.add_argument('path', help='Recorder directory or capture directory')
+    run.add_argument('--start', type=float, help='unix time to start at (default: first snapshot)')
+    run.add_argument('--end', type=float, help='unix time to stop at (default: last snapshot)')
+    run.add_argument('--step', type=float, default=1.0, help='simulated seconds between scans')
+    run.add_argument('--workers', type=int, default=1, help='processes to split the range across')
+    run.add_argument('--min-profit', type=float, default=0.5, help='minimum profit percentage')
+    run.add_argument('--investment', type=float, default=1000)
+    run.add_argument('--fee', type=parse_fee, action='append', default=[], metavar='EXCHANGE=PERCENT',
+                     help='override an exchange fee')
+    run.add_argument('--max-age', type=float, default=60, help='seconds a snapshot stays usable')
+    run.add_argument('--compute', choices=DirectArbitrage.COMPUTE_ENGINES, default='python')
+    run.add_argument('--exchanges', nargs='+', help='only replay these exchanges')
+    run.add_argument('--top', type=int, default=10)
+
+    saving = commands.add_parser('capture', help='save raw exchange payloads for replay')
+    saving.add_argument('directory')
+    saving.add_argument('--interval', type=float, default=1.0)
+    saving.add_argument('--count', type=int, default=60)
+    args = parser.parse_args(argv)
+
+    if args.command == 'capture':
+        capture(args.directory, args.interval, args.count)
+        return
+
+    started = time.perf_counter()
+    result = replay(
+        args.path, args.start, args.end, args.step, args.workers,
+        min_profit=args.min_profit, investment=args.investment, fees=dict(args.fee),
+        max_age=args.max_age, compute=args.compute, exchanges=args.exchanges
+    )
+    elapsed = time.perf_counter() - started
+    runs = result['runs']
+    lifetimes = sorted(run[4] - run[3] for run in runs)
+    print(f"Replayed {result['end'] - result['start']:.0f}s in {result['scans']} scans "
+          f"in {elapsed:.1f}s ({result['scans'] / elapsed:.0f} scans/s)")
+    print(f"{result['opportunities']} opportunities, {len(runs)} distinct spreads")
+    if lifetimes:
+        print(f"Lifetime: median {lifetimes[len(lifetimes) // 2]:.0f}s, "
+              f"p90 {lifetimes[int(len(lifetimes) * 0.9)]:.0f}s, max {lifetimes[-1]:.0f}s")
+        print(f"Profit taking each spread once when first seen: ${sum(run[7] for run in runs):.2f}")
+    for pair, buy, sell, first, last, scans, best, _ in runs[:args.top]:
+        print(f"  {pair:14s} {buy:>8s} -> {sell:<8s} {last - first:6.0f}s over {scans:5d} scans, "
+              f"best {best:.2f}%")
+
+
+if __name__ == '__main__':
+    main()
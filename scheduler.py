@@ -0,0 +1,154 @@
+"""Continuous refresh scheduling for DirectArbitrage.
+
+RefreshScheduler ticks every ``interval`` seconds and refreshes each exchange
+on its own cadence: never faster than the tick, never faster than the
+adapter's ``min_refresh`` rate limit or its request budget allows, and slower
+for venues whose fetches take long or that recently answered HTTP 429/418.
+Cadences are applied as per-exchange cache TTLs, so a scan refetches only the
+exchanges that are due and reuses the snapshots of the others.
+
+A tick that arrives while the previous scan is still running is skipped, not
+queued. The same scheduler drives the GUI (from a QTimer, with scans on the
+worker thread) and headless runs (from its own thread):
+
+    scheduler = RefreshScheduler(arbitrage, interval=10, on_scan=print)
+    scheduler.start()
+"""
+import time
+import threading
+
+
+class RefreshScheduler:
+    """Decides when to scan and how often each exchange is refetched"""
+
+    def __init__(self, arbitrage, interval=10, latency_factor=10, max_interval=None, on_scan=None,
+                 clock=time.monotonic):
+        self.arbitrage = arbitrage
+        self.clock = clock  # Monotonic seconds of the ticks, simulated by tests
+        self.interval = interval  # Seconds between ticks
+        self.latency_factor = latency_factor  # Cadence of a venue is at least this many fetch latencies
+        self.max_interval = max_interval or interval * 6
+        self.on_scan = on_scan  # Called with the opportunities of each headless scan
+        self.busy = False
+        self.next_run = None  # Monotonic time of the next tick
+        self.started = None
+        self.cycles = 0
+        self.skipped = 0
+        self.lag = 0.0  # Seconds the last scan started after the first tick it serves
+        self.duration = None  # Seconds the last scan took
+        self.thread = None
+        self.stopping = threading.Event()
+
+    def cadence(self, exchange):
+        """Seconds between two refreshes of an exchange"""
+        adapter = self.arbitrage.exchanges[exchange]
+        governor = self.arbitrage.governor
+        latency = self.arbitrage.fetch_latency.get(exchange, 0)
+        cadence = min(max(self.interval, latency * self.latency_factor), self.max_interval)
+        cadence = max(cadence, adapter.min_refresh, governor.min_interval(exchange))
+        # Rate limited venues are polled more slowly until they recover
+        return cadence * governor.stretch(exchange)
+
+    def update_cadences(self):
+        # Snapshots within half a tick of their cadence are refreshed on this tick
+        for exchange in self.arbitrage.scanned_exchanges():
+            self.arbitrage.cache_durations[exchange] = max(0, self.cadence(exchange) - self.interval / 2)
+
+    def due(self):
+        """Exchanges whose snapshot will be refetched by the next scan"""
+        now = self.arbitrage.clock()
+        due = []
+        for exchange in self.arbitrage.scanned_exchanges():
+            updated = self.arbitrage.last_update.get(exchange)
+            if updated is None or now - updated >= self.arbitrage.snapshot_ttl(exchange):
+                due.append(exchange)
+        return due
+
+    def delay(self):
+        """Seconds until the next tick"""
+        if self.next_run is None:
+            return 0
+        return max(0, self.next_run - self.clock())
+
+    def begin(self, busy=False):
+        """Claim a scan for the current tick, returning False if there is none to run
+
+        ``busy`` tells the scheduler that a scan it did not start, such as a
+        manual refresh, is still running.
+        """
+        now = self.clock()
+        if self.next_run is None:
+            self.next_run = now
+        if now < self.next_run:
+            return False
+
+        # Ticks missed while a scan overran are dropped instead of queued
+        lag = now - self.next_run
+        missed = int(lag // self.interval)
+        self.next_run += (missed + 1) * self.interval
+        self.skipped += missed
+        if self.busy or busy:
+            self.skipped += 1
+            return False
+
+        self.update_cadences()
+        if not self.due():
+            return False
+        self.busy = True
+        self.started = now
+        self.lag = lag
+        return True
+
+    def finish(self):
+        """Record the end of the scan claimed by begin()"""
+        if self.started is None:
+            return
+        self.duration = self.clock() - self.started
+        self.started = None
+        self.cycles += 1
+        self.busy = False
+
+    def run_once(self):
+        """Run the scan of the current tick, if any, and return its opportunities"""
+        if not self.begin():
+            return None
+        try:
+            opportunities = self.arbitrage.find_arbitrage_opportunities()
+        finally:
+            self.finish()
+        if self.on_scan is not None:
+            self.on_scan(opportunities)
+        return opportunities
+
+    def status(self):
+        """One-line summary of the last scan for status bars and logs"""
+        if self.duration is None:
+            return f"Refreshing every {self.interval:g}s"
+        return (
+            f"Scan {self.duration:.2f}s, lag {self.lag:.2f}s, "
+            f"{self.skipped} skipped, next in {self.delay():.0f}s"
+        )
+
+    def start(self):
+        """Scan on a background thread until stop() (headless mode)"""
+        if self.thread is not None:
+            return self
+        self.stopping.clear()
+        self.thread = threading.Thread(target=self.run_forever, name='refresh', daemon=True)
+        self.thread.start()
+        return self
+
+    def run_forever(self):
+        while not self.stopping.wait(self.delay()):
+            try:
+                self.run_once()
+            except Exception as e:
+                print(f"Scheduled scan failed: {str(e)}")
+
+    def stop(self):
+        """Stop scanning and restore the scanner's own cache TTL"""
+        self.stopping.set()
+        if self.thread is not None:
+            self.thread.join()
+            self.thread = None
+        self.arbitrage.cache_durations.clear()
@@ -0,0 +1,224 @@
+"""Multi-process opportunity search for DirectArbitrage.
+
+With ``compute='sharded'`` the pair universe is split into row ranges that a
+pool of worker processes searches in parallel. Snapshots are never pickled.
+Bids and asks live in one shared memory block laid out as
+``pairs x exchanges``, one half for each side, with NaN for pairs an exchange
+doesn't list. Only exchanges whose snapshot changed since the last scan are
+rewritten.
+
+A task is just a row range plus the scan settings. Each shard returns compact
+tuples, limited to the scan's top N when one is set. The parent merges them
+and only builds records for the results. The arithmetic is that of
+DirectArbitrage.evaluate_opportunity, so the results are the same as the pure
+Python engine's.
+"""
+import os
+import math
+import heapq
+import multiprocessing
+from array import array
+from multiprocessing import shared_memory
+
+from records import Opportunity
+
+NAN = float('nan')
+
+# Worker side: shared memory blocks attached so far, by name
+attached = {}
+
+
+def attach(name):
+    """Return the parent's shared memory block ``name``, closing older ones
+
+    Spawned workers share the parent's resource tracker, which unregisters the
+    block when the parent unlinks it.
+    """
+    block = attached.get(name)
+    if block is None:
+        for old in attached.values():
+            old.close()
+        attached.clear()
+        block = attached[name] = shared_memory.SharedMemory(name=name)
+    return block
+
+
+def scan_shard(task):
+    """Search rows ``start:stop`` of a packed snapshot, returning result tuples
+
+    A result is (profit %, row, buy column, sell column, buy price, sell price,
+    profit amount, coins bought, final amount).
+    """
+    name, capacity, columns, start, stop, fees, investment, min_profit, threshold, limit = task
+    with attach(name).buf.cast('d') as values:
+        return search_rows(
+            values, capacity, columns, start, stop, fees, investment, min_profit, threshold, limit
+        )
+
+
+def search_rows(values, capacity, columns, start, stop, fees, investment, min_profit, threshold, limit):
+    half = capacity * columns
+    everything = range(columns)
+    results = []
+    for row in range(start, stop):
+        offset = row * columns
+        asks = values[half + offset:half + offset + columns].tolist()
+        listed = [col for col in everything if asks[col] == asks[col]]  # NaN is unlisted
+        if len(listed) < 2:
+            continue
+        bids = values[offset:offset + columns].tolist()
+        # Same pruning as the pure Python engine
+        if max(bids[col] for col in listed) < min(asks[col] for col in listed) * threshold:
+            continue
+        for buy_col in listed:
+            buy_price = asks[buy_col]
+            if not 0 < buy_price < 1000000:
+                continue
+            buy_fee = fees[buy_col]
+            buy_amount = investment * (1 + buy_fee)
+            coins_bought = (investment / buy_price) * (1 - buy_fee)
+            for sell_col in listed:
+                if sell_col == buy_col:
+                    continue
+                sell_price = bids[sell_col]
+                if not 0 < sell_price < 1000000:
+                    continue
+                avg_price = (buy_price + sell_price) / 2
+                if abs(buy_price - sell_price) / avg_price * 100 > 3:
+                    continue
+                sell_amount = (coins_bought * sell_price) * (1 - fees[sell_col])
+                profit_amount = sell_amount - buy_amount
+                profit_percent = (profit_amount / buy_amount) * 100
+                if not 0 < profit_percent <= 3 or profit_percent < min_profit:
+                    continue
+                results.append((
+                    profit_percent, row, buy_col, sell_col, buy_price, sell_price,
+                    profit_amount, coins_bought, sell_amount
+                ))
+    if limit is not None and len(results) > limit:
+        return heapq.nlargest(limit, results)
+    return results
+
+
+class ShardEngine:
+    """Shared memory price table and the process pool that searches it"""
+
+    def __init__(self, arbitrage, workers=None, chunks_per_worker=4):
+        self.arbitrage = arbitrage
+        self.workers = workers or os.cpu_count() or 1
+        self.chunks_per_worker = chunks_per_worker  # Smaller shards even out uneven rows
+        self.pool = None
+        self.memory = None
+        self.view = None
+        self.capacity = 0  # Rows allocated in the shared block
+        self.exchanges = []  # Column order
+        self.rows = {}  # pair -> row; rows are kept when a pair is delisted everywhere
+        self.pairs = []  # row -> pair
+        self.snapshots = {}  # exchange -> last snapshot object written
+        self.written = {}  # exchange -> rows holding its quotes
+
+    def start_pool(self):
+        if self.pool is None:
+            # Spawned rather than forked: the scanner always has fetch threads running
+            self.pool = multiprocessing.get_context('spawn').Pool(self.workers)
+        return self.pool
+
+    def allocate(self, capacity):
+        """Replace the shared block by an empty one of ``capacity`` rows"""
+        self.release_memory()
+        size = capacity * len(self.exchanges) * 2
+        self.memory = shared_memory.SharedMemory(create=True, size=max(size, 1) * 8)
+        self.view = self.memory.buf.cast('d')
+        self.view[:size] = array('d', [NAN]) * size
+        self.capacity = capacity
+        self.snapshots = {}
+        self.written = {}
+
+    def pack(self, prices):
+        """Write the snapshots that changed since the last scan into shared memory"""
+        exchanges = list(prices)
+        if exchanges != self.exchanges:
+            self.exchanges = exchanges
+            self.allocate(max(self.capacity, len(self.rows), 1024))
+
+        changed = [exchange for exchange in exchanges if self.snapshots.get(exchange) is not prices[exchange]]
+        for exchange in changed:
+            for pair in prices[exchange]:
+                if pair not in self.rows:
+                    self.rows[pair] = len(self.pairs)
+                    self.pairs.append(pair)
+        if len(self.pairs) > self.capacity:
+            self.allocate(max(self.capacity * 2, len(self.pairs)))
+            changed = exchanges
+
+        view = self.view
+        columns = len(exchanges)
+        half = self.capacity * columns
+        rows = self.rows
+        for exchange in changed:
+            col = exchanges.index(exchange)
+            snapshot = prices[exchange]
+            current = set()
+            for pair, data in snapshot.items():
+                cell = rows[pair] * columns + col
+                view[cell] = data.bid
+                view[half + cell] = data.ask
+                current.add(rows[pair])
+            for row in self.written.get(exchange, set()) - current:
+                cell = row * columns + col
+                view[cell] = NAN
+                view[half + cell] = NAN
+            self.written[exchange] = current
+            self.snapshots[exchange] = snapshot
+
+    def compute(self, prices):
+        """Sharded equivalent of DirectArbitrage.compute_opportunities"""
+        arbitrage = self.arbitrage
+        self.pack(prices)
+        if not self.pairs:
+            return []
+        exchanges = self.exchanges
+        fees = [arbitrage.exchanges[exchange].fee / 100 for exchange in exchanges]
+        limit = arbitrage.search_limit()
+        settings = (
+            fees, arbitrage.investment, arbitrage.min_profit_percent,
+            arbitrage.profit_threshold(exchanges), limit
+        )
+        shards = min(self.workers * self.chunks_per_worker, len(self.pairs)) or 1
+        step = math.ceil(len(self.pairs) / shards)
+        tasks = [
+            (self.memory.name, self.capacity, len(exchanges), start, min(start + step, len(self.pairs))) + settings
+            for start in range(0, len(self.pairs), step)
+        ]
+        results = [result for shard in self.start_pool().map(scan_shard, tasks) for result in shard]
+        if limit is not None and len(results) > limit:
+            results = heapq.nlargest(limit, results)
+        else:
+            results.sort(reverse=True)
+
+        investment = arbitrage.investment
+        opportunities = []
+        for profit_percent, row, buy_col, sell_col, buy_price, sell_price, amount, coins, final in results:
+            pair = self.pairs[row]
+            buy_exchange, sell_exchange = exchanges[buy_col], exchanges[sell_col]
+            opportunities.append(Opportunity(
+                arbitrage.display_pair(pair), buy_exchange, sell_exchange,
+                buy_price, sell_price, profit_percent, amount, investment,
+                prices[buy_exchange][pair].original_symbol, prices[sell_exchange][pair].original_symbol,
+                fees[buy_col] * 100, fees[sell_col] * 100, coins, final
+            ))
+        return opportunities
+
+    def release_memory(self):
+        if self.memory is not None:
+            self.view.release()
+            self.memory.close()
+            self.memory.unlink()
+            self.memory = self.view = None
+
+    def close(self):
+        if self.pool is not None:
+            self.pool.close()
+            self.pool.join()
+            self.pool = None
+        self.release_memory()
@@ -0,0 +1,356 @@
+"""WebSocket streaming price feeds for DirectArbitrage.
+
+PriceStream keeps a best bid/ask book per exchange from the venue's public
+WebSocket stream and feeds every tick straight into an OpportunityIndex, so
+opportunities update as ticks arrive instead of once per REST sweep. Symbols
+are spread over as many connections as the venue's stream limit requires,
+and subscriptions are paced to its message rate. Each connection reconnects
+with exponential backoff, and while it is down the exchange is kept fresh
+from REST snapshots. Venues without a stream adapter are polled over REST.
+
+ReplayServer replays recorded (or synthetic) stream messages locally so the
+streaming mode can be exercised offline:
+
+    python streaming.py replay recording.jsonl --port 8765
+"""
+import json
+import time
+import random
+import asyncio
+import argparse
+import threading
+from collections import deque
+
+try:
+    import websockets
+except ImportError:  # Optional dependency, only needed for streaming
+    websockets = None
+
+from fast_json import loads
+from opportunity_index import OpportunityIndex
+
+
+class PriceStream:
+    """Live best bid/ask books of several exchanges feeding an OpportunityIndex"""
+
+    def __init__(self, arbitrage, exchanges=None, on_update=None, poll_interval=5,
+                 backoff_base=1, backoff_max=30, ping_interval=20, record_path=None):
+        if websockets is None:
+            raise ImportError("streaming requires websockets (pip install websockets)")
+        self.arbitrage = arbitrage
+        self.exchanges = list(exchanges or arbitrage.exchanges)
+        self.on_update = on_update  # Called with the exchange name after each applied batch
+        self.poll_interval = poll_interval  # REST refresh period of unstreamed exchanges
+        self.backoff_base = backoff_base
+        self.backoff_max = backoff_max
+        self.ping_interval = ping_interval
+        self.record_path = record_path
+        self.index = OpportunityIndex(arbitrage)
+        self.lock = threading.Lock()
+        self.connections = set()  # (exchange, part) of every stream connection currently up
+        self.reconnects = {exchange: 0 for exchange in self.exchanges}
+        self.latencies = deque(maxlen=10000)  # Seconds from tick receipt to updated opportunities
+        self.ticks = 0
+        self.loop = None
+        self.thread = None
+        self.tasks = []
+        self.record_file = None
+
+    @property
+    def connected(self):
+        """Exchanges with at least one stream connection up"""
+        return {exchange for exchange, _ in self.connections}
+
+    @property
+    def running(self):
+        return self.thread is not None and self.thread.is_alive()
+
+    def start(self):
+        """Start streaming on a background event loop"""
+        if self.running:
+            return self
+        if self.record_path:
+            self.record_file = open(self.record_path, 'a')
+        self.loop = asyncio.new_event_loop()
+        self.thread = threading.Thread(target=self.run_loop, name='price-stream', daemon=True)
+        self.thread.start()
+        return self
+
+    def stop(self):
+        """Cancel every feed, close their connections and stop the loop"""
+        if not self.running:
+            return
+
+        async def shutdown():
+            for task in self.tasks:
+                task.cancel()
+            await asyncio.gather(*self.tasks, return_exceptions=True)
+
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(timeout=10)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+        self.thread = None
+        if self.record_file is not None:
+            self.record_file.close()
+            self.record_file = None
+
+    def run_loop(self):
+        asyncio.set_event_loop(self.loop)
+        self.tasks = [self.loop.create_task(self.run())]
+        self.loop.run_forever()
+
+    def opportunities(self):
+        """Current opportunities sorted by profit percentage"""
+        with self.lock:
+            self.index.refresh_settings()
+            return self.index.opportunities()
+
+    def latency_stats(self):
+        """Tick-to-opportunity latency percentiles in milliseconds"""
+        samples = sorted(self.latencies)
+        if not samples:
+            return {}
+        pick = lambda q: samples[min(len(samples) - 1, int(q * len(samples)))] * 1000
+        return {
+            'ticks': self.ticks,
+            'p50': pick(0.5),
+            'p90': pick(0.9),
+            'p99': pick(0.99),
+            'max': samples[-1] * 1000
+        }
+
+    async def run(self):
+        # Seed every book from REST, then subscribe only to pairs that can form an opportunity
+        await asyncio.gather(*(self.refresh_from_rest(exchange) for exchange in self.exchanges))
+        with self.lock:
+            listings = dict(self.index.listings)
+        workers = []
+        for exchange in self.exchanges:
+            adapter = self.arbitrage.exchanges[exchange]
+            book = self.index.prices.get(exchange, {})
+            symbols = [
+                data.original_symbol for pair, data in book.items()
+                if len(listings.get(pair, ())) >= 2
+            ]
+            if adapter.ws_url and symbols:
+                size = adapter.ws_max_streams or len(symbols)
+                for part, start in enumerate(range(0, len(symbols), size)):
+                    workers.append(self.stream_exchange(exchange, symbols[start:start + size], part))
+            else:
+                workers.append(self.poll_exchange(exchange))
+        self.tasks.extend(asyncio.ensure_future(worker) for worker in workers)
+
+    async def refresh_from_rest(self, exchange):
+        """Replace the book of an exchange with a fresh REST snapshot"""
+        # Same path as a scan, so the snapshot is cached and recorded too
+        snapshot = await asyncio.wrap_future(self.arbitrage.submit_fetch(exchange))
+        if snapshot:
+            with self.lock:
+                self.index.refresh_settings()
+                self.index.update_exchange(exchange, snapshot)
+            self.notify(exchange)
+
+    async def poll_exchange(self, exchange):
+        while True:
+            await asyncio.sleep(self.poll_interval)
+            await self.refresh_from_rest(exchange)
+
+    async def stream_exchange(self, exchange, symbols, part=0):
+        """Keep one stream connection of an exchange up, falling back to REST while it is down"""
+        adapter = self.arbitrage.exchanges[exchange]
+        attempt = 0
+        while True:
+            try:
+                async with websockets.connect(adapter.ws_url, max_size=None, close_timeout=2) as ws:
+                    await self.subscribe(adapter, ws, symbols)
+                    self.connections.add((exchange, part))
+                    attempt = 0
+                    await self.consume(exchange, adapter, ws)
+            except asyncio.CancelledError:
+                raise
+            except Exception as e:
+                print(f"{exchange} stream error: {str(e) or type(e).__name__}")
+            self.connections.discard((exchange, part))
+            self.reconnects[exchange] += 1
+
+            # Exponential backoff with jitter, serving REST snapshots meanwhile
+            delay = min(self.backoff_max, self.backoff_base * 2 ** attempt)
+            attempt += 1
+            await self.refresh_from_rest(exchange)
+            await asyncio.sleep(delay * random.uniform(0.5, 1))
+
+    async def subscribe(self, adapter, ws, symbols):
+        # Venues drop connections that send faster than their message rate
+        for number, message in enumerate(adapter.ws_subscriptions(symbols)):
+            if number and adapter.ws_message_rate:
+                await asyncio.sleep(1 / adapter.ws_message_rate)
+            await ws.send(json.dumps(message))
+
+    async def consume(self, exchange, adapter, ws):
+        pinger = asyncio.ensure_future(self.keepalive(adapter, ws)) if adapter.ws_ping else None
+        try:
+            async for raw in ws:
+                self.handle_message(exchange, adapter, raw)
+        finally:
+            if pinger is not None:
+                pinger.cancel()
+
+    async def keepalive(self, adapter, ws):
+        while True:
+            await asyncio.sleep(self.ping_interval)
+            await ws.send(adapter.ws_ping)
+
+    def handle_message(self, exchange, adapter, raw):
+        received = time.perf_counter()
+        if self.record_file is not None:
+            self.record_file.write(json.dumps({'exchange': exchange, 'message': raw}) + '\n')
+        try:
+            quotes = adapter.ws_quotes(loads(raw))
+        except (ValueError, KeyError, TypeError, AttributeError):
+            return  # Pongs, subscription acks and malformed frames
+        if quotes:
+            self.apply_quotes(exchange, adapter, quotes)
+            self.latencies.append(time.perf_counter() - received)
+            self.ticks += len(quotes)
+            self.notify(exchange)
+
+    def apply_quotes(self, exchange, adapter, quotes):
+        with self.lock:
+            self.index.refresh_settings()
+            book = self.index.prices.get(exchange, {})
+            changes = {}
+            for symbol, bid, ask in quotes:
+                if bid is None or ask is None:
+                    # One-sided update, complete it from the book
+                    current = book.get(adapter.pair(symbol))
+                    if current is None:
+                        continue
+                    bid = current.bid if bid is None else bid
+                    ask = current.ask if ask is None else ask
+                try:
+                    accepted = adapter.accept(symbol, bid, ask)
+                except (ValueError, TypeError):
+                    accepted = None
+                if accepted is None:
+                    # Quote failed validation: drop the pair like a REST snapshot would
+                    changes[adapter.pair(symbol)] = None
+                else:
+                    changes[accepted[0]] = accepted[1]
+            self.index.apply_changes(exchange, changes)
+
+    def notify(self, exchange):
+        if self.on_update is not None:
+            self.on_update(exchange)
+
+
+class ReplayServer:
+    """Local WebSocket server replaying recorded stream messages per exchange
+
+    Clients connect to ``ws://host:port/<exchange>``; subscription messages are
+    only kept in ``received``, and the exchange's recorded messages are replayed in a
+    loop at ``rate`` messages per second (0 for as fast as possible).
+    """
+
+    def __init__(self, messages, rate=0, host='127.0.0.1', port=0):
+        if websockets is None:
+            raise ImportError("ReplayServer requires websockets (pip install websockets)")
+        self.messages = messages  # exchange -> list of raw message strings
+        self.rate = rate
+        self.host = host
+        self.port = port
+        self.server = None
+        self.loop = None
+        self.thread = None
+        self.sent = 0
+        self.received = []  # (exchange, connection, monotonic time, raw) of every client message
+
+    @classmethod
+    def from_recording(cls, path, **kwargs):
+        """Load a JSON lines recording written by PriceStream(record_path=...)"""
+        messages = {}
+        with open(path) as f:
+            for line in f:
+                entry = json.loads(line)
+                messages.setdefault(entry['exchange'], []).append(entry['message'])
+        return cls(messages, **kwargs)
+
+    def url(self, exchange):
+        return f"ws://{self.host}:{self.port}/{exchange}"
+
+    async def handler(self, ws, path=None):
+        request = getattr(ws, 'request', None)
+        path = request.path if request is not None else (path or ws.path)
+        exchange = path.strip('/')
+        messages = self.messages.get(exchange, [])
+        reader = asyncio.ensure_future(self.drain(ws, exchange))
+        try:
+            while messages:
+                for raw in messages:
+                    await ws.send(raw)
+                    self.sent += 1
+                    await asyncio.sleep(1 / self.rate if self.rate else 0)
+        except websockets.ConnectionClosed:
+            pass
+        finally:
+            reader.cancel()
+
+    async def drain(self, ws, exchange):
+        async for raw in ws:
+            self.received.append((exchange, id(ws), time.monotonic(), raw))
+
+    async def serve(self):
+        self.server = await websockets.serve(self.handler, self.host, self.port)
+        self.port = self.server.sockets[0].getsockname()[1]
+
+    def start(self):
+        """Serve on a background event loop, returns once the port is bound"""
+        self.loop = asyncio.new_event_loop()
+        ready = threading.Event()
+
+        def run():
+            asyncio.set_event_loop(self.loop)
+            self.loop.run_until_complete(self.serve())
+            ready.set()
+            self.loop.run_forever()
+
+        self.thread = threading.Thread(target=run, name='ws-replay', daemon=True)
+        self.thread.start()
+        ready.wait()
+        return self
+
+    def stop(self):
+        async def shutdown():
+            self.server.close()
+            await self.server.wait_closed()
+        asyncio.run_coroutine_threadsafe(shutdown(), self.loop).result(timeout=5)
+        self.loop.call_soon_threadsafe(self.loop.stop)
+        self.thread.join(timeout=5)
+
+    def __enter__(self):
+        return self.start()
+
+    def __exit__(self, *exc):
+        self.stop()
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Replay recorded exchange WebSocket messages')
+    parser.add_argument('command', choices=['replay'])
+    parser.add_argument('recording', help='JSON lines file from PriceStream(record_path=...)')
+    parser.add_argument('--host', default='127.0.0.1')
+    parser.add_argument('--port', type=int, default=8765)
+    parser.add_argument('--rate', type=float, default=100, help='messages per second, 0 for max')
+    args = parser.parse_args(argv)
+
+    server = ReplayServer.from_recording(args.recording, rate=args.rate, host=args.host, port=args.port)
+    server.start()
+    for exchange in server.messages:
+        print(f"{exchange}: {server.url(exchange)}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.stop()
+
+
+if __name__ == '__main__':
+    main()
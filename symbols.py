@@ -0,0 +1,169 @@
+"""Symbol registry mapping every exchange's raw symbols to canonical pairs.
+
+Each venue publishes its spot symbols with their base and quote assets
+(exchangeInfo, instruments, products...). The registry reads those listings
+once, maps every raw symbol to a canonical pair id (``BASEQUOTE``) and
+precomputes its ``BASE/QUOTE`` display string, so scans only do dict lookups.
+Listings are cached on disk, and the scanner refetches them in the
+background when the cache is missing or older than a day. Recorded copies can
+be loaded instead of fetching them:
+
+    python symbols.py refresh
+    python symbols.py load recorded/   # recorded/<Exchange>.json payloads
+"""
+import os
+import json
+import time
+import argparse
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+from exchange_adapters import ADAPTERS
+
+DEFAULT_CACHE = os.path.join(os.path.expanduser('~'), '.cache', 'crypto-arbitrage', 'symbols.json')
+MAX_AGE = 24 * 3600  # Seconds before the scanner refetches the listings in the background
+
+
+class SymbolRegistry:
+    """Canonical (base, quote) of every listed symbol, per exchange"""
+
+    def __init__(self):
+        self.assets = {}  # exchange -> raw symbol -> (base, quote)
+        self.pairs = {}  # exchange -> raw symbol -> canonical pair id
+        self.display = {}  # canonical pair id -> 'BASE/QUOTE'
+        self.updated = None
+
+    def add(self, exchange, symbol, base, quote):
+        base = base.upper()
+        quote = quote.upper()
+        pair = base + quote
+        self.assets.setdefault(exchange, {})[symbol] = (base, quote)
+        self.pairs.setdefault(exchange, {})[symbol] = pair
+        self.display[pair] = f"{base}/{quote}"
+
+    def add_listing(self, exchange, adapter, data):
+        """Register every symbol of a raw symbols_url payload, returning how many"""
+        listed = adapter.symbol_assets(data)
+        for symbol, base, quote in listed:
+            self.add(exchange, symbol, base, quote)
+        self.updated = time.time()
+        return len(listed)
+
+    def install(self, arbitrage):
+        """Point the scanner's adapters and display strings at this registry"""
+        for exchange, adapter in arbitrage.exchanges.items():
+            adapter.symbols.update(self.pairs.get(exchange, {}))
+        arbitrage.pair_display.update(self.display)
+
+    def refresh(self, exchanges, timeout=10, governor=None):
+        """Fetch the symbol listings of ``{name: adapter}`` concurrently
+
+        Requests are charged to the scanner's rate_limits.RateGovernor, if given.
+        """
+        def fetch(item):
+            exchange, adapter = item
+            if governor is not None:
+                governor.acquire(exchange, 'symbols', wait=timeout)
+            response = requests.get(adapter.symbols_url, timeout=timeout)
+            if governor is not None:
+                governor.observe(exchange, response.status_code, response.headers)
+            response.raise_for_status()
+            return exchange, adapter, response.json()
+
+        listed = [item for item in exchanges.items() if item[1].symbols_url]
+        with ThreadPoolExecutor(max_workers=len(listed) or 1) as executor:
+            futures = [executor.submit(fetch, item) for item in listed]
+            for future in futures:
+                try:
+                    exchange, adapter, data = future.result()
+                    count = self.add_listing(exchange, adapter, data)
+                    print(f"Registered {count} symbols on {exchange}")
+                except Exception as e:
+                    print(f"Error fetching symbols: {str(e)}")
+        return self
+
+    def load_recorded(self, directory, exchanges):
+        """Register recorded symbols_url payloads saved as <directory>/<Exchange>.json"""
+        for exchange, adapter in exchanges.items():
+            path = os.path.join(directory, f"{exchange}.json")
+            if os.path.exists(path):
+                with open(path) as f:
+                    self.add_listing(exchange, adapter, json.load(f))
+        return self
+
+    def age(self):
+        """Seconds since the listings were last refreshed, None if never"""
+        return None if self.updated is None else time.time() - self.updated
+
+    def forget(self, exchange):
+        """Drop an exchange's listing once the venue has shown it to be out of date"""
+        self.assets.pop(exchange, None)
+        self.pairs.pop(exchange, None)
+
+    def expired(self, max_age=MAX_AGE):
+        """Whether the listings were never fetched or are older than ``max_age`` seconds"""
+        age = self.age()
+        return age is None or age > max_age
+
+    def merge_missing(self, other):
+        """Keep the listings of ``other`` for exchanges this registry has none of"""
+        for exchange, symbols in other.assets.items():
+            if exchange not in self.assets:
+                for symbol, (base, quote) in symbols.items():
+                    self.add(exchange, symbol, base, quote)
+        return self
+
+    def save(self, path=DEFAULT_CACHE):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        payload = {
+            'updated': self.updated,
+            'exchanges': {
+                exchange: {symbol: list(assets) for symbol, assets in symbols.items()}
+                for exchange, symbols in self.assets.items()
+            }
+        }
+        # Write then rename so a crash never leaves a truncated cache behind
+        with open(path + '.tmp', 'w') as f:
+            json.dump(payload, f)
+        os.replace(path + '.tmp', path)
+
+    @classmethod
+    def load(cls, path=DEFAULT_CACHE):
+        """Load a cached registry, or return an empty one if there is none"""
+        registry = cls()
+        try:
+            with open(path) as f:
+                payload = json.load(f)
+        except (OSError, ValueError):
+            return registry
+        for exchange, symbols in payload.get('exchanges', {}).items():
+            for symbol, (base, quote) in symbols.items():
+                registry.add(exchange, symbol, base, quote)
+        registry.updated = payload.get('updated')
+        return registry
+
+
+def main(argv=None):
+    parser = argparse.ArgumentParser(description='Build the symbol registry cache')
+    commands = parser.add_subparsers(dest='command', required=True)
+    commands.add_parser('refresh', help="fetch every exchange's symbol listing")
+    load = commands.add_parser('load', help='register recorded <Exchange>.json listings')
+    load.add_argument('directory')
+    parser.add_argument('--cache', default=DEFAULT_CACHE)
+    args = parser.parse_args(argv)
+
+    exchanges = {name: adapter() for name, adapter in ADAPTERS.items()}
+    registry = SymbolRegistry.load(args.cache)
+    if args.command == 'refresh':
+        registry.refresh(exchanges)
+    else:
+        registry.load_recorded(args.directory, exchanges)
+    registry.save(args.cache)
+    for exchange, symbols in registry.pairs.items():
+        print(f"{exchange}: {len(symbols)} symbols")
+    print(f"Saved to {args.cache}")
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,99 @@
+"""Order book fills on hand-built books and concurrent fetches against the benchmark stub"""
+import random
+import threading
+
+import pytest
+
+from benchmark import StubServer, synthetic_payloads, synthetic_depth, point_at_stub
+from depth_engine import DepthEngine, buy_fill, sell_fill, max_profitable_size
+from direct_arbitrage import DirectArbitrage
+from exchange_adapters import ADAPTERS
+from records import Opportunity
+
+ASKS = [(10.0, 1.0), (11.0, 1.0), (13.0, 1.0)]
+BIDS = [(12.0, 1.0), (12.0, 1.0), (9.0, 5.0)]
+
+
+def test_fills_walk_the_levels():
+    assert buy_fill(ASKS, 10) == pytest.approx(1)
+    assert buy_fill(ASKS, 15.5) == pytest.approx(1.5)  # Half of the second level
+    assert buy_fill(ASKS, 34) == pytest.approx(3)
+    assert sell_fill(BIDS, 1.5) == pytest.approx(18)
+    assert sell_fill(BIDS, 4) == pytest.approx(24 + 2 * 9)
+
+
+def test_fills_of_a_too_thin_book_are_none():
+    assert buy_fill(ASKS, 35) is None
+    assert sell_fill(BIDS, 7.5) is None
+    assert buy_fill([], 1) is None and sell_fill([], 1) is None
+
+
+def test_max_profitable_size_stops_at_the_first_losing_level():
+    # 10 -> 12 and 11 -> 12 are profitable, 13 -> 12 is not
+    assert max_profitable_size(ASKS, BIDS, 0, 0) == pytest.approx((21, 3))
+    invested, profit = max_profitable_size(ASKS, BIDS, 0.001, 0.001)
+    # Filling exactly that size level by level earns the same profit
+    proceeds = sell_fill(BIDS, buy_fill(ASKS, invested) * 0.999) * 0.999
+    assert proceeds - invested * 1.001 == pytest.approx(profit)
+    assert invested == pytest.approx(21) and 0 < profit < 3  # Fees shrink the margin, not the levels
+
+
+def test_max_profitable_size_of_a_thin_book():
+    assert max_profitable_size([(10.0, 5.0)], [(12.0, 1.0)], 0, 0) == pytest.approx((10, 2))
+    assert max_profitable_size([], BIDS, 0, 0) == (0, 0)
+    assert max_profitable_size(ASKS, [(9.0, 1.0)], 0, 0) == (0, 0)
+
+
+def test_evaluate_prices_the_investment_at_its_vwap():
+    arbitrage = DirectArbitrage(symbols_cache=None)
+    arbitrage.min_profit_percent = 0
+    engine = DepthEngine(arbitrage)
+    op = Opportunity('X/USDT', 'A', 'B', 10.0, 12.0, 20.0, 2.0, 21.0, 'XUSDT', 'XUSDT', 0, 0, 2.1, 25.2)
+    try:
+        depth = engine.evaluate(op, ASKS, BIDS)
+        thin = engine.evaluate(op, ASKS, [(12.0, 1.0)])
+        losing = engine.evaluate(op, [(13.0, 5.0)], BIDS)
+    finally:
+        engine.close()
+        arbitrage.close()
+    assert depth.buy_vwap == pytest.approx(10.5)
+    assert depth.sell_vwap == pytest.approx(12)
+    assert (depth.profit_amount, depth.profit_percent) == pytest.approx((3, 100 * 3 / 21))
+    assert (depth.max_size, depth.max_profit_amount) == pytest.approx((21, 3))
+    assert depth.top_profit_percent == 20.0
+    assert thin is None and losing is None
+
+
+def test_each_depth_worker_uses_its_own_session():
+    rng = random.Random(0)
+    payloads = synthetic_payloads(40)
+    routes = {}
+    keys = set()
+    for name in ('Binance', 'KuCoin'):
+        for quote in ADAPTERS[name]().parse(payloads[name]).values():
+            routes[f"depth/{name}/{quote.original_symbol}"] = synthetic_depth(name, quote, rng)
+            keys.add((name, quote.original_symbol))
+    delays = {route: 0.01 for route in routes}
+
+    with StubServer(routes, delays) as stub:
+        arbitrage = DirectArbitrage(symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        engine = DepthEngine(arbitrage, per_exchange=4, deadline=30)
+        owners = {}
+        session = engine.session
+
+        def tracked():
+            # Every session must only ever be used by the thread that made it
+            current = session()
+            assert owners.setdefault(id(current), threading.get_ident()) == threading.get_ident()
+            return current
+
+        engine.session = tracked
+        try:
+            books = engine.fetch_books(keys)
+        finally:
+            engine.close()
+            arbitrage.close()
+    assert set(books) == keys
+    assert 1 < len(owners) <= 2 * engine.per_exchange
+    assert engine.sessions == []
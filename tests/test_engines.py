@@ -0,0 +1,37 @@
+"""Every compute engine must find exactly what the pure Python engine finds"""
+import importlib.util
+
+import pytest
+
+from benchmark import synthetic_prices, synthetic_scanner
+from direct_arbitrage import DirectArbitrage
+
+key = lambda op: (op.pair, op.buy_exchange, op.sell_exchange)
+engines = [
+    pytest.param(engine, marks=pytest.mark.skipif(
+        engine == 'numpy' and importlib.util.find_spec('numpy') is None, reason='numpy is not installed'))
+    for engine in DirectArbitrage.COMPUTE_ENGINES if engine != 'python'
+]
+
+
+def opportunities(prices, compute, **settings):
+    arbitrage = synthetic_scanner(prices, compute=compute, workers=2 if compute == 'sharded' else None)
+    for name, value in settings.items():
+        setattr(arbitrage, name, value)
+    try:
+        return arbitrage.compute_opportunities(prices)
+    finally:
+        arbitrage.close()
+
+
+@pytest.mark.parametrize('compute', engines)
+@pytest.mark.parametrize('settings', [{}, {'min_profit_percent': 0.1}, {'max_opportunities': 10}])
+def test_engine_matches_python(compute, settings):
+    prices = synthetic_prices(6, 800)
+    expected = opportunities(prices, 'python', **settings)
+    assert expected
+    result = opportunities(prices, compute, **settings)
+    if 'max_opportunities' in settings:
+        # Ties aside, the top N must be the same records in the same order
+        assert [op.profit_percent for op in result] == [op.profit_percent for op in expected]
+    assert sorted(result, key=key) == sorted(expected, key=key)
@@ -0,0 +1,46 @@
+"""Fetch path checks against the local benchmark stub"""
+from benchmark import StubServer, synthetic_payloads, synthetic_tickers, point_at_stub, quiet
+from direct_arbitrage import DirectArbitrage
+
+
+def test_every_exchange_costs_its_urls_per_scan():
+    scans = 3
+    with StubServer(synthetic_payloads(50)) as stub:
+        arbitrage = DirectArbitrage(cache_duration=0, symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        try:
+            with quiet():
+                for _ in range(scans):
+                    arbitrage.find_arbitrage_opportunities()
+        finally:
+            arbitrage.close()
+    # MEXC used to need a second request for its bid/ask
+    assert stub.hits['MEXC'] == scans
+    for exchange, adapter in arbitrage.exchanges.items():
+        assert stub.hits[exchange] == scans * len(adapter.urls()), exchange
+
+
+def test_refused_filtered_batch_falls_back_to_every_ticker():
+    payloads = synthetic_payloads(50)
+    with StubServer(payloads, filters={'Binance': 'symbol'}) as stub:
+        arbitrage = DirectArbitrage(cache_duration=0, symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        for row, (base, quote, _) in zip(payloads['Binance'], synthetic_tickers(50)):
+            arbitrage.symbols.add('Binance', row['symbol'], base, quote)
+        # Delisted from Binance since the registry was built, still listed on KuCoin
+        arbitrage.symbols.add('Binance', 'GONEUSDT', 'GONE', 'USDT')
+        arbitrage.symbols.add('KuCoin', 'GONE-USDT', 'GONE', 'USDT')
+        arbitrage.symbols.install(arbitrage)
+        try:
+            with quiet():
+                full = arbitrage.get_exchange_prices()['Binance']  # Other listings unknown yet
+                assert 'GONEUSDT' in arbitrage.wanted_symbols('Binance')
+                refused = arbitrage.get_exchange_prices()['Binance']
+                assert arbitrage.wanted_symbols('Binance') is None
+                after = arbitrage.get_exchange_prices()['Binance']
+        finally:
+            arbitrage.close()
+    assert stub.refused['Binance'] == {400: 1}
+    assert stub.hits['Binance'] == 4  # Full, refused batch and its retry, full
+    assert 'Binance' not in arbitrage.symbols.pairs
+    assert refused.keys() == full.keys() == after.keys()
@@ -0,0 +1,92 @@
+"""Cycle search checks against a brute-force enumeration"""
+import math
+import random
+
+from benchmark import synthetic_scanner
+from graph_engine import GraphEngine
+from records import PriceQuote
+
+
+def scanner(markets):
+    """A scanner over ``{exchange: [(base, quote, bid, ask)]}`` with every market in its registry"""
+    prices = {}
+    for exchange, rows in markets.items():
+        prices[exchange] = {base + quote: PriceQuote(bid, ask, f"{base}-{quote}") for base, quote, bid, ask in rows}
+    arbitrage = synthetic_scanner(prices, symbols_cache=None)
+    for exchange, rows in markets.items():
+        arbitrage.exchanges[exchange].fee = 0.05
+        for base, quote, _, _ in rows:
+            arbitrage.symbols.add(exchange, f"{base}-{quote}", base, quote)
+    return arbitrage, prices
+
+
+def brute_force(adjacency, max_hops):
+    """(nodes, weight) of every simple cycle of 3 to ``max_hops`` edges, once per rotation"""
+    cycles = {}
+
+    def extend(path, weight):
+        for target, edge in adjacency.get(path[-1], {}).items():
+            if target == path[0] and len(path) >= 3:
+                start = path.index(min(path, key=str))
+                cycles.setdefault(tuple(path[start:] + path[:start]), (list(path), weight + edge[0]))
+            elif target not in path and len(path) < max_hops:
+                extend(path + [target], weight + edge[0])
+
+    for node in adjacency:
+        extend([node], 0.0)
+    return list(cycles.values())
+
+
+def test_cycle_without_a_stablecoin_is_found():
+    arbitrage, prices = scanner({'Venue00': [
+        ('ETH', 'BTC', 0.05, 0.0501),
+        ('XRP', 'ETH', 0.0002, 0.000201),
+        ('XRP', 'BTC', 0.0000097, 0.0000098),  # Cheaper in BTC than through ETH
+        ('BTC', 'USDT', 60000, 60010),
+        ('ETH', 'USDT', 3000, 3001),
+    ]})
+    arbitrage.min_profit_percent = 0
+    engine = GraphEngine(arbitrage, max_hops=3)
+    routes = [op.route for op in engine.opportunities(prices)]
+    arbitrage.close()
+    assert 'BTC → XRP → ETH → BTC' in routes
+
+
+def test_best_cycle_of_every_closing_asset_matches_brute_force():
+    rng = random.Random(7)
+    assets = [f"A{n}" for n in range(9)]
+    value = {asset: rng.uniform(1, 100) for asset in assets}
+    quotes = assets[:3]
+    markets = {}
+    for exchange in ('Venue00', 'Venue01'):
+        rows = []
+        for base in assets:
+            for quote in quotes:
+                if base != quote and rng.random() < 0.7:
+                    mid = value[base] / value[quote] * rng.uniform(0.99, 1.01)
+                    rows.append((base, quote, mid * 0.9995, mid * 1.0005))
+        markets[exchange] = rows
+    arbitrage, prices = scanner(markets)
+    arbitrage.min_profit_percent = 0
+    engine = GraphEngine(arbitrage, max_hops=4, max_profit_percent=1000)
+    engine.update(prices)
+    found = {engine.rotation(nodes) for nodes, _ in engine.search()}
+    arbitrage.close()
+
+    limit = 0.0
+    floor = -math.log1p(engine.max_profit_percent / 100)
+    cycles = brute_force(engine.adjacency, engine.max_hops)
+    profitable = {engine.rotation(nodes) for nodes, weight in cycles if floor <= weight < limit}
+    assert profitable and found <= profitable
+
+    # Every cycle starts at its first source in search order, best one per closing asset and length
+    order = {node: rank for rank, node in enumerate(engine.sources())}
+    best = {}
+    for nodes, weight in cycles:
+        start = min(range(len(nodes)), key=lambda i: order[nodes[i]] if nodes[i] in order else math.inf)
+        nodes = nodes[start:] + nodes[:start]
+        key = (nodes[0], len(nodes), nodes[-1])
+        if key not in best or weight < best[key][1]:
+            best[key] = (nodes, weight)
+    expected = {engine.rotation(nodes) for nodes, weight in best.values() if floor <= weight < limit}
+    assert expected and expected <= found
@@ -0,0 +1,40 @@
+"""Window bookkeeping around scheduled scans, driven without a display"""
+import os
+
+import pytest
+
+os.environ.setdefault('QT_QPA_PLATFORM', 'offscreen')
+QtWidgets = pytest.importorskip('PyQt6.QtWidgets')
+
+import arbitrage_gui
+from direct_arbitrage import DirectArbitrage
+
+
+@pytest.fixture
+def gui(monkeypatch):
+    app = QtWidgets.QApplication.instance() or QtWidgets.QApplication([])
+    monkeypatch.setattr(arbitrage_gui, 'DirectArbitrage', lambda: DirectArbitrage(symbols_cache=None))
+    window = arbitrage_gui.DirectArbitrageGUI()
+    # Scans are completed by hand instead of on the worker thread
+    window.scan_requested.disconnect(window.scan_worker.scan)
+    yield window
+    window.close()
+    app.processEvents()
+
+
+def test_restarting_monitoring_mid_scan_finishes_the_old_scheduler(gui):
+    gui.start_monitoring()
+    first = gui.scheduler
+    assert gui.scan_running and first.busy
+    gui.start_monitoring()  # Stop
+    gui.start_monitoring()  # Start again while the scan still runs
+    second = gui.scheduler
+    assert second is not first and second.started is None and second.skipped == 1
+
+    gui.on_scan_finished(gui.scan_id, [])
+    assert (first.busy, first.cycles) == (False, 1)
+    assert (second.busy, second.cycles, second.duration) == (False, 0, None)
+    # The new scheduler claims the next tick as usual
+    second.next_run = 0
+    gui.on_refresh_timer()
+    assert gui.scan_running and second.busy
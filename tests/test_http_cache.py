@@ -0,0 +1,42 @@
+"""Conditional request cache bookkeeping"""
+from benchmark import StubServer, synthetic_payloads, synthetic_tickers, point_at_stub, quiet
+from direct_arbitrage import DirectArbitrage
+from http_cache import ConditionalCache
+
+
+def test_snapshot_drops_entries_of_urls_it_was_not_built_from():
+    cache = ConditionalCache()
+    cache.store('Binance', 'old', {'ETag': '"1"'}, ['old payload'])
+    cache.store('Binance', 'new', {'ETag': '"2"'}, ['new payload'])
+    cache.store('KuCoin', 'old', {'ETag': '"3"'}, ['other venue'])
+    cache.remember('Binance', ['new'], {'BTCUSDT': None})
+    assert list(cache.entries['Binance']) == ['new']
+    assert cache.headers('Binance', 'old') == {}
+    assert cache.headers('KuCoin', 'old') == {'If-None-Match': '"3"'}
+    assert cache.snapshot('Binance', ['new']) == {'BTCUSDT': None}
+
+
+def test_changing_filtered_batches_keep_one_entry_set():
+    payloads = synthetic_payloads(60)
+    with StubServer(payloads, etags=True, filters={'Binance': 'symbol'}) as stub:
+        arbitrage = DirectArbitrage(cache_duration=0, symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        arbitrage.selected_exchanges = {'Binance', 'KuCoin'}
+        arbitrage.exchanges['Binance'].symbol_batch = 10
+        for exchange, adapter in arbitrage.exchanges.items():
+            for ticker, (base, quote, _) in zip(adapter.rows(payloads[exchange]), synthetic_tickers(60)):
+                arbitrage.symbols.add(exchange, adapter.quote(ticker)[0], base, quote)
+        arbitrage.symbols.install(arbitrage)
+        try:
+            with quiet():
+                for listed in (60, 50, 45, 20):
+                    # KuCoin drops pairs, so Binance's batches name other symbols every scan
+                    kucoin = arbitrage.symbols.pairs['KuCoin']
+                    for symbol in list(kucoin)[listed:]:
+                        del kucoin[symbol]
+                    arbitrage.get_exchange_prices()
+                    urls = arbitrage.exchange_urls('Binance')
+                    assert set(arbitrage.http_cache.entries['Binance']) == set(urls)
+        finally:
+            arbitrage.close()
+    assert len(urls) == 2
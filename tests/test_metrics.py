@@ -0,0 +1,43 @@
+"""Wire bytes are credited to the scan that started the fetch"""
+from benchmark import StubServer, synthetic_payloads, point_at_stub, quiet
+from direct_arbitrage import DirectArbitrage
+from metrics import ScanMetrics
+
+
+def test_late_bytes_count_towards_their_own_scan():
+    metrics = ScanMetrics()
+    first = metrics.start_scan()
+    metrics.observe_request('Binance', 0.1, 100, 40, scan=first)
+    assert metrics.end_scan(['Binance', 'LBank'], first) == {'Binance': 40, 'LBank': 0}
+    second = metrics.start_scan()
+    # LBank of the first scan arrives while the second one runs
+    metrics.observe_request('LBank', 2.0, 500, 200, scan=first)
+    metrics.observe_request('Binance', 0.1, 100, 30, scan=second)
+    metrics.observe_request('Binance', 0.1, 100, 70)  # Outside of any scan
+    assert metrics.end_scan(['Binance', 'LBank'], second) == {'Binance': 30, 'LBank': 0}
+    assert metrics.scan_wire() == {'Binance': 30}
+    assert metrics.scan_wire(first) == {'Binance': 40, 'LBank': 200}
+    assert metrics.get('Binance').wire_total == 140
+
+
+def test_stalled_exchange_is_not_billed_to_the_next_scan():
+    with StubServer(synthetic_payloads(50), delays={'LBank': 0.5}) as stub:
+        arbitrage = DirectArbitrage(cache_duration=0, symbols_cache=None)
+        arbitrage.scan_deadline = 0.2
+        point_at_stub(arbitrage, stub)
+        try:
+            with quiet():
+                arbitrage.get_exchange_prices()
+                first = arbitrage.metrics.last_scan
+                assert 'LBank' not in arbitrage.metrics.scan_wire()
+                arbitrage.pending_fetches['LBank'].result(timeout=5)
+                # LBank stalls again, its late bytes must stay with the first scan
+                arbitrage.get_exchange_prices()
+                ended = arbitrage.metrics.scan_wire()
+                arbitrage.pending_fetches['LBank'].result(timeout=5)
+        finally:
+            arbitrage.close()
+    assert arbitrage.metrics.last_scan == first + 1
+    assert ended['Binance'] > 0 and 'LBank' not in ended
+    # Each scan got exactly its own LBank payload, however late it arrived
+    assert arbitrage.metrics.scan_wire(first)['LBank'] == arbitrage.metrics.scan_wire()['LBank'] > 0
@@ -0,0 +1,58 @@
+"""Partial updates of the OpportunityIndex must match a full recompute"""
+from benchmark import synthetic_prices, synthetic_scanner
+from opportunity_index import OpportunityIndex
+from records import PriceQuote
+
+key = lambda op: (op.pair, op.buy_exchange, op.sell_exchange)
+
+
+def check(index, arbitrage, prices):
+    expected = arbitrage.compute_opportunities(prices)
+    result = index.opportunities()
+    assert sorted(result, key=key) == sorted(expected, key=key)
+    # Best first, like the full search
+    assert [op.profit_percent for op in result] == sorted((op.profit_percent for op in expected), reverse=True)
+
+
+def test_partial_updates_match_a_full_recompute():
+    prices = synthetic_prices(4, 300)
+    arbitrage = synthetic_scanner(prices)
+    index = OpportunityIndex(arbitrage)
+    try:
+        for exchange, snapshot in prices.items():
+            index.update_exchange(exchange, dict(snapshot))
+        check(index, arbitrage, prices)
+        book = prices['Venue00']
+
+        # A changed price turning a pair into an opportunity
+        pair = next(pair for pair in book if pair in prices['Venue01'])
+        cheap = PriceQuote(book[pair].bid * 0.98, book[pair].ask * 0.98, book[pair].original_symbol)
+        book[pair] = cheap
+        index.apply_changes('Venue00', {pair: cheap})
+        assert any(op.original_buy_symbol == cheap.original_symbol and op.buy_exchange == 'Venue00'
+                   for op in index.opportunities())
+        check(index, arbitrage, prices)
+
+        # The same pair delisted again
+        del book[pair]
+        index.apply_changes('Venue00', {pair: None})
+        assert not any(op.original_buy_symbol == cheap.original_symbol and op.buy_exchange == 'Venue00'
+                       for op in index.opportunities())
+        check(index, arbitrage, prices)
+
+        # A pair only another venue listed so far
+        listed = next(pair for pair in prices['Venue01'] if pair not in book)
+        quote = prices['Venue01'][listed]
+        book[listed] = PriceQuote(quote.bid * 1.05, quote.ask * 1.05, quote.original_symbol)
+        index.update_exchange('Venue00', dict(book))
+        assert 'Venue00' in index.listings[listed]
+        check(index, arbitrage, prices)
+
+        # A whole exchange going away
+        del prices['Venue02']
+        assert index.update(prices)
+        assert 'Venue02' not in index.prices
+        assert all('Venue02' not in exchanges for exchanges in index.listings.values())
+        check(index, arbitrage, prices)
+    finally:
+        arbitrage.close()
@@ -0,0 +1,104 @@
+"""Request budgets and backoff of the RateGovernor"""
+import pytest
+
+from benchmark import StubServer, synthetic_payloads, point_at_stub, quiet
+from direct_arbitrage import DirectArbitrage
+from rate_limits import RateGovernor, RateLimited
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def governed():
+    arbitrage = DirectArbitrage(symbols_cache=None)
+    clock = Clock()
+    yield arbitrage, RateGovernor(arbitrage, clock=clock), clock
+    arbitrage.close()
+
+
+def test_429_waits_for_retry_after(governed):
+    arbitrage, governor, clock = governed
+    with pytest.raises(RateLimited) as refused:
+        governor.observe('Binance', 429, {'Retry-After': '7'})
+    assert (refused.value.status, refused.value.retry_after) == (429, 7)
+    assert governor.budget('Binance').blocked_until == clock.now + 7
+    assert governor.stretch('Binance') == 2
+    with pytest.raises(RateLimited):
+        governor.acquire('Binance')
+    clock.now += 7 + governor.budget('Binance').period  # Backoff over and the bucket refilled
+    governor.acquire('Binance')
+
+
+def test_429_without_retry_after_backs_off_exponentially(governed):
+    arbitrage, governor, clock = governed
+    delays = []
+    for _ in range(3):
+        with pytest.raises(RateLimited) as refused:
+            governor.observe('KuCoin', 429, {})
+        delays.append(refused.value.retry_after)
+    assert delays == [1, 2, 4]
+    with pytest.raises(RateLimited) as banned:
+        governor.observe('OKX', 418, {})
+    assert banned.value.retry_after == 60
+    # Successes end the strikes and halve the stretch again
+    for _ in range(governor.recovery):
+        governor.observe('KuCoin', 200, {})
+    assert governor.stretch('KuCoin') == 4
+
+
+def test_acquire_refuses_to_overdraw_the_budget(governed):
+    arbitrage, governor, clock = governed
+    adapter = arbitrage.exchanges['Bybit']
+    adapter.rate_limit = (3, 6)
+    adapter.request_weights = {}
+    for _ in range(3):
+        governor.acquire('Bybit')
+    with pytest.raises(RateLimited) as held:
+        governor.acquire('Bybit')
+    assert held.value.status is None
+    assert held.value.retry_after == pytest.approx(2)
+    assert governor.report()['Bybit']['held'] == 1
+    clock.now += 2
+    governor.acquire('Bybit')
+
+
+def test_disabled_governor_only_counts(governed):
+    arbitrage, governor, clock = governed
+    governor.enabled = False
+    arbitrage.exchanges['Bybit'].rate_limit = (1, 60)
+    for _ in range(5):
+        governor.acquire('Bybit')
+    with pytest.raises(RateLimited):
+        governor.observe('Bybit', 429, {'Retry-After': '30'})
+    assert governor.wait_time('Bybit') == 0
+    assert governor.report()['Bybit']['limited'] == {429: 1}
+
+
+@pytest.mark.parametrize('refusal', ['budget', '429'])
+def test_rate_limited_scan_serves_the_last_snapshot(refusal):
+    limits = {'Binance': (1, 60)} if refusal == '429' else None
+    with StubServer(synthetic_payloads(50), limits=limits) as stub:
+        arbitrage = DirectArbitrage(cache_duration=0, symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        if refusal == 'budget':
+            arbitrage.exchanges['Binance'].rate_limit = (1, 60)
+            arbitrage.exchanges['Binance'].request_weights = {}
+        try:
+            with quiet():
+                first = arbitrage.get_exchange_prices()
+                assert first['Binance'] and not arbitrage.stale_exchanges
+                for _ in range(3):
+                    prices = arbitrage.get_exchange_prices()
+                    assert prices['Binance'] is first['Binance']
+                    assert arbitrage.stale_exchanges == {'Binance'}
+        finally:
+            arbitrage.close()
+    # The venue saw at most the one refused request, and never a request during its backoff
+    assert stub.hits['Binance'] == (2 if refusal == '429' else 1)
+    assert stub.refused['Binance'].get(418, 0) == 0
@@ -0,0 +1,28 @@
+"""Spread persistence from recorded scans"""
+from recorder import Recorder, read_blocks, spread_persistence
+from records import Opportunity
+
+
+def opportunity(profit):
+    return Opportunity('BTCUSDT', 'Binance', 'KuCoin', 100.0, 101.0, profit, profit, 100.0,
+                       'BTCUSDT', 'BTC-USDT', 0.1, 0.1, 1.0, 100.0 + profit)
+
+
+def record(directory, scans):
+    recorder = Recorder(directory)
+    for stamp, opportunities in enumerate(scans):
+        recorder.record_opportunities(opportunities, float(stamp))
+    recorder.close()
+
+
+def test_empty_scan_breaks_a_spread(tmp_path):
+    directory = str(tmp_path)
+    record(directory, [[opportunity(1.0)], [], [opportunity(2.0)]])
+    assert [len(block) for block in read_blocks(directory, 'scans')] == [3]
+    assert spread_persistence(directory) == []
+
+
+def test_consecutive_scans_make_a_run(tmp_path):
+    directory = str(tmp_path)
+    record(directory, [[], [opportunity(1.0)], [opportunity(2.0)], [opportunity(1.5)], []])
+    assert spread_persistence(directory) == [('BTCUSDT', 'Binance', 'KuCoin', 2.0, 3, 2.0)]
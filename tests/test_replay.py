@@ -0,0 +1,14 @@
+"""Sharded replays must find exactly what a single process finds"""
+from benchmark import synthetic_recording
+from replay import replay
+
+
+def test_replay_is_identical_across_worker_counts(tmp_path):
+    directory = str(tmp_path)
+    synthetic_recording(directory, pairs=300, ticks=40, changed=30)
+    single = replay(directory, workers=1, min_profit=0.0)
+    sharded = replay(directory, workers=3, min_profit=0.0)
+    assert single['runs']
+    assert sharded['scans'] == single['scans'] == 40
+    assert sharded['opportunities'] == single['opportunities']
+    assert sharded['runs'] == single['runs']
@@ -0,0 +1,88 @@
+"""Tick, skip and cadence decisions of the RefreshScheduler"""
+import pytest
+
+from direct_arbitrage import DirectArbitrage
+from scheduler import RefreshScheduler
+
+
+class Clock:
+    def __init__(self):
+        self.now = 1000.0
+
+    def __call__(self):
+        return self.now
+
+
+@pytest.fixture
+def scheduled():
+    arbitrage = DirectArbitrage(symbols_cache=None)
+    clock = Clock()
+    arbitrage.clock = clock  # Snapshot ages and ticks on the same simulated clock
+    yield arbitrage, RefreshScheduler(arbitrage, interval=10, clock=clock), clock
+    arbitrage.close()
+
+
+def test_ticks_arriving_mid_scan_are_skipped(scheduled):
+    arbitrage, scheduler, clock = scheduled
+    assert scheduler.begin()
+    clock.now += 10
+    assert not scheduler.begin()  # Still busy
+    clock.now += 25  # The scan overran the next tick too
+    scheduler.finish()
+    assert (scheduler.duration, scheduler.cycles, scheduler.skipped) == (35, 1, 1)
+    assert scheduler.begin()
+    assert scheduler.skipped == 2 and scheduler.lag == 15
+    assert scheduler.delay() == 5
+    # Nor does a tick start a scan while a manual one runs
+    scheduler.finish()
+    clock.now += 5
+    assert not scheduler.begin(busy=True)
+    assert scheduler.skipped == 3
+
+
+def test_finish_without_a_claimed_scan_is_a_no_op(scheduled):
+    arbitrage, scheduler, clock = scheduled
+    scheduler.finish()
+    assert (scheduler.duration, scheduler.cycles) == (None, 0)
+    assert scheduler.begin()
+    clock.now += 2
+    scheduler.finish()
+    clock.now += 2
+    scheduler.finish()  # Already recorded
+    assert (scheduler.duration, scheduler.cycles) == (2, 1)
+
+
+def test_cadence_follows_latency_limits_and_backoff(scheduled):
+    arbitrage, scheduler, clock = scheduled
+    assert scheduler.cadence('Binance') == 10  # Fast venues refresh every tick
+    arbitrage.fetch_latency['Binance'] = 3
+    assert scheduler.cadence('Binance') == 30
+    arbitrage.fetch_latency['Binance'] = 30
+    assert scheduler.cadence('Binance') == scheduler.max_interval == 60
+    arbitrage.fetch_latency['Binance'] = 0.1
+    arbitrage.exchanges['Binance'].min_refresh = 15
+    assert scheduler.cadence('Binance') == 15
+    arbitrage.governor.budget('Binance').stretch = 4
+    assert scheduler.cadence('Binance') == 60
+
+    scheduler.update_cadences()
+    assert arbitrage.snapshot_ttl('Binance') == 55  # Refreshed on the tick closest to its cadence
+    assert arbitrage.snapshot_ttl('KuCoin') == 5
+
+
+def test_due_lists_the_exchanges_whose_snapshot_expired(scheduled):
+    arbitrage, scheduler, clock = scheduled
+    arbitrage.selected_exchanges = {'Binance', 'KuCoin', 'OKX'}
+    arbitrage.fetch_latency['KuCoin'] = 3  # Cadence 30s
+    scheduler.update_cadences()
+    arbitrage.last_update = {'Binance': clock.now, 'KuCoin': clock.now}
+    assert scheduler.due() == ['OKX']  # Never fetched
+    clock.now += 10
+    assert scheduler.due() == ['Binance', 'OKX']
+    clock.now += 20
+    assert scheduler.due() == ['Binance', 'KuCoin', 'OKX']
+
+    # A tick with nothing due claims no scan
+    arbitrage.last_update = dict.fromkeys(arbitrage.selected_exchanges, clock.now)
+    assert not scheduler.begin()
+    assert (scheduler.busy, scheduler.skipped) == (False, 0)
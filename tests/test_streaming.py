@@ -0,0 +1,80 @@
+"""PriceStream bookkeeping that doesn't need a live WebSocket"""
+import json
+import time
+import asyncio
+
+import pytest
+
+pytest.importorskip('websockets')
+
+from benchmark import (
+    StubServer, synthetic_payloads, synthetic_prices, synthetic_scanner, synthetic_ws_messages, point_at_stub, quiet
+)
+from direct_arbitrage import DirectArbitrage
+from streaming import PriceStream, ReplayServer
+
+key = lambda op: (op.pair, op.buy_exchange, op.sell_exchange)
+
+
+def test_rest_refresh_goes_through_the_snapshot_cache():
+    with StubServer(synthetic_payloads(50)) as stub:
+        arbitrage = DirectArbitrage(symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        stream = PriceStream(arbitrage, exchanges=['Binance'])
+        try:
+            with quiet():
+                asyncio.run(stream.refresh_from_rest('Binance'))
+        finally:
+            arbitrage.close()
+    assert arbitrage.last_prices['Binance']
+    assert 'Binance' in arbitrage.last_update
+    assert stream.index.prices['Binance'] == arbitrage.last_prices['Binance']
+    assert stub.hits['Binance'] == 1
+
+
+@pytest.mark.parametrize('setting, value', [('min_profit_percent', 0.1), ('investment', 10000)])
+def test_settings_change_rebuilds_the_stream_index(setting, value):
+    prices = synthetic_prices(6, 800)
+    arbitrage = synthetic_scanner(prices)
+    stream = PriceStream(arbitrage)
+    try:
+        for exchange, snapshot in prices.items():
+            stream.index.update_exchange(exchange, snapshot)
+        assert stream.opportunities()
+        setattr(arbitrage, setting, value)
+        expected = arbitrage.compute_opportunities(prices)
+        assert sorted(stream.opportunities(), key=key) == sorted(expected, key=key)
+    finally:
+        arbitrage.close()
+
+
+def test_subscriptions_respect_the_stream_limits():
+    with StubServer(synthetic_payloads(1000)) as stub, \
+            ReplayServer(synthetic_ws_messages(1000, ticks=500), rate=50) as replay:
+        arbitrage = DirectArbitrage(symbols_cache=None)
+        point_at_stub(arbitrage, stub)
+        adapter = arbitrage.exchanges['Binance']
+        adapter.ws_url = replay.url('Binance')
+        adapter.ws_max_streams = 450
+        adapter.ws_message_rate = 20
+        stream = PriceStream(arbitrage, exchanges=['Binance', 'KuCoin'])
+        try:
+            with quiet():
+                stream.start()
+                deadline = time.monotonic() + 10
+                while len(replay.received) < 7 and time.monotonic() < deadline:
+                    time.sleep(0.05)
+                connections = set(stream.connections)
+                stream.stop()
+        finally:
+            arbitrage.close()
+
+    # 1000 shared pairs over three connections of at most 450 streams, 200 per message
+    sent = {}
+    for exchange, connection, at, raw in replay.received:
+        sent.setdefault(connection, []).append((at, json.loads(raw)['params']))
+    assert connections == {('Binance', 0), ('Binance', 1), ('Binance', 2)}
+    assert sorted(sum(len(params) for _, params in messages) for messages in sent.values()) == [100, 450, 450]
+    for messages in sent.values():
+        gaps = [later[0] - earlier[0] for earlier, later in zip(messages, messages[1:])]
+        assert all(gap >= 1 / 20 * 0.9 for gap in gaps)
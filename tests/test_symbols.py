@@ -0,0 +1,43 @@
+"""Symbol registry refresh against the local benchmark stub"""
+import time
+
+from benchmark import StubServer, quiet
+from direct_arbitrage import DirectArbitrage
+from exchange_adapters import ADAPTERS
+from symbols import MAX_AGE, SymbolRegistry
+
+
+def cached_registry(path, age):
+    registry = SymbolRegistry()
+    registry.add('Binance', 'OLDUSDT', 'OLD', 'USDT')
+    registry.add('KuCoin', 'BTC-USDT', 'BTC', 'USDT')
+    registry.updated = time.time() - age
+    registry.save(path)
+
+
+def test_expired_cache_is_refreshed_in_the_background(tmp_path, monkeypatch):
+    path = str(tmp_path / 'symbols.json')
+    cached_registry(path, 2 * MAX_AGE)
+    listing = {'symbols': [{'symbol': 'ETHUSDT', 'baseAsset': 'ETH', 'quoteAsset': 'USDT'}]}
+    with StubServer({'symbols/Binance': listing}) as stub:
+        # Only Binance answers, every other listing is unavailable
+        for name, adapter in ADAPTERS.items():
+            monkeypatch.setattr(adapter, 'symbols_url', None)
+        monkeypatch.setattr(ADAPTERS['Binance'], 'symbols_url', f"{stub.url}/symbols/Binance")
+        with quiet():
+            arbitrage = DirectArbitrage(symbols_cache=path)
+            arbitrage.symbols_thread.join(10)
+        arbitrage.close()
+    assert arbitrage.symbols.pairs['Binance'] == {'ETHUSDT': 'ETHUSDT'}
+    assert arbitrage.symbols.pairs['KuCoin'] == {'BTC-USDT': 'BTCUSDT'}  # Kept from the cache
+    assert not arbitrage.symbols.expired()
+    assert SymbolRegistry.load(path).pairs == arbitrage.symbols.pairs
+
+
+def test_fresh_cache_is_not_refetched(tmp_path):
+    path = str(tmp_path / 'symbols.json')
+    cached_registry(path, 60)
+    arbitrage = DirectArbitrage(symbols_cache=path)
+    arbitrage.close()
+    assert arbitrage.symbols_thread is None
+    assert arbitrage.symbols.pairs['Binance'] == {'OLDUSDT': 'OLDUSDT'}
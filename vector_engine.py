@@ -0,0 +1,122 @@
+"""NumPy opportunity search for DirectArbitrage.
+
+Bids and asks are packed into ``pairs x exchanges`` arrays and every
+fee-adjusted buy/sell combination is evaluated with array operations, one
+buy exchange at a time. The arithmetic mirrors DirectArbitrage's pure Python
+loop operation for operation, so both engines produce identical records.
+"""
+try:
+    import numpy as np
+except ImportError:  # Optional dependency, only needed for compute='numpy'
+    np = None
+
+from records import Opportunity
+
+
+def pack_prices(prices):
+    """Pack per-exchange price dicts into (pairs, exchanges) bid/ask arrays
+
+    Only pairs listed on at least two exchanges are kept; missing quotes are NaN.
+    """
+    exchanges = list(prices)
+    counts = {}
+    for exchange_prices in prices.values():
+        for pair in exchange_prices:
+            counts[pair] = counts.get(pair, 0) + 1
+    pairs = [pair for pair, count in counts.items() if count >= 2]
+    row = {pair: i for i, pair in enumerate(pairs)}
+
+    bids = np.full((len(pairs), len(exchanges)), np.nan)
+    asks = np.full((len(pairs), len(exchanges)), np.nan)
+    for col, exchange in enumerate(exchanges):
+        exchange_prices = prices[exchange]
+        rows, bid_values, ask_values = [], [], []
+        for pair, data in exchange_prices.items():
+            i = row.get(pair)
+            if i is not None:
+                rows.append(i)
+                bid_values.append(data.bid)
+                ask_values.append(data.ask)
+        bids[rows, col] = bid_values
+        asks[rows, col] = ask_values
+    return pairs, exchanges, bids, asks
+
+
+def valid_price_mask(values):
+    """Vectorized is_valid_price"""
+    with np.errstate(invalid='ignore'):
+        return (values > 0) & (values < 1000000)
+
+
+def compute_opportunities(arbitrage, prices):
+    """Vectorized equivalent of DirectArbitrage.compute_opportunities"""
+    if np is None:
+        raise ImportError("compute='numpy' requires numpy (pip install numpy)")
+
+    pairs, exchanges, bids, asks = pack_prices(prices)
+    if not pairs:
+        return []
+
+    # Drop pairs whose best bid can't beat the best ask by the fees and minimum profit
+    keep = np.nanmax(bids, axis=1) >= np.nanmin(asks, axis=1) * arbitrage.profit_threshold(exchanges)
+    if not keep.all():
+        pairs = [pairs[i] for i in np.flatnonzero(keep).tolist()]
+        bids, asks = bids[keep], asks[keep]
+        if not pairs:
+            return []
+
+    investment = arbitrage.investment
+    fees = np.array([arbitrage.exchanges[exchange].fee for exchange in exchanges]) / 100
+    min_profit = arbitrage.min_profit_percent
+    valid_bids = valid_price_mask(bids)
+    valid_asks = valid_price_mask(asks)
+
+    opportunities = []
+    for buy_col, buy_exchange in enumerate(exchanges):
+        buy_price = asks[:, buy_col:buy_col + 1]  # (pairs, 1) against every sell column
+        candidates = valid_asks[:, buy_col:buy_col + 1] & valid_bids
+        candidates[:, buy_col] = False
+        if not candidates.any():
+            continue
+
+        with np.errstate(invalid='ignore', divide='ignore'):
+            # Same operation order as is_realistic_price_difference
+            avg_price = (buy_price + bids) / 2
+            diff_percent = np.abs(buy_price - bids) / avg_price * 100
+            candidates &= diff_percent <= 3
+
+            buy_fee = fees[buy_col]
+            buy_amount = investment * (1 + buy_fee)
+            coins_bought = (investment / buy_price) * (1 - buy_fee)
+            sell_amount = (coins_bought * bids) * (1 - fees)
+            profit_amount = sell_amount - buy_amount
+            profit_percent = (profit_amount / buy_amount) * 100
+
+            candidates &= (profit_percent > 0) & (profit_percent >= min_profit) & (profit_percent <= 3)
+
+        rows, cols = np.nonzero(candidates)
+        if not len(rows):
+            continue
+
+        buy_prices = asks[rows, buy_col].tolist()
+        sell_prices = bids[rows, cols].tolist()
+        percents = profit_percent[rows, cols].tolist()
+        amounts = profit_amount[rows, cols].tolist()
+        coins = np.broadcast_to(coins_bought, bids.shape)[rows, cols].tolist()
+        finals = sell_amount[rows, cols].tolist()
+        buy_fee_percent = float(buy_fee * 100)
+        sell_fee_percents = (fees * 100).tolist()
+        buy_prices_table = prices[buy_exchange]
+
+        for k, (i, j) in enumerate(zip(rows.tolist(), cols.tolist())):
+            pair = pairs[i]
+            sell_exchange = exchanges[j]
+            opportunities.append(Opportunity(
+                arbitrage.display_pair(pair), buy_exchange, sell_exchange,
+                buy_prices[k], sell_prices[k], percents[k], amounts[k], investment,
+                buy_prices_table[pair].original_symbol,
+                prices[sell_exchange][pair].original_symbol,
+                buy_fee_percent, sell_fee_percents[j], coins[k], finals[k]
+            ))
+
+    return arbitrage.rank(opportunities)